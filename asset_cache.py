@@ -0,0 +1,184 @@
+"""
+Persistent content-addressed store for generated media assets.
+
+Sound effect prompts such as "gentle wind, distant birds" repeat across runs, and
+every repeat costs API latency and quota. AssetCache keeps one blob per request
+key (a SHA-256 of everything that determines the asset, e.g. prompt + duration +
+prompt_influence) plus an index.json with sizes and last-use times. When the
+total size exceeds max_bytes the least recently used blobs are evicted.
+
+On a hit the blob is hardlinked into the destination path (copied when the
+destination is on another filesystem), so the scene directory looks exactly as
+if the asset had just been generated.
+
+Job workers run in separate processes that share the store, so every
+read-modify-write of index.json holds an exclusive flock on index.json.lock as
+well as the in-process lock. Where fcntl is not available (Windows) only the
+in-process lock is taken, and concurrent processes may lose each other's index
+updates; the blobs themselves are always written atomically.
+
+Configuration:
+    ASSET_CACHE_DIR        Root directory of the store (default: .asset_cache)
+    ASSET_CACHE_MAX_BYTES  Size bound per namespace (default: 1 GiB)
+    ASSET_CACHE_DISABLED   Set to 1 to always call the APIs
+
+Usage:
+    cache = AssetCache(os.path.join(ASSET_CACHE_DIR, "sound_effects"), extension=".mp3")
+    key = cache.make_key(text=prompt, duration_seconds=5, prompt_influence=0.5)
+    if not cache.fetch(key, output_path):
+        generate(output_path)
+        cache.store(key, output_path)
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Load environment variables
+load_dotenv()
+
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", ".asset_cache")
+DEFAULT_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+class AssetCache:
+    def __init__(self, cache_dir: str, extension: str = "", max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = ASSET_CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock_path = f"{self.index_path}.lock"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Hash the request parameters that determine the asset into a key"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.extension}")
+
+    @contextmanager
+    def _index_lock(self):
+        """Hold the index against other threads and, where fcntl exists, other processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    @staticmethod
+    def _place(src_path: str, dest_path: str):
+        """Hardlink src to dest, falling back to a copy across filesystems"""
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(src_path, dest_path)
+        except OSError:
+            shutil.copy2(src_path, dest_path)
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """
+        Place the cached asset for key at dest_path.
+
+        Returns:
+            bool: True on a hit, False if the asset is not cached (or the cache is disabled)
+        """
+        if not self.enabled:
+            return False
+
+        with self._index_lock():
+            index = self._load_index()
+            blob_path = self._blob_path(key)
+            if key not in index or not os.path.exists(blob_path):
+                self.misses += 1
+                return False
+
+            self._place(blob_path, dest_path)
+            index[key]["last_used"] = time.time()
+            self._save_index(index)
+            self.hits += 1
+            return True
+
+    def store(self, key: str, src_path: str, metadata: Optional[Dict[str, Any]] = None):
+        """Add the file at src_path to the store under key and evict beyond max_bytes"""
+        if not self.enabled or not os.path.exists(src_path):
+            return
+
+        with self._index_lock():
+            index = self._load_index()
+            blob_path = self._blob_path(key)
+            temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copy2(src_path, temp_path)
+            os.replace(temp_path, blob_path)
+
+            index[key] = {
+                "file": os.path.basename(blob_path),
+                "size": os.path.getsize(blob_path),
+                "last_used": time.time(),
+                "metadata": metadata or {}
+            }
+            self._evict(index)
+            self._save_index(index)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]]):
+        total_bytes = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(key))
+            except OSError:
+                pass
+            total_bytes -= index.pop(key)["size"]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current store size"""
+        with self._index_lock():
+            index = self._load_index()
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(index),
+                "bytes": sum(entry["size"] for entry in index.values())
+            }
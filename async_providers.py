@@ -0,0 +1,362 @@
+"""
+asyncio-native facade over the provider SDKs used by the pipeline.
+
+The pipeline functions (generate_video_segment, generate_ltx_video,
+generate_scene_sound_effect, the cached LLM calls) block a thread for the whole
+life of a remote job. The coroutines here do the same work on the SDKs' async
+clients, so one event loop can keep hundreds of Luma/FAL/ElevenLabs/LLM jobs in
+flight from a single process:
+
+    Luma        AsyncLumaAI: create, poll_until_async, download
+    FAL (LTX)   fal_client.subscribe_async, download
+    ElevenLabs  AsyncElevenLabs: sound effects and speech, streamed to disk
+    Gemini      client.aio.models.generate_content (through llm_cache)
+    Anthropic   AsyncAnthropic().messages.create (through llm_cache)
+    Downloads   httpx.AsyncClient streaming into a temporary file
+
+Every provider call goes through the same rate_limiter limiters as the
+synchronous pipeline (async_slot/retry_async), so using both at once stays
+within one set of provider limits.
+
+Async clients hold connection pools bound to the event loop that created them,
+so they are created lazily once per loop. run_sync() runs a coroutine from
+synchronous code, which keeps the existing blocking functions usable unchanged
+and lets them hand a batch of jobs to gather_with_limit().
+
+Usage:
+    from async_providers import gather_with_limit, generate_luma_video, run_sync
+    results = run_sync(gather_with_limit(
+        [generate_luma_video(prompt, f"clip_{i}.mp4", duration=5) for i, prompt in enumerate(prompts)],
+        limit=50
+    ))
+"""
+
+import os
+import json
+import asyncio
+import weakref
+import threading
+from typing import Any, Awaitable, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+
+import httpx
+import fal_client
+
+from rate_limiter import get_limiter
+from polling import poll_until_async, luma_is_done, luma_failure, BackoffSchedule, LUMA_VIDEO_DEADLINE, LUMA_IMAGE_DEADLINE
+from llm_cache import cached_gemini_generate_content_async, cached_anthropic_messages_create_async
+from ltx_video_generation import build_ltx_request, on_queue_update
+
+# Load environment variables
+load_dotenv()
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = httpx.Timeout(30.0, read=300.0)
+
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _client(name: str, factory):
+    """Return the client called name for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _loop_clients.setdefault(loop, {})
+        if name not in clients:
+            clients[name] = factory()
+        return clients[name]
+
+
+def get_luma_client():
+    from lumaai import AsyncLumaAI
+    return _client("luma", lambda: AsyncLumaAI(auth_token=os.getenv("LUMAAI_API_KEY")))
+
+
+def get_elevenlabs_client():
+    from elevenlabs import AsyncElevenLabs
+    return _client("elevenlabs", lambda: AsyncElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY")))
+
+
+def get_gemini_client():
+    from google import genai
+    return _client("gemini", lambda: genai.Client(api_key=os.getenv("GEMINI_API_KEY")))
+
+
+def get_anthropic_client():
+    from anthropic import AsyncAnthropic
+    return _client("anthropic", lambda: AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY")))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    return _client("http", lambda: httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT, follow_redirects=True))
+
+
+async def download(url: str, output_path: str) -> str:
+    """
+    Stream url to output_path through a temporary file.
+
+    Returns:
+        str: output_path
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    temp_path = f"{output_path}.part"
+    async with get_http_client().stream("GET", url) as response:
+        response.raise_for_status()
+        with open(temp_path, "wb") as f:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+async def _write_stream(stream, output_path: str):
+    temp_path = f"{output_path}.part"
+    with open(temp_path, "wb") as f:
+        async for chunk in stream:
+            if chunk:
+                f.write(chunk)
+    os.replace(temp_path, output_path)
+
+
+async def wait_for_luma_generation(generation_id: str, deadline: Optional[float] = LUMA_VIDEO_DEADLINE,
+                                   cancel_event: Optional[threading.Event] = None,
+                                   schedule: Optional[BackoffSchedule] = None, name: str = "luma_video"):
+    """Poll a Luma generation until it completes; raises RuntimeError if it fails"""
+    client = get_luma_client()
+    return await poll_until_async(
+        lambda: get_limiter("luma").call_async(client.generations.get, id=generation_id),
+        is_done=luma_is_done, is_failed=luma_failure,
+        deadline=deadline, cancel_event=cancel_event, schedule=schedule, name=name
+    )
+
+
+async def generate_luma_video(prompt: str, output_path: str, duration: int = 5, image_url: Optional[str] = None,
+                              model: str = "ray-2", resolution: str = "720p",
+                              deadline: Optional[float] = LUMA_VIDEO_DEADLINE,
+                              cancel_event: Optional[threading.Event] = None):
+    """
+    Generate a Luma video, wait for it and download it to output_path.
+
+    Args:
+        prompt (str): Video prompt
+        output_path (str): Where to save the video
+        duration (int): Duration in seconds
+        image_url (str): Optional first frame
+        model (str): Luma model
+        resolution (str): Luma resolution
+        deadline (float): Seconds to wait for the generation
+        cancel_event (threading.Event): Set to stop waiting
+
+    Returns:
+        The completed Luma generation
+    """
+    generation_params = {
+        "prompt": prompt,
+        "model": model,
+        "resolution": resolution,
+        "duration": f"{duration}s"
+    }
+    if image_url:
+        generation_params["keyframes"] = {
+            "frame0": {
+                "type": "image",
+                "url": image_url
+            }
+        }
+
+    # Hold a Luma concurrency slot from creation until the generation completes
+    limiter = get_limiter("luma", model)
+    async with limiter.async_slot():
+        generation = await limiter.retry_async(get_luma_client().generations.create, **generation_params)
+        generation = await wait_for_luma_generation(generation.id, deadline=deadline, cancel_event=cancel_event)
+    await download(generation.assets.video, output_path)
+    return generation
+
+
+async def generate_luma_image(prompt: str, output_dir: str = "generated_images",
+                              deadline: Optional[float] = LUMA_IMAGE_DEADLINE):
+    """
+    Generate a Luma image and save it as {generation_id}.jpg in output_dir.
+
+    Returns:
+        tuple: (image_url, filepath)
+    """
+    limiter = get_limiter("luma", "photon")
+    async with limiter.async_slot():
+        generation = await limiter.retry_async(get_luma_client().generations.image.create, prompt=prompt)
+        generation = await wait_for_luma_generation(generation.id, deadline=deadline, name="luma_image")
+    image_url = generation.assets.image
+    if not image_url:
+        raise RuntimeError("No image URL in generation response")
+    filepath = await download(image_url, os.path.join(output_dir, f"{generation.id}.jpg"))
+    return image_url, filepath
+
+
+async def generate_ltx_video(prompt: str, image_url: Optional[str] = None, output_path: Optional[str] = None,
+                             model_args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Async version of ltx_video_generation.generate_ltx_video.
+
+    Returns:
+        Dict[str, Any]: The FAL response, with video_url and saved_path/local_video_path when downloaded
+    """
+    model_endpoint, arguments = build_ltx_request(prompt, image_url, model_args)
+    result = await get_limiter("fal", model_endpoint).call_async(
+        fal_client.subscribe_async,
+        model_endpoint,
+        arguments=arguments,
+        with_logs=True,
+        on_queue_update=on_queue_update,
+    )
+
+    video_url = result.get('video', {}).get('url')
+    if not video_url:
+        raise ValueError("No video URL found in the API response")
+    result['video_url'] = video_url
+
+    if output_path:
+        await download(video_url, output_path)
+        result['saved_path'] = output_path
+        result['local_video_path'] = os.path.abspath(output_path)
+        with open(f"{os.path.splitext(output_path)[0]}_response.json", 'w') as json_file:
+            json.dump(result, json_file, indent=2)
+    return result
+
+
+async def generate_sound_effect(text: str, output_path: str, duration_seconds: float, prompt_influence: float = 0.5,
+                                use_cache: bool = True) -> str:
+    """Generate an ElevenLabs sound effect and stream it to output_path, sharing the pipeline's sound effect cache"""
+    from eleven_labs_tts import sound_effect_cache
+
+    cache_key = sound_effect_cache.make_key(text=text, duration_seconds=duration_seconds, prompt_influence=prompt_influence)
+    if use_cache and sound_effect_cache.fetch(cache_key, output_path):
+        return output_path
+
+    def write_sound_effect():
+        stream = get_elevenlabs_client().text_to_sound_effects.convert(
+            text=text,
+            duration_seconds=duration_seconds,
+            prompt_influence=prompt_influence
+        )
+        return _write_stream(stream, output_path)
+
+    # The request is only sent once the stream is consumed, so the whole download holds the slot
+    await get_limiter("elevenlabs", "sound-generation").call_async(write_sound_effect)
+    if use_cache:
+        sound_effect_cache.store(cache_key, output_path, metadata={
+            "text": text,
+            "duration_seconds": duration_seconds,
+            "prompt_influence": prompt_influence
+        })
+    return output_path
+
+
+async def generate_speech(text: str, output_path: str, voice_id: Optional[str] = None, model_id: Optional[str] = None,
+                          output_format: Optional[str] = None, use_cache: bool = True) -> str:
+    """Async version of eleven_labs_tts.generate_speech, sharing its speech cache"""
+    import eleven_labs_tts
+
+    voice_id = voice_id or eleven_labs_tts.DEFAULT_VOICE_ID
+    model_id = model_id or eleven_labs_tts.DEFAULT_MODEL_ID
+    output_format = output_format or eleven_labs_tts.DEFAULT_OUTPUT_FORMAT
+
+    speech_cache = eleven_labs_tts.speech_cache
+    cache_key = speech_cache.make_key(text=text, voice_id=voice_id, model_id=model_id, output_format=output_format)
+    if use_cache and speech_cache.fetch(cache_key, output_path):
+        return output_path
+
+    def write_speech():
+        stream = get_elevenlabs_client().text_to_speech.convert(
+            voice_id=voice_id,
+            output_format=output_format,
+            text=text,
+            model_id=model_id
+        )
+        return _write_stream(stream, output_path)
+
+    await get_limiter("elevenlabs", "text-to-speech").call_async(write_speech)
+    if use_cache:
+        speech_cache.store(cache_key, output_path, metadata={"voice_id": voice_id, "model_id": model_id})
+    return output_path
+
+
+async def gemini_generate_content(model: str, contents, config: Dict[str, Any], validate=None):
+    """Gemini generate_content on the async client, through the LLM response cache"""
+    return await cached_gemini_generate_content_async(get_gemini_client(), model=model, contents=contents,
+                                                      config=config, validate=validate)
+
+
+async def anthropic_messages_create(validate=None, **kwargs):
+    """Anthropic messages.create on the async client, through the LLM response cache"""
+    return await cached_anthropic_messages_create_async(get_anthropic_client(), validate=validate, **kwargs)
+
+
+async def close_clients():
+    """Close the async clients created for the running event loop"""
+    with _clients_lock:
+        clients = _loop_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            pass
+
+
+async def _run_and_close(coroutine):
+    try:
+        return await coroutine
+    finally:
+        await close_clients()
+
+
+async def gather_with_limit(coroutines: Iterable[Awaitable], limit: int = 50, return_exceptions: bool = False) -> List[Any]:
+    """
+    Await coroutines with at most limit of them running at once.
+
+    Returns:
+        list: Results in the order of the coroutines
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines), return_exceptions=return_exceptions)
+
+
+def run_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Uses asyncio.run when no loop is running in this thread; otherwise (e.g. when
+    called from inside Gradio's loop) the coroutine runs on a fresh loop in a
+    helper thread so the caller's loop is not re-entered.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_and_close(coroutine))
+
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(_run_and_close(coroutine))
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
@@ -0,0 +1,243 @@
+"""
+NumPy mixer for the soundtrack of the final video.
+
+Stitching used to mix the narration over the scene audio by nesting MoviePy
+CompositeVideoClips (or an ffmpeg amix graph) with a fixed 0.7 gain on the
+sound effects. Here every scene sound effect and the narration are decoded once
+into float32 arrays at one sample rate and placed on a timeline of the scene
+durations, then mixed with vectorized operations:
+
+- length: every effect is fitted to its scene video: cut when longer, looped
+  with crossfades (or padded with silence when too short to loop) when
+  shorter, and the difference is reported per scene,
+- gain: sound effects at SOUND_EFFECT_VOLUME, narration at NARRATION_VOLUME,
+- crossfades: each scene's effect runs CROSSFADE_SECONDS into the next scene,
+  which fades in while it fades out (equal power), instead of a hard cut,
+- ducking: wherever the narration is louder than DUCK_THRESHOLD_DB the effects
+  are lowered by DUCK_DEPTH_DB, ramping down over DUCK_ATTACK_SECONDS and back
+  up after DUCK_RELEASE_SECONDS of silence,
+- limiter: a look-ahead peak limiter keeps the sum under LIMITER_CEILING.
+
+Levels are computed on 5 ms blocks and interpolated to the sample rate, so the
+mix is deterministic and costs a few array passes however long the video is.
+The result is a single PCM buffer that ffmpeg_stitcher.mux_pcm_audio (or
+MoviePy, through a WAV file) puts next to the video track.
+
+Usage:
+    from audio_mixer import mix_scene_audio
+    samples, drift = mix_scene_audio(scene_durations, sound_effect_files, narration_audio_path)
+    print_drift_report(drift)
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_processing import decode_audio
+from ffmpeg_stitcher import AUDIO_SAMPLE_RATE, SOUND_EFFECT_VOLUME, NARRATION_VOLUME
+
+CHANNELS = 2
+CROSSFADE_SECONDS = 0.25
+EXTEND_MODE = "loop"
+LOOP_CROSSFADE_SECONDS = 0.5
+MIN_LOOP_SECONDS = 1.0
+DRIFT_TOLERANCE_SECONDS = 0.05
+DUCK_THRESHOLD_DB = -40.0
+DUCK_DEPTH_DB = -8.0
+DUCK_ATTACK_SECONDS = 0.05
+DUCK_RELEASE_SECONDS = 0.4
+LIMITER_CEILING = 0.97
+LIMITER_LOOKAHEAD_SECONDS = 0.005
+LEVEL_BLOCK_SECONDS = 0.005
+
+
+def _db_to_gain(db: float) -> float:
+    return float(10 ** (db / 20))
+
+
+def _block_size(sample_rate: int) -> int:
+    return max(1, int(round(LEVEL_BLOCK_SECONDS * sample_rate)))
+
+
+def _block_reduce(samples: np.ndarray, block: int, reducer) -> np.ndarray:
+    """Reduce the level (|samples|, loudest channel) of every block of samples"""
+    level = np.abs(samples).max(axis=1) if samples.ndim == 2 else np.abs(samples)
+    padded = np.pad(level, (0, -len(level) % block))
+    return reducer(padded.reshape(-1, block), axis=1)
+
+
+def _sliding(values: np.ndarray, width: int, reducer) -> np.ndarray:
+    """reducer over a centered window of width blocks, same length as values"""
+    if width <= 1:
+        return values
+    edge = width // 2
+    padded = np.pad(values, (edge, width - 1 - edge), mode="edge")
+    return reducer(sliding_window_view(padded, width), axis=1)
+
+
+def _to_samples(block_values: np.ndarray, block: int, length: int) -> np.ndarray:
+    """Interpolate per-block values to per-sample values"""
+    centers = np.arange(len(block_values)) * block + block / 2
+    return np.interp(np.arange(length), centers, block_values).astype(np.float32)
+
+
+def _fade(length: int, fade_in: bool) -> np.ndarray:
+    """Equal-power fade curve"""
+    phase = (np.arange(length) + 0.5) / length * (np.pi / 2)
+    return (np.sin(phase) if fade_in else np.cos(phase)).astype(np.float32)
+
+
+def fit_to_length(samples: np.ndarray, length: int, sample_rate: int = AUDIO_SAMPLE_RATE,
+                  mode: str = EXTEND_MODE) -> Tuple[np.ndarray, str]:
+    """
+    Make audio exactly length samples long without touching the video.
+
+    Longer audio is cut. Shorter audio is looped with an equal-power crossfade at
+    every loop point (mode "loop", for effects of at least MIN_LOOP_SECONDS) or
+    padded with silence (mode "pad", or effects too short to loop).
+
+    Returns:
+        tuple: (samples of shape (length, channels), "matched", "trimmed", "looped" or "padded")
+    """
+    if len(samples) >= length:
+        return samples[:length], "matched" if len(samples) == length else "trimmed"
+
+    output = np.zeros((length,) + samples.shape[1:], dtype=np.float32)
+    if mode != "loop" or len(samples) < MIN_LOOP_SECONDS * sample_rate:
+        output[:len(samples)] = samples
+        return output, "padded"
+
+    # Every repetition starts `overlap` samples before the previous one ends
+    overlap = min(int(round(LOOP_CROSSFADE_SECONDS * sample_rate)), len(samples) // 4)
+    period = len(samples) - overlap
+    fade_in = _fade(overlap, fade_in=True)[:, None]
+    fade_out = _fade(overlap, fade_in=False)[:, None]
+    unit = samples.astype(np.float32)
+    unit[-overlap:] *= fade_out
+    looped_unit = unit.copy()
+    looped_unit[:overlap] *= fade_in
+    for position in range(0, length, period):
+        piece = (unit if position == 0 else looped_unit)[:length - position]
+        output[position:position + len(piece)] += piece
+    return output, "looped"
+
+
+def place_sound_effects(scene_durations: List[float], sound_effect_files: List[Optional[str]],
+                        sample_rate: int = AUDIO_SAMPLE_RATE) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Lay the scene sound effects on one timeline, crossfading at scene boundaries.
+
+    Every effect is fitted to its scene plus the crossfade into the next scene
+    (fit_to_length), so the video is never cut to the length of its audio.
+
+    Returns:
+        tuple: (float32 samples of shape (total samples, 2), drift report with one entry per scene)
+    """
+    bounds = np.round(np.cumsum([0.0] + list(scene_durations)) * sample_rate).astype(np.int64)
+    timeline = np.zeros((int(bounds[-1]), CHANNELS), dtype=np.float32)
+    crossfade = int(round(CROSSFADE_SECONDS * sample_rate))
+    drift = []
+
+    for i, sound_file in enumerate(sound_effect_files):
+        start, end = int(bounds[i]), int(bounds[i + 1])
+        entry = {"scene": i + 1, "video_seconds": round((end - start) / sample_rate, 3),
+                 "audio_seconds": None, "drift_seconds": None, "action": "missing"}
+        drift.append(entry)
+        if not sound_file or not os.path.exists(sound_file):
+            continue
+        effect = decode_audio(sound_file, sample_rate, CHANNELS)
+        entry["audio_seconds"] = round(len(effect) / sample_rate, 3)
+        entry["drift_seconds"] = round((len(effect) - (end - start)) / sample_rate, 3)
+        if len(effect) == 0:
+            continue
+
+        is_last = i == len(scene_durations) - 1
+        effect, entry["action"] = fit_to_length(effect, end - start + (0 if is_last else crossfade), sample_rate)
+        effect = effect[:len(timeline) - start].copy()
+
+        fade_length = min(crossfade, len(effect) // 2)
+        if fade_length > 0 and i > 0:
+            effect[:fade_length] *= _fade(fade_length, fade_in=True)[:, None]
+        if len(effect) > end - start:
+            # Fade out over the part that overlaps the next scene
+            overlap = len(effect) - (end - start)
+            effect[-overlap:] *= _fade(overlap, fade_in=False)[:, None]
+        timeline[start:start + len(effect)] += effect
+    return timeline, drift
+
+
+def print_drift_report(drift: List[Dict[str, Any]], tolerance: float = DRIFT_TOLERANCE_SECONDS):
+    """Print the scenes whose sound effect did not match the video length"""
+    for entry in drift:
+        if entry["drift_seconds"] is not None and abs(entry["drift_seconds"]) > tolerance:
+            print(f"Scene {entry['scene']}: sound effect {entry['audio_seconds']:.2f}s for {entry['video_seconds']:.2f}s "
+                  f"of video ({entry['drift_seconds']:+.2f}s), {entry['action']}")
+
+
+def duck_gain(narration: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE) -> np.ndarray:
+    """
+    Per-sample gain for the sound effects: DUCK_DEPTH_DB while the narration is speaking, 1 otherwise.
+
+    Returns:
+        np.ndarray: float32 gains, one per sample of narration
+    """
+    block = _block_size(sample_rate)
+    rms = np.sqrt(_block_reduce(narration, block, lambda blocks, axis: np.mean(blocks ** 2, axis=axis)))
+    speaking = (rms > _db_to_gain(DUCK_THRESHOLD_DB)).astype(np.float32)
+
+    # Hold the duck through short pauses, then ramp between the levels over the attack time
+    release_blocks = max(1, int(round(DUCK_RELEASE_SECONDS / LEVEL_BLOCK_SECONDS)))
+    held = _sliding(speaking, 2 * release_blocks + 1, np.max)
+    attack_blocks = max(1, int(round(DUCK_ATTACK_SECONDS / LEVEL_BLOCK_SECONDS)))
+    amount = _sliding(held, attack_blocks, np.mean)
+
+    gains = 1.0 - amount * (1.0 - _db_to_gain(DUCK_DEPTH_DB))
+    return _to_samples(gains, block, len(narration))
+
+
+def limit(samples: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE, ceiling: float = LIMITER_CEILING) -> np.ndarray:
+    """
+    Look-ahead peak limiter: lowers the gain smoothly ahead of every peak above ceiling.
+
+    Returns:
+        np.ndarray: The limited samples (a new array)
+    """
+    block = _block_size(sample_rate)
+    peaks = _block_reduce(samples, block, np.max)
+    required = np.minimum(1.0, ceiling / np.maximum(peaks, 1e-9))
+    window = 2 * max(1, int(round(LIMITER_LOOKAHEAD_SECONDS / LEVEL_BLOCK_SECONDS))) + 1
+    # The minimum over the window reaches every peak's block and its neighbours,
+    # so the smoothed and interpolated gain never exceeds what a block requires
+    gains = _sliding(_sliding(required, 2 * window + 1, np.min), window, np.mean)
+    limited = samples * _to_samples(gains, block, len(samples))[:, None]
+    return np.clip(limited, -ceiling, ceiling)
+
+
+def mix_scene_audio(scene_durations: List[float], sound_effect_files: Optional[List[Optional[str]]] = None,
+                    narration_audio_path: Optional[str] = None,
+                    sample_rate: int = AUDIO_SAMPLE_RATE) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Mix the soundtrack of the final video.
+
+    Args:
+        scene_durations (list): Duration in seconds of every scene video, in order
+        sound_effect_files (list): Sound effect of every scene (None for scenes without one)
+        narration_audio_path (str): Narration laid from the start of the video; cut at its end
+        sample_rate (int): Sample rate of the mix
+
+    Returns:
+        tuple: (float32 samples of shape (samples, 2), as long as the scenes together;
+                per-scene drift report of the sound effects, see place_sound_effects)
+    """
+    sound_effect_files = sound_effect_files or [None] * len(scene_durations)
+    effects, drift = place_sound_effects(scene_durations, sound_effect_files, sample_rate)
+    mix = effects * SOUND_EFFECT_VOLUME
+
+    if narration_audio_path and os.path.exists(narration_audio_path):
+        narration = decode_audio(narration_audio_path, sample_rate, CHANNELS)[:len(mix)] * NARRATION_VOLUME
+        mix[:len(narration)] *= duck_gain(narration, sample_rate)[:, None]
+        mix[:len(narration)] += narration
+
+    return limit(mix, sample_rate), drift
@@ -0,0 +1,178 @@
+"""
+NumPy audio stage for fitting narration to the video length.
+
+The narration used to be sped up or slowed down with MoviePy's
+set_make_frame(lambda t: audio.get_frame(speed_factor * t)): MoviePy evaluates
+the lambda chunk by chunk in Python, and the result is plain resampling, so the
+voice changes pitch along with the tempo (chipmunk at 1.3x, slurred at 0.8x).
+
+Here the audio is decoded once with ffmpeg into a float32 array and stretched
+with WSOLA (waveform-similarity overlap-add): the output is built from 40 ms
+Hann-windowed frames of the input taken at the stretched positions, each one
+shifted by up to 10 ms so that it lines up with the waveform of the previous
+frame. Frames are copied rather than resampled, which keeps the pitch. The
+alignment search runs on a 4x decimated mono signal, and the frames are
+gathered and overlap-added with vectorized NumPy operations, a block of frames
+at a time. The result is encoded straight to the output file with ffmpeg.
+
+benchmark_time_stretch.py compares this with the MoviePy path.
+
+Usage:
+    from audio_processing import stretch_to_duration
+    stretch_to_duration("narration.mp3", "narration_adjusted.mp3", target_duration=42.0)
+"""
+
+import subprocess
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ffmpeg_stitcher import get_ffmpeg_exe, AUDIO_SAMPLE_RATE, AUDIO_BITRATE
+
+FRAME_SECONDS = 0.04
+TOLERANCE_SECONDS = 0.01
+SEARCH_DECIMATION = 4
+BLOCK_FRAMES = 512
+
+
+def _ffmpeg_exe() -> str:
+    ffmpeg_exe = get_ffmpeg_exe()
+    if not ffmpeg_exe:
+        raise RuntimeError("ffmpeg is not available")
+    return ffmpeg_exe
+
+
+def decode_audio(path: str, sample_rate: int = AUDIO_SAMPLE_RATE, channels: int = 2) -> np.ndarray:
+    """
+    Decode an audio (or video) file with ffmpeg.
+
+    Returns:
+        np.ndarray: float32 samples of shape (samples, channels)
+    """
+    result = subprocess.run(
+        [_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", path, "-vn",
+         "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-"],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+def encode_audio(samples: np.ndarray, output_path: str, sample_rate: int = AUDIO_SAMPLE_RATE,
+                 bitrate: str = AUDIO_BITRATE) -> str:
+    """
+    Encode float samples of shape (samples, channels) to output_path; the format follows the extension.
+
+    Returns:
+        str: output_path
+    """
+    samples = np.ascontiguousarray(np.clip(samples, -1.0, 1.0), dtype=np.float32)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    result = subprocess.run(
+        [_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+         "-f", "f32le", "-ar", str(sample_rate), "-ac", str(samples.shape[1]), "-i", "-",
+         "-b:a", bitrate, output_path],
+        input=samples.tobytes(), capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not encode {output_path}: {result.stderr.decode(errors='replace').strip()}")
+    return output_path
+
+
+def _round_to(value: float, step: int) -> int:
+    return int(round(value / step)) * step
+
+
+def time_stretch(samples: np.ndarray, rate: float, sample_rate: int = AUDIO_SAMPLE_RATE,
+                 output_length: Optional[int] = None) -> np.ndarray:
+    """
+    Change the tempo of audio without changing its pitch (WSOLA).
+
+    Args:
+        samples (np.ndarray): Samples of shape (samples,) or (samples, channels)
+        rate (float): Speed factor; 1.25 plays 25% faster, giving 1/1.25 of the length
+        sample_rate (int): Sample rate of samples
+        output_length (int): Exact number of output samples (default: len(samples) / rate)
+
+    Returns:
+        np.ndarray: float32 samples with the same channel layout as samples
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    mono_input = samples.ndim == 1
+    x = np.asarray(samples, dtype=np.float32)
+    if mono_input:
+        x = x[:, None]
+    if output_length is None:
+        output_length = int(round(len(x) / rate))
+
+    step = SEARCH_DECIMATION
+    hop = max(step, _round_to(FRAME_SECONDS * sample_rate / 2, step))
+    frame_length = 2 * hop
+    tolerance = max(step, _round_to(TOLERANCE_SECONDS * sample_rate, step))
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_length) / frame_length)).astype(np.float32)
+
+    # Frame k covers output samples [(k - 1) * hop, (k + 1) * hop); its nominal input start is k * hop * rate - hop
+    num_frames = output_length // hop + 2
+    pad = frame_length + tolerance
+    nominal = pad - hop + np.round(np.arange(num_frames) * hop * rate / step).astype(np.int64) * step
+    padded_length = int(nominal[-1]) + tolerance + 2 * frame_length
+    padded_length += -padded_length % step
+    # Channels first, so frames of one channel are contiguous
+    padded = np.zeros((x.shape[1], padded_length), dtype=np.float32)
+    padded[:, pad:pad + len(x)] = x[:padded_length - pad].T
+
+    # Pick every frame start by matching the natural continuation of the previous frame,
+    # on a decimated mono signal
+    search = padded.mean(axis=0).reshape(-1, step).mean(axis=1)
+    frame_d, tolerance_d = frame_length // step, tolerance // step
+    starts = nominal.copy()
+    for k in range(1, num_frames):
+        continuation = (starts[k - 1] + hop) // step
+        template = search[continuation:continuation + frame_d]
+        first = (nominal[k] - tolerance) // step
+        scores = np.correlate(search[first:first + 2 * tolerance_d + frame_d], template, mode="valid")
+        starts[k] = (first + int(np.argmax(scores))) * step
+
+    # Overlap-add: with 50% overlap each frame adds its first half to output block k
+    # and its second half to block k + 1
+    frames_view = sliding_window_view(padded, frame_length, axis=1)
+    output = np.zeros((x.shape[1], num_frames + 1, hop), dtype=np.float32)
+    for block_start in range(0, num_frames, BLOCK_FRAMES):
+        block_starts = starts[block_start:block_start + BLOCK_FRAMES]
+        frames = frames_view[:, block_starts] * window
+        block_end = block_start + len(block_starts)
+        output[:, block_start:block_end] += frames[:, :, :hop]
+        output[:, block_start + 1:block_end + 1] += frames[:, :, hop:]
+
+    stretched = np.ascontiguousarray(output.reshape(x.shape[1], -1)[:, hop:hop + output_length].T)
+    if len(stretched) < output_length:
+        stretched = np.concatenate([stretched, np.zeros((output_length - len(stretched), x.shape[1]), np.float32)])
+    return stretched[:, 0] if mono_input else stretched
+
+
+def stretch_to_duration(input_path: str, output_path: str, target_duration: float,
+                        sample_rate: int = AUDIO_SAMPLE_RATE, channels: int = 1) -> float:
+    """
+    Write input_path time-stretched to exactly target_duration seconds, keeping its pitch.
+
+    Args:
+        input_path (str): Audio file to stretch
+        output_path (str): Output file; the format follows the extension
+        target_duration (float): Duration of the output in seconds
+        sample_rate (int): Sample rate of the output
+        channels (int): Channels of the output; narration speech is mono
+
+    Returns:
+        float: The speed factor applied (original duration / target duration)
+    """
+    samples = decode_audio(input_path, sample_rate, channels)
+    if len(samples) == 0:
+        raise ValueError(f"{input_path} contains no audio")
+    output_length = int(round(target_duration * sample_rate))
+    rate = len(samples) / output_length
+    encode_audio(time_stretch(samples, rate, sample_rate, output_length), output_path, sample_rate)
+    return rate
@@ -0,0 +1,254 @@
+"""
+Batch mode: generate videos for many scripts in one process.
+
+Jobs come from a directory of .txt scripts, a manifest file and/or a number of
+random scripts. They run in one process, so they share the API clients, the LLM
+and asset caches and the provider rate limiters, and under a global budget:
+
+- batch_jobs scripts are processed at the same time,
+- task_budget generation tasks (keyframes, segments, sound effects) run at the
+  same time across all of them, whatever each run's max_workers is.
+
+Every run gets its own directory inside generated_videos/batch_{timestamp}/.
+batch_summary.json in the batch directory is rewritten after every job with
+the per-job status, timings and outputs.
+
+Manifest format (JSON list or one JSON object per line). Entries are script
+paths (relative to the manifest) or objects with one of script_file,
+script_text or random_script, an optional name, and generate_video arguments
+overriding the command line ones:
+
+    [
+        "scripts/heist.txt",
+        {"name": "noir", "script_file": "scripts/noir.txt", "max_scenes": 8},
+        {"random_script": true, "model_choice": "claude"}
+    ]
+
+Usage:
+    python video_generation.py --batch_dir scripts/ --random_scripts 5 --batch_jobs 3 --task_budget 12
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+DEFAULT_BATCH_JOBS = 2
+DEFAULT_TASK_BUDGET = 8
+SUMMARY_FILE = "batch_summary.json"
+
+# generate_video arguments a manifest entry may override
+JOB_OPTIONS = {
+    "model_choice", "video_engine", "metadata_only", "max_scenes", "max_environments", "custom_env_prompt",
+    "custom_environments", "skip_narration", "skip_sound_effects", "initial_image_path", "initial_image_prompt",
+    "first_frame_image_gen", "image_gen_model", "max_workers", "skip_scene_count", "planning_mode", "preview",
+    "preview_overlay"
+}
+
+
+def _job_from_entry(entry: Any, base_dir: str, index: int) -> Dict[str, Any]:
+    if isinstance(entry, str):
+        entry = {"script_file": entry}
+    if not isinstance(entry, dict):
+        raise ValueError(f"Manifest entry {index} must be a path or an object")
+
+    sources = [key for key in ("script_file", "script_text", "random_script") if entry.get(key)]
+    if len(sources) != 1:
+        raise ValueError(f"Manifest entry {index} needs exactly one of script_file, script_text or random_script")
+    unknown = set(entry) - JOB_OPTIONS - {"name", "script_file", "script_text", "random_script"}
+    if unknown:
+        raise ValueError(f"Manifest entry {index} has unknown options: {', '.join(sorted(unknown))}")
+
+    job = dict(entry)
+    if "script_file" in job:
+        job["script_file"] = os.path.join(base_dir, job["script_file"])
+        job.setdefault("name", os.path.splitext(os.path.basename(job["script_file"]))[0])
+    if job.get("initial_image_path"):
+        job["initial_image_path"] = os.path.join(base_dir, job["initial_image_path"])
+    job.setdefault("name", f"job_{index}")
+    return job
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Read a JSON or JSON Lines manifest into a list of jobs"""
+    with open(manifest_path, "r") as f:
+        content = f.read()
+    try:
+        entries = json.loads(content)
+    except ValueError:
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    if not isinstance(entries, list):
+        entries = [entries]
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    return [_job_from_entry(entry, base_dir, i) for i, entry in enumerate(entries, 1)]
+
+
+def collect_jobs(script_dir: Optional[str] = None, manifest_path: Optional[str] = None,
+                 random_scripts: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build the job list of a batch.
+
+    Args:
+        script_dir (str): Directory whose .txt files are scripts, one job each
+        manifest_path (str): Manifest file (see module docstring)
+        random_scripts (int): Number of jobs that generate a random script
+
+    Returns:
+        list: Jobs with a unique name and one of script_file, script_text or random_script
+    """
+    jobs = []
+    if script_dir:
+        for filename in sorted(os.listdir(script_dir)):
+            if filename.endswith(".txt"):
+                jobs.append({"name": os.path.splitext(filename)[0], "script_file": os.path.join(script_dir, filename)})
+    if manifest_path:
+        jobs.extend(load_manifest(manifest_path))
+    for i in range(1, random_scripts + 1):
+        jobs.append({"name": f"random_{i}", "random_script": True})
+
+    # Names identify jobs in the summary and name their output directories, so make them
+    # unique; a suffixed name must not collide with any other job's name either
+    original_names = {job["name"] for job in jobs}
+    assigned = set()
+    for job in jobs:
+        name = job["name"]
+        if name in assigned:
+            suffix = 2
+            while f"{name}_{suffix}" in assigned or f"{name}_{suffix}" in original_names:
+                suffix += 1
+            name = job["name"] = f"{name}_{suffix}"
+        assigned.add(name)
+    return jobs
+
+
+def run_job(job: Dict[str, Any], defaults: Dict[str, Any], batch_dir: str,
+            task_slots: threading.Semaphore) -> Dict[str, Any]:
+    """
+    Run one job of the batch.
+
+    Returns:
+        dict: Summary entry of the job (name, status, video_dir, final_video, error, timings)
+    """
+    import video_generation
+
+    options = dict(defaults)
+    options.update({key: value for key, value in job.items() if key in JOB_OPTIONS})
+    entry = {
+        "name": job["name"],
+        "source": job.get("script_file") or ("random_script" if job.get("random_script") else "script_text"),
+        "status": "running",
+        "video_dir": None,
+        "final_video": None,
+        "error": None
+    }
+    start_time = time.monotonic()
+    ctx = None
+    try:
+        ctx = video_generation.new_run_context(
+            output_dir=batch_dir, task_slots=task_slots, config=dict(options, name=job["name"])
+        )
+        entry["video_dir"] = ctx.video_dir
+
+        if job.get("random_script"):
+            with ctx.stage("random_script"):
+                script = video_generation.generate_random_script_for_run(ctx, options.get("model_choice", "gemini"))
+        elif job.get("script_file"):
+            with open(job["script_file"], "r") as f:
+                script = f.read()
+        else:
+            script = job["script_text"]
+
+        scenes_json, final_video = video_generation.generate_video(script, ctx=ctx, **options)
+        if final_video or options.get("metadata_only"):
+            entry["status"] = "completed"
+            entry["final_video"] = final_video
+        else:
+            entry["status"] = "failed"
+            entry["error"] = scenes_json
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = str(e)
+
+    entry["duration_seconds"] = round(time.monotonic() - start_time, 3)
+    entry["stage_seconds"] = dict(ctx.metrics) if ctx else {}
+    return entry
+
+
+def _write_summary(batch_dir: str, summary: Dict[str, Any]):
+    temp_path = os.path.join(batch_dir, f"{SUMMARY_FILE}.tmp")
+    with open(temp_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(temp_path, os.path.join(batch_dir, SUMMARY_FILE))
+
+
+def run_batch(jobs: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None,
+              output_dir: str = "generated_videos", batch_jobs: int = DEFAULT_BATCH_JOBS,
+              task_budget: int = DEFAULT_TASK_BUDGET) -> Dict[str, Any]:
+    """
+    Run a batch of jobs and write batch_summary.json.
+
+    Args:
+        jobs (list): Jobs from collect_jobs
+        defaults (dict): generate_video arguments applied to every job
+        output_dir (str): Directory the batch directory is created in
+        batch_jobs (int): Scripts processed at the same time
+        task_budget (int): Generation tasks running at the same time across all jobs
+
+    Returns:
+        dict: The summary, also saved in the batch directory
+    """
+    import video_generation
+
+    defaults = defaults or {}
+    batch_dir = os.path.join(output_dir, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(batch_dir, exist_ok=True)
+    task_slots = threading.Semaphore(max(1, task_budget))
+
+    summary = {
+        "batch_dir": batch_dir,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "batch_jobs": batch_jobs,
+        "task_budget": task_budget,
+        "defaults": defaults,
+        "jobs": [{"name": job["name"], "status": "queued"} for job in jobs]
+    }
+    index_by_name = {job["name"]: i for i, job in enumerate(jobs)}
+    _write_summary(batch_dir, summary)
+
+    print(f"Running {len(jobs)} jobs in {batch_dir}: {batch_jobs} at a time, {task_budget} generation tasks at most")
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, batch_jobs)) as executor:
+        futures = {executor.submit(run_job, job, defaults, batch_dir, task_slots): job for job in jobs}
+        for future in as_completed(futures):
+            entry = future.result()
+            summary["jobs"][index_by_name[entry["name"]]] = entry
+            print(f"Job {entry['name']} {entry['status']} in {entry['duration_seconds']:.0f}s"
+                  + (f": {entry['error']}" if entry["error"] else ""))
+            _write_summary(batch_dir, summary)
+
+    summary["duration_seconds"] = round(time.monotonic() - start_time, 3)
+    summary["completed"] = sum(1 for entry in summary["jobs"] if entry["status"] == "completed")
+    summary["failed"] = sum(1 for entry in summary["jobs"] if entry["status"] == "failed")
+    summary["cache_stats"] = {
+        "llm": video_generation.llm_cache.default_cache.stats(),
+        "sound_effects": video_generation.sound_effect_cache.stats(),
+        "speech": video_generation.eleven_labs_tts.speech_cache.stats()
+    }
+    summary["rate_limiter_stats"] = video_generation.rate_limiter.default_registry.stats()
+    summary["polling_stats"] = video_generation.polling.default_metrics.stats()
+    _write_summary(batch_dir, summary)
+    return summary
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"\nBatch finished in {summary['duration_seconds']:.0f}s: "
+          f"{summary['completed']} completed, {summary['failed']} failed")
+    for entry in summary["jobs"]:
+        output = entry.get("final_video") or entry.get("video_dir") or ""
+        print(f"  {entry['name']:<30} {entry['status']:<10} {entry.get('duration_seconds', 0):>8.0f}s  {output}")
+        if entry.get("error"):
+            print(f"    Error: {entry['error']}")
+    print(f"Summary saved to: {os.path.join(summary['batch_dir'], SUMMARY_FILE)}")
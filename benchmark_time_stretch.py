@@ -0,0 +1,112 @@
+"""
+Benchmark the narration time-stretch: MoviePy set_make_frame resampling vs audio_processing (WSOLA).
+
+For every speed factor both paths write the stretched audio to an mp3, and the
+script reports the wall time and the dominant frequency of the result. The
+input's frequency is kept by WSOLA and scaled by the speed factor by resampling.
+
+Usage:
+    python benchmark_time_stretch.py --input narration_audio.mp3 --ratios 0.7 1.0 1.4
+    python benchmark_time_stretch.py --seconds 60    # synthetic 220 Hz voice-like tone
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+from moviepy.editor import AudioFileClip
+
+from audio_processing import decode_audio, encode_audio, stretch_to_duration, time_stretch
+from ffmpeg_stitcher import AUDIO_SAMPLE_RATE
+
+
+def synthetic_voice(path, seconds, sample_rate=AUDIO_SAMPLE_RATE):
+    """A 220 Hz tone with harmonics and a syllable-like 4 Hz envelope"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = sum(np.sin(2 * np.pi * 220 * n * t) / n for n in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    encode_audio((0.2 * tone * envelope).astype(np.float32), path, sample_rate)
+    return path
+
+
+def dominant_frequency(path, sample_rate=AUDIO_SAMPLE_RATE):
+    samples = decode_audio(path, sample_rate, channels=1)[:, 0]
+    middle = samples[len(samples) // 4:len(samples) // 4 + 4 * sample_rate]
+    spectrum = np.abs(np.fft.rfft(middle * np.hanning(len(middle))))
+    return np.argmax(spectrum) * sample_rate / len(middle)
+
+
+def moviepy_stretch(input_path, output_path, target_duration):
+    """
+    The previous narration path of generate_narration_audio.
+
+    Returns:
+        tuple: (seconds rendering the stretched samples, seconds rendering and writing the mp3)
+    """
+    audio = AudioFileClip(input_path)
+    speed_factor = audio.duration / target_duration
+    adjusted_audio = audio.set_make_frame(lambda t: audio.get_frame(speed_factor * t))
+    adjusted_audio.duration = target_duration
+
+    start = time.perf_counter()
+    for _ in adjusted_audio.iter_chunks(fps=AUDIO_SAMPLE_RATE, chunksize=50000):
+        pass
+    render_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    adjusted_audio.write_audiofile(output_path, fps=AUDIO_SAMPLE_RATE, logger=None)
+    total_seconds = time.perf_counter() - start
+    audio.close()
+    adjusted_audio.close()
+    return render_seconds, total_seconds
+
+
+def wsola_render_seconds(input_path, target_duration):
+    """Seconds spent decoding and stretching with audio_processing, before encoding"""
+    start = time.perf_counter()
+    samples = decode_audio(input_path, channels=1)
+    time_stretch(samples, len(samples) / (target_duration * AUDIO_SAMPLE_RATE))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark narration time-stretching")
+    parser.add_argument("--input", type=str, help="Audio file to stretch (default: synthetic tone)")
+    parser.add_argument("--seconds", type=float, default=60, help="Length of the synthetic tone")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.7, 0.85, 1.0, 1.2, 1.4],
+                        help="Speed factors (original duration / target duration)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="time_stretch_")
+    try:
+        input_path = args.input or synthetic_voice(os.path.join(work_dir, "input.mp3"), args.seconds)
+        duration = len(decode_audio(input_path, channels=1)) / AUDIO_SAMPLE_RATE
+        input_frequency = dominant_frequency(input_path)
+        print(f"Input: {input_path} ({duration:.1f}s, dominant frequency {input_frequency:.1f} Hz)\n")
+        print("Render: stretched samples in memory. Total: render and encode to mp3.\n")
+        print(f"{'ratio':>6} {'render s':>20} {'total s':>20} {'dominant Hz':>20}")
+        print(f"{'':>6} {'moviepy':>9} {'wsola':>10} {'moviepy':>9} {'wsola':>10} {'moviepy':>9} {'wsola':>10}")
+
+        for ratio in args.ratios:
+            target_duration = duration / ratio
+            moviepy_path = os.path.join(work_dir, f"moviepy_{ratio}.mp3")
+            wsola_path = os.path.join(work_dir, f"wsola_{ratio}.mp3")
+
+            moviepy_render, moviepy_total = moviepy_stretch(input_path, moviepy_path, target_duration)
+
+            wsola_render = wsola_render_seconds(input_path, target_duration)
+            start = time.perf_counter()
+            stretch_to_duration(input_path, wsola_path, target_duration)
+            wsola_total = time.perf_counter() - start
+
+            print(f"{ratio:>6.2f} {moviepy_render:>9.2f} {wsola_render:>10.2f} {moviepy_total:>9.2f} {wsola_total:>10.2f} "
+                  f"{dominant_frequency(moviepy_path):>9.1f} {dominant_frequency(wsola_path):>10.1f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
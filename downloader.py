@@ -0,0 +1,304 @@
+"""
+Streaming, resumable downloads of generated assets.
+
+Luma and FAL return the generated videos and images as URLs. Every download
+goes through download(), which:
+
+- reuses pooled connections from one shared requests.Session,
+- streams the body in chunks to output_path.part and renames it over
+  output_path only once it is complete, so a crash never leaves a truncated
+  video behind under the final name,
+- retries transient failures (connection errors, timeouts, HTTP 429/5xx) with
+  back-off, continuing from the bytes already on disk with an HTTP Range
+  request instead of starting over; a .part file left by an earlier process is
+  continued the same way when it belongs to the same asset (see below),
+- checks the result against the size announced by the server or an expected
+  size, and against an expected SHA-256 when one is given,
+- optionally fetches large files as several ranges in parallel.
+
+A partial file belongs to its destination path, not to the URL: Luma signs a
+new URL every time a generation is fetched again, so a resumed run never sees
+the URL of the interrupted download. Next to output_path.part, download()
+records the resume_key given by the caller (e.g. the generation id) and the full
+size of the asset. The partial file is continued when the resume_key matches
+(or, without one, when the URL matches or a full size was recorded), and is
+discarded when the size in the server's Content-Range differs from the recorded
+one.
+
+Configuration:
+    DOWNLOAD_PARALLEL_PARTS  Ranges fetched at the same time for large files (default: 1, off)
+    DOWNLOAD_MAX_ATTEMPTS    Attempts per download or range (default: 5)
+
+Usage:
+    from downloader import download
+    download(generation.assets.video, video_path)
+    download(url, path, expected_size=1048576, sha256="9f86d0...", parallel=4)
+    download(generation.assets.video, video_path, resume_key=generation.id)
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from polling import BackoffSchedule
+
+# Load environment variables
+load_dotenv()
+
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 32
+TIMEOUT = (30, 300)  # (connect, read) seconds
+MAX_ATTEMPTS = int(os.getenv("DOWNLOAD_MAX_ATTEMPTS", "5"))
+PARALLEL_PARTS = int(os.getenv("DOWNLOAD_PARALLEL_PARTS", "1"))
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRY_SCHEDULE = BackoffSchedule(initial=1.0, factor=2.0, max_interval=30.0)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class DownloadError(IOError):
+    """Raised when a download fails or does not match the expected size or checksum"""
+
+
+class _TransientError(Exception):
+    pass
+
+
+def get_session() -> requests.Session:
+    """Shared session with a connection pool large enough for parallel downloads"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # Byte ranges and sizes refer to the body as stored, so never ask for compression
+            session.headers["Accept-Encoding"] = "identity"
+            _session = session
+    return _session
+
+
+def _total_size(response: requests.Response) -> Optional[int]:
+    """Full size of the resource from Content-Range, or Content-Length of a full response"""
+    content_range = response.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    if response.status_code == 200 and response.headers.get("Content-Length", "").isdigit():
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def _size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _fetch_range(url: str, path: str, start: int = 0, end: Optional[int] = None,
+                 max_attempts: int = MAX_ATTEMPTS, expected_total: Optional[int] = None,
+                 on_total: Optional[Callable[[int], None]] = None) -> Optional[int]:
+    """
+    Write bytes start..end (inclusive, end None = to the end) of url to path,
+    continuing after the bytes path already holds.
+
+    Args:
+        expected_total (int): Full size of the asset the bytes in path came from; they are
+                              discarded when the server reports another size
+        on_total (callable): Called with the full size as soon as the server reports it
+
+    Returns:
+        Optional[int]: Full size of the resource as reported by the server, if known
+    """
+    total = None
+    for attempt in range(max_attempts):
+        offset = start + _size(path)
+        if end is not None and offset > end:
+            return total
+        headers = {}
+        if offset > 0 or end is not None:
+            headers["Range"] = f"bytes={offset}-{'' if end is None else end}"
+
+        try:
+            with get_session().get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                if response.status_code == 416 and end is None:
+                    # Nothing left after offset: the partial file is complete if it has the full size
+                    total = _total_size(response)
+                    if total == offset and expected_total in (None, total):
+                        return total
+                    _discard(path)
+                    continue
+                if response.status_code in RETRY_STATUS_CODES:
+                    raise _TransientError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+
+                total = _total_size(response)
+                if offset > start and response.status_code == 206 and None not in (expected_total, total) \
+                        and total != expected_total:
+                    # The bytes on disk came from another asset written to the same path
+                    print(f"Discarding partial download of {os.path.basename(path)}: "
+                          f"size changed from {expected_total} to {total} bytes")
+                    _discard(path)
+                    expected_total = None
+                    continue
+                if total is not None and on_total:
+                    on_total(total)
+
+                mode = "ab"
+                if headers and response.status_code != 206:
+                    # The server ignored the range and sent the whole resource
+                    if start > 0 or end is not None:
+                        raise DownloadError(f"Server does not support range requests for {url}")
+                    mode = "wb"
+                elif offset > start:
+                    print(f"Resuming download of {os.path.basename(path)} at byte {offset}")
+
+                with open(path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+            return total
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                _TransientError) as e:
+            if attempt == max_attempts - 1:
+                raise DownloadError(f"Download of {url} failed after {max_attempts} attempts: {str(e)}") from e
+            delay = RETRY_SCHEDULE.interval(attempt)
+            print(f"Download interrupted ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    raise DownloadError(f"Download of {url} failed after {max_attempts} attempts")
+
+
+def _probe(url: str) -> Tuple[Optional[int], bool]:
+    """Size of the resource and whether the server serves byte ranges"""
+    with get_session().get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        return _total_size(response), response.status_code == 206
+
+
+def _fetch_parallel(url: str, part_path: str, total: int, parts: int):
+    """Fetch total bytes of url as parts ranges in parallel, then join them into part_path"""
+    bounds = [(i * total // parts, (i + 1) * total // parts - 1) for i in range(parts)]
+    piece_paths = [f"{part_path}.{i}" for i in range(parts)]
+    with ThreadPoolExecutor(max_workers=parts) as executor:
+        futures = [executor.submit(_fetch_range, url, piece_path, start, end)
+                   for piece_path, (start, end) in zip(piece_paths, bounds)]
+        for future in futures:
+            future.result()
+
+    with open(part_path, "wb") as f:
+        for piece_path in piece_paths:
+            with open(piece_path, "rb") as piece:
+                shutil.copyfileobj(piece, f, CHUNK_SIZE)
+    for piece_path in piece_paths:
+        os.remove(piece_path)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _discard(*paths: str):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _load_part_meta(meta_path: str) -> Dict[str, Any]:
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_resumable(meta: Dict[str, Any], url: str, resume_key: Optional[str]) -> bool:
+    """Whether a partial file with this metadata belongs to the asset being downloaded"""
+    if not meta:
+        return False
+    if resume_key is not None or meta.get("key") is not None:
+        return meta.get("key") == resume_key
+    return meta.get("url") == url or meta.get("total") is not None
+
+
+def download(url: str, output_path: str, expected_size: Optional[int] = None,
+             sha256: Optional[str] = None, parallel: Optional[int] = None,
+             resume_key: Optional[str] = None) -> str:
+    """
+    Download url to output_path (see module docstring).
+
+    Args:
+        url (str): URL of the asset
+        output_path (str): Destination file; replaced atomically when the download is complete
+        expected_size (int): Size in bytes the file must have
+        sha256 (str): Hex SHA-256 digest the file must have
+        parallel (int): Ranges to fetch in parallel for files of at least 8 MiB (default: DOWNLOAD_PARALLEL_PARTS)
+        resume_key (str): Identifies the asset across URLs (e.g. a generation id), so a partial
+                          file left by an interrupted download is continued
+
+    Returns:
+        str: output_path
+
+    Raises:
+        DownloadError: When the download keeps failing or the file does not verify
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    part_path = f"{output_path}.part"
+    meta_path = f"{part_path}.json"
+    # A partial file is only continued when it belongs to the same asset
+    meta = _load_part_meta(meta_path)
+    if not _is_resumable(meta, url, resume_key):
+        _discard(part_path, *[f"{part_path}.{i}" for i in range(max(PARALLEL_PARTS, parallel or 1))])
+        meta = {}
+    recorded_total = meta.get("total")
+
+    def save_meta(total: Optional[int] = None):
+        with open(meta_path, "w") as f:
+            json.dump({"url": url, "key": resume_key, "total": total}, f)
+
+    save_meta(recorded_total)
+
+    total = None
+    parallel = PARALLEL_PARTS if parallel is None else parallel
+    if parallel > 1 and not os.path.exists(part_path):
+        try:
+            total, accepts_ranges = _probe(url)
+            if accepts_ranges and total and total >= PARALLEL_MIN_BYTES:
+                if recorded_total not in (None, total):
+                    # Ranges left by an interrupted parallel download of another asset
+                    _discard(*[f"{part_path}.{i}" for i in range(parallel)])
+                save_meta(total)
+                _fetch_parallel(url, part_path, total, parallel)
+        except (requests.RequestException, DownloadError) as e:
+            print(f"Warning: Parallel download failed, downloading sequentially: {str(e)}")
+            _discard(part_path, *[f"{part_path}.{i}" for i in range(parallel)])
+    if not os.path.exists(part_path) or total is None:
+        total = _fetch_range(url, part_path, expected_total=recorded_total, on_total=save_meta) or total
+
+    size = _size(part_path)
+    expected_size = expected_size if expected_size is not None else total
+    if expected_size is not None and size != expected_size:
+        _discard(part_path, meta_path)
+        raise DownloadError(f"Downloaded {size} bytes of {url}, expected {expected_size}")
+    if sha256 and _sha256(part_path) != sha256.lower():
+        _discard(part_path, meta_path)
+        raise DownloadError(f"Checksum mismatch for {url}")
+
+    os.replace(part_path, output_path)
+    _discard(meta_path)
+    return output_path
@@ -1,19 +1,36 @@
 from elevenlabs import ElevenLabs
 import os
+from asset_cache import AssetCache, ASSET_CACHE_DIR
+from rate_limiter import get_limiter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+DEFAULT_VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"
+DEFAULT_MODEL_ID = "eleven_multilingual_v2"
+DEFAULT_OUTPUT_FORMAT = "mp3_44100_128"
 
-def generate_speech(text, output_path="output.mp3", voice_id="JBFqnCBsd6RMkjVDRZzb"):
+# Identical speech and sound effect requests are served from disk instead of calling ElevenLabs again
+speech_cache = AssetCache(os.path.join(ASSET_CACHE_DIR, "speech"), extension=".mp3")
+sound_effect_cache = AssetCache(os.path.join(ASSET_CACHE_DIR, "sound_effects"), extension=".mp3")
+
+
+def generate_speech(text, output_path="output.mp3", voice_id=DEFAULT_VOICE_ID, model_id=DEFAULT_MODEL_ID, output_format=DEFAULT_OUTPUT_FORMAT, use_cache=True):
     """
     Generate speech from text using ElevenLabs API
     
+    Results are cached by (text, voice_id, model_id, output_format), so regenerating
+    identical narration returns the cached mp3 without an API call. Audio chunks are
+    written to disk as they arrive instead of being buffered in memory.
+    
     Args:
         text (str): The text to convert to speech
         output_path (str): Path where the audio file will be saved
         voice_id (str): ID of the voice to use
+        model_id (str): ElevenLabs model to use
+        output_format (str): ElevenLabs output format
+        use_cache (bool): Whether to reuse and store cached speech
     
     Returns:
         bool: True if successful, False otherwise
@@ -22,25 +39,44 @@ def generate_speech(text, output_path="output.mp3", voice_id="JBFqnCBsd6RMkjVDRZ
         print("Error generating speech: Empty text provided")
         return False
 
+    cache_key = speech_cache.make_key(text=text, voice_id=voice_id, model_id=model_id, output_format=output_format)
+    if use_cache and speech_cache.fetch(cache_key, output_path):
+        print(f"Reused cached speech audio: {output_path}")
+        return True
+
+    temp_path = f"{output_path}.part"
     try:
-        client = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
-        audio = client.text_to_speech.convert(
-            voice_id=voice_id,
-            output_format="mp3_44100_128",
-            text=text,
-            model_id="eleven_multilingual_v2"
-        )
+        def download_speech():
+            client = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY"))
+            audio = client.text_to_speech.convert(
+                voice_id=voice_id,
+                output_format=output_format,
+                text=text,
+                model_id=model_id
+            )
+            
+            # Stream the audio chunks to disk as they arrive, then move the file into place
+            with open(temp_path, 'wb') as f:
+                for chunk in audio:
+                    if chunk:
+                        f.write(chunk)
+            os.replace(temp_path, output_path)
         
-        # Convert the generator to bytes
-        audio_data = b"".join(audio)
+        get_limiter("elevenlabs", "text-to-speech").call(download_speech)
         
-        # Save the audio to a file
-        with open(output_path, 'wb') as f:
-            f.write(audio_data)
+        if use_cache:
+            speech_cache.store(cache_key, output_path, metadata={
+                "voice_id": voice_id,
+                "model_id": model_id,
+                "output_format": output_format,
+                "characters": len(text)
+            })
         return True
     
     except Exception as e:
         print(f"Error generating speech: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         return False
 
 # Example usage:
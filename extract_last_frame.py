@@ -2,6 +2,8 @@ import os
 from moviepy.editor import VideoFileClip
 import cv2
 import sys
+import time
+from frame_extraction import extract_last_frame
 
 def test_moviepy_extraction(video_path):
     """Test frame extraction using MoviePy"""
@@ -53,6 +55,22 @@ def test_opencv_extraction(video_path):
         print(f"OpenCV extraction failed: {str(e)}")
         return False
 
+def test_tail_decode_extraction(video_path):
+    """Test frame extraction by seeking before the end and decoding only the tail"""
+    print("\nTesting tail decode extraction...")
+    try:
+        start_time = time.time()
+        frame_bytes = extract_last_frame(video_path)
+        print(f"Extracted {len(frame_bytes)} bytes in {time.time() - start_time:.3f} seconds")
+        
+        with open("last_frame_tail.jpg", "wb") as f:
+            f.write(frame_bytes)
+        print("Successfully saved frame to: last_frame_tail.jpg")
+        return True
+    except Exception as e:
+        print(f"Tail decode extraction failed: {str(e)}")
+        return False
+
 def print_video_info(video_path):
     """Print basic video file information"""
     print("\nVideo File Information:")
@@ -70,14 +88,16 @@ def main():
     # Print video information
     print_video_info(video_path)
     
-    # Test both methods
+    # Test all methods
     moviepy_success = test_moviepy_extraction(video_path)
     opencv_success = test_opencv_extraction(video_path)
+    tail_success = test_tail_decode_extraction(video_path)
     
     # Summary
     print("\nResults Summary:")
     print(f"MoviePy extraction: {'Success' if moviepy_success else 'Failed'}")
     print(f"OpenCV extraction: {'Success' if opencv_success else 'Failed'}")
+    print(f"Tail decode extraction: {'Success' if tail_success else 'Failed'}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
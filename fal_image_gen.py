@@ -1,6 +1,7 @@
 import os
-import requests
 import fal_client
+from rate_limiter import get_limiter
+from downloader import download
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -29,7 +30,8 @@ def generate_image(prompt, output_dir="generated_images"):
         
         # Start the generation
         print("Starting image generation...")
-        result = fal_client.subscribe(
+        result = get_limiter("fal", "fal-ai/sana").call(
+            fal_client.subscribe,
             "fal-ai/sana",
             arguments={
                 "prompt": prompt
@@ -51,11 +53,7 @@ def generate_image(prompt, output_dir="generated_images"):
         filepath = os.path.join(output_dir, filename)
         
         # Download the image
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        with open(filepath, 'wb') as file:
-            file.write(response.content)
+        download(image_url, filepath)
             
         if not os.path.exists(filepath):
             print(f"Failed to save image to {filepath}")
@@ -1,7 +1,7 @@
 import os
-import requests
 import fal_client
 from dotenv import load_dotenv
+from downloader import download
 
 class FalLoraInference:
     def __init__(self):
@@ -33,13 +33,11 @@ class FalLoraInference:
         return result
 
     def download_image(self, image_url, output_path):
-        response = requests.get(image_url)
-        if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+        try:
+            download(image_url, output_path)
             print(f"Image downloaded and saved to {output_path}")
-        else:
-            print(f"Failed to download image. Status code: {response.status_code}")
+        except Exception as e:
+            print(f"Failed to download image: {str(e)}")
 
     def run_inference(self, prompt, lora_path, output_path):
         result = self.generate_image(prompt, lora_path)
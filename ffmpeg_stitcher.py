@@ -0,0 +1,299 @@
+"""
+Stream-copy stitching engine built on ffmpeg.
+
+Luma and LTX segments share codec, resolution and frame rate, so concatenating
+them does not need a decode/re-encode pass through MoviePy. This module probes
+the inputs and, when they are compatible, joins the video tracks with ffmpeg's
+concat demuxer and stream copy. Only the audio track (sound effects and
+narration) is re-encoded.
+
+render_preview() is the cheap counterpart for reviewing pacing: it scales the
+scenes down to PREVIEW_HEIGHT and encodes them with a fast x264 preset at a
+high CRF, optionally burning a scene-number label into every scene.
+
+The ffmpeg binary is taken from PATH, or from imageio-ffmpeg (installed with
+MoviePy) when it is not on PATH. Final videos are assembled with these building
+blocks by incremental_assembler, which normalizes scenes whose streams differ
+and keeps the MoviePy path as the fallback when ffmpeg fails.
+
+Usage:
+    from ffmpeg_stitcher import can_stream_copy, concat_stream_copy, mux_pcm_audio
+    if can_stream_copy(video_files):
+        concat_stream_copy(video_files, output_path)          # video only
+        mux_pcm_audio(video_files, samples, output_path)      # with a mixed soundtrack
+"""
+
+import os
+import re
+import json
+import shutil
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_BITRATE = "192k"
+SOUND_EFFECT_VOLUME = 0.7
+NARRATION_VOLUME = 1.0
+PREVIEW_HEIGHT = 360
+PREVIEW_FPS = 24
+PREVIEW_PRESET = "ultrafast"
+PREVIEW_CRF = 32
+PREVIEW_AUDIO_BITRATE = "64k"
+
+
+def get_ffmpeg_exe() -> Optional[str]:
+    """Return the path of an ffmpeg binary, or None if none is available"""
+    ffmpeg_exe = shutil.which("ffmpeg")
+    if ffmpeg_exe:
+        return ffmpeg_exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def run_ffmpeg(args: List[str], input_bytes: Optional[bytes] = None):
+    """Run ffmpeg quietly with args, feeding input_bytes to stdin; raises RuntimeError on failure"""
+    ffmpeg_exe = get_ffmpeg_exe()
+    if not ffmpeg_exe:
+        raise RuntimeError("ffmpeg is not available")
+    result = subprocess.run([ffmpeg_exe, "-y", "-hide_banner", "-loglevel", "error"] + args,
+                            input=input_bytes, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def _parse_frame_rate(rate: str) -> float:
+    if not rate or rate == "0/0":
+        return 0.0
+    if "/" in rate:
+        numerator, denominator = rate.split("/")
+        return float(numerator) / float(denominator) if float(denominator) else 0.0
+    return float(rate)
+
+
+def probe_video(video_path: str) -> Dict:
+    """
+    Read the stream parameters that decide whether a file can be stream-copied.
+
+    Uses ffprobe when available and otherwise parses the stream summary that
+    `ffmpeg -i` prints.
+
+    Returns:
+        dict: codec, profile, width, height, pix_fmt, fps, duration and has_audio
+    """
+    ffprobe_exe = shutil.which("ffprobe")
+    if ffprobe_exe:
+        result = subprocess.run(
+            [ffprobe_exe, "-v", "error", "-show_streams", "-show_format", "-of", "json", video_path],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed for {video_path}: {result.stderr.strip()}")
+        data = json.loads(result.stdout)
+        video_streams = [s for s in data.get("streams", []) if s.get("codec_type") == "video"]
+        if not video_streams:
+            raise RuntimeError(f"No video stream found in {video_path}")
+        stream = video_streams[0]
+        return {
+            "codec": stream.get("codec_name"),
+            "profile": stream.get("profile"),
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "pix_fmt": stream.get("pix_fmt"),
+            "fps": _parse_frame_rate(stream.get("avg_frame_rate") or stream.get("r_frame_rate")),
+            "duration": float(stream.get("duration") or data.get("format", {}).get("duration") or 0),
+            "has_audio": any(s.get("codec_type") == "audio" for s in data.get("streams", []))
+        }
+
+    ffmpeg_exe = get_ffmpeg_exe()
+    if not ffmpeg_exe:
+        raise RuntimeError("ffmpeg is not available")
+    # ffmpeg exits with an error because no output is given; the stream summary is still printed
+    output = subprocess.run([ffmpeg_exe, "-hide_banner", "-i", video_path], capture_output=True, text=True).stderr
+
+    video_match = re.search(r"Stream #\d+:\d+.*?: Video: (\w+)(?: \(([^)]*)\))?[^,]*, (\w+)", output)
+    size_match = re.search(r"Stream #\d+:\d+.*?: Video: .*?, (\d{2,5})x(\d{2,5})", output)
+    if not video_match or not size_match:
+        raise RuntimeError(f"No video stream found in {video_path}")
+    fps_match = re.search(r"Stream #\d+:\d+.*?: Video: .*?([\d.]+) fps", output)
+    duration_match = re.search(r"Duration: (\d+):(\d+):([\d.]+)", output)
+    duration = 0.0
+    if duration_match:
+        hours, minutes, seconds = duration_match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    return {
+        "codec": video_match.group(1),
+        "profile": video_match.group(2),
+        "width": int(size_match.group(1)),
+        "height": int(size_match.group(2)),
+        "pix_fmt": video_match.group(3),
+        "fps": float(fps_match.group(1)) if fps_match else 0.0,
+        "duration": duration,
+        "has_audio": re.search(r"Stream #\d+:\d+.*?: Audio: ", output) is not None
+    }
+
+
+def streams_compatible(probes: List[Dict]) -> bool:
+    """Check that all video streams share codec, profile, resolution, pixel format and frame rate"""
+    if not probes:
+        return False
+    reference = probes[0]
+    for probe in probes[1:]:
+        for key in ("codec", "profile", "width", "height", "pix_fmt"):
+            if probe[key] != reference[key]:
+                return False
+        if abs(probe["fps"] - reference["fps"]) > 0.01:
+            return False
+    return True
+
+
+def can_stream_copy(video_files: List[str]) -> bool:
+    """Return True when ffmpeg is available and the video files can be joined without re-encoding"""
+    if not video_files or not get_ffmpeg_exe():
+        return False
+    try:
+        return streams_compatible([probe_video(video_file) for video_file in video_files])
+    except Exception as e:
+        print(f"Warning: Could not probe videos for stream copy: {str(e)}")
+        return False
+
+
+def _write_concat_list(video_files: List[str], list_dir: str) -> str:
+    list_path = os.path.join(list_dir, "concat_list.txt")
+    with open(list_path, "w") as f:
+        for video_file in video_files:
+            escaped_path = os.path.abspath(video_file).replace("'", "'\\''")
+            f.write(f"file '{escaped_path}'\n")
+    return list_path
+
+
+def concat_stream_copy(video_files: List[str], output_path: str, keep_audio: bool = False) -> str:
+    """
+    Join compatible video files with the concat demuxer without re-encoding.
+
+    Args:
+        video_files (list): Paths of the videos to join, in order
+        output_path (str): Path of the joined video
+        keep_audio (bool): Copy the audio tracks too (they must be compatible as well)
+
+    Returns:
+        str: output_path
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        list_path = _write_concat_list(video_files, temp_dir)
+        args = ["-f", "concat", "-safe", "0", "-i", list_path, "-map", "0:v"]
+        if keep_audio:
+            args += ["-map", "0:a?"]
+        else:
+            args += ["-an"]
+        run_ffmpeg(args + ["-c", "copy", "-movflags", "+faststart", output_path])
+    return output_path
+
+
+def mux_pcm_audio(video_files: List[str], samples, output_path: str, sample_rate: int = AUDIO_SAMPLE_RATE) -> str:
+    """
+    Join compatible videos with stream copy and add a float32 PCM buffer as their AAC audio track.
+
+    Args:
+        video_files (list): Paths of the videos to join, in order
+        samples (np.ndarray): float32 samples of shape (samples, channels), piped to ffmpeg
+        output_path (str): Path of the joined video
+        sample_rate (int): Sample rate of samples
+
+    Returns:
+        str: output_path
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        list_path = _write_concat_list(video_files, temp_dir)
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-f", "f32le", "-ar", str(sample_rate), "-ac", str(samples.shape[1]), "-i", "pipe:0",
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+            "-shortest", "-movflags", "+faststart",
+            output_path
+        ], input_bytes=samples.astype("<f4").tobytes())
+    return output_path
+
+
+def write_label_image(text: str, output_path: str, height: int = PREVIEW_HEIGHT) -> str:
+    """
+    Draw text on a translucent box into a PNG with alpha, sized for a video of the given height.
+
+    The label is drawn with OpenCV and burned in with ffmpeg's overlay filter, because
+    the ffmpeg builds shipped with imageio-ffmpeg do not include drawtext.
+
+    Returns:
+        str: output_path
+    """
+    import cv2
+    import numpy as np
+
+    font_scale = height / 450
+    thickness = max(1, round(height / 240))
+    padding = max(4, round(height / 60))
+    (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    image = np.zeros((text_height + baseline + 2 * padding, text_width + 2 * padding, 4), dtype=np.uint8)
+    image[:] = (0, 0, 0, 160)
+    cv2.putText(image, text, (padding, padding + text_height), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                (255, 255, 255, 255), thickness, cv2.LINE_AA)
+    if not cv2.imwrite(output_path, image):
+        raise RuntimeError(f"Could not write label image {output_path}")
+    return output_path
+
+
+def render_preview(video_files: List[str], samples, output_path: str, sample_rate: int = AUDIO_SAMPLE_RATE,
+                   height: int = PREVIEW_HEIGHT, labels: Optional[List[str]] = None) -> str:
+    """
+    Render a low-resolution, low-bitrate proxy of the joined videos with a float32 PCM soundtrack.
+
+    Every video is scaled into a frame of the given height and the aspect ratio of the first
+    video (letterboxed when its own aspect ratio differs) at PREVIEW_FPS, so inputs whose
+    streams differ can be joined too, then encoded with PREVIEW_PRESET at PREVIEW_CRF.
+
+    Args:
+        video_files (list): Paths of the videos to join, in order
+        samples (np.ndarray): float32 samples of shape (samples, channels), piped to ffmpeg
+        output_path (str): Path of the preview video
+        sample_rate (int): Sample rate of samples
+        height (int): Height of the preview in pixels
+        labels (list): Text burned into the top left corner of every video (e.g. "Scene 3"), or None
+
+    Returns:
+        str: output_path
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        args = []
+        for video_file in video_files:
+            args += ["-i", video_file]
+        audio_input = len(video_files)
+        args += ["-f", "f32le", "-ar", str(sample_rate), "-ac", str(samples.shape[1]), "-i", "pipe:0"]
+
+        first = probe_video(video_files[0])
+        width = max(2, round(height * first["width"] / first["height"] / 2) * 2)
+        margin = max(4, height // 30)
+        filters = []
+        for i in range(len(video_files)):
+            chain = (f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                     f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={PREVIEW_FPS}")
+            if labels:
+                label_path = write_label_image(labels[i], os.path.join(temp_dir, f"label_{i}.png"), height)
+                args += ["-i", label_path]
+                chain += f"[scaled{i}];[scaled{i}][{audio_input + 1 + i}:v]overlay={margin}:{margin}"
+            filters.append(f"{chain},format=yuv420p[v{i}]")
+        joined = "".join(f"[v{i}]" for i in range(len(video_files)))
+        filters.append(f"{joined}concat=n={len(video_files)}:v=1:a=0[video]")
+
+        run_ffmpeg(args + [
+            "-filter_complex", ";".join(filters),
+            "-map", "[video]", "-map", f"{audio_input}:a",
+            "-c:v", "libx264", "-preset", PREVIEW_PRESET, "-crf", str(PREVIEW_CRF),
+            "-c:a", "aac", "-b:a", PREVIEW_AUDIO_BITRATE,
+            "-shortest", "-movflags", "+faststart",
+            output_path
+        ], input_bytes=samples.astype("<f4").tobytes())
+    return output_path
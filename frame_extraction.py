@@ -0,0 +1,126 @@
+"""
+Fast last-frame extraction for chaining video segments.
+
+The last frame of every segment becomes the first frame of the next one, so
+extracting it sits on the critical path between chained segments. Seeking with
+CAP_PROP_POS_FRAMES to frame_count-1 is unreliable on long-GOP MP4s (the frame
+count is an estimate) and can decode far more than needed. Instead this module
+seeks by time to shortly before the end, which makes the decoder start at the
+last keyframe before that point, decodes forward through the tail only and
+keeps the last frame that decodes. MoviePy is used as a fallback, following the
+two strategies compared in extract_last_frame.py.
+
+The frame is returned as an encoded image buffer so it can be uploaded straight
+from memory.
+
+Usage:
+    from frame_extraction import extract_last_frame
+    jpeg_bytes = extract_last_frame("scene_1_vid_1.mp4")
+"""
+
+import cv2
+import numpy as np
+from typing import Optional
+
+DEFAULT_TAIL_SECONDS = 1.0
+DEFAULT_JPEG_QUALITY = 95
+
+
+def _read_tail_opencv(video_path: str, tail_seconds: float) -> Optional[np.ndarray]:
+    """Seek to shortly before the end and decode forward, returning the last decodable frame"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        if fps > 0 and frame_count > 0:
+            duration_ms = frame_count / fps * 1000
+            cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, duration_ms - tail_seconds * 1000))
+
+        last_frame = None
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            last_frame = frame
+        return last_frame
+    finally:
+        cap.release()
+
+
+def _read_last_frame_moviepy(video_path: str) -> Optional[np.ndarray]:
+    """Fallback: let MoviePy decode the frame one frame period before the end"""
+    from moviepy.editor import VideoFileClip
+
+    clip = VideoFileClip(video_path)
+    try:
+        fps = clip.fps or 24
+        frame = clip.get_frame(max(0.0, clip.duration - 1.0 / fps))
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    finally:
+        clip.close()
+
+
+def _is_valid_frame(frame: Optional[np.ndarray], expected_size=None) -> bool:
+    if frame is None or frame.size == 0 or frame.ndim != 3:
+        return False
+    if expected_size and (frame.shape[1], frame.shape[0]) != expected_size:
+        return False
+    return True
+
+
+def _get_video_size(video_path: str):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return (width, height) if width and height else None
+    finally:
+        cap.release()
+
+
+def extract_last_frame_array(video_path: str, tail_seconds: float = DEFAULT_TAIL_SECONDS) -> np.ndarray:
+    """
+    Return the last frame of a video as a BGR array.
+
+    Raises:
+        RuntimeError: If no valid frame could be decoded by either strategy
+    """
+    expected_size = _get_video_size(video_path)
+
+    frame = _read_tail_opencv(video_path, tail_seconds)
+    if _is_valid_frame(frame, expected_size):
+        return frame
+
+    print(f"Warning: OpenCV tail decode failed for {video_path}, falling back to MoviePy")
+    try:
+        frame = _read_last_frame_moviepy(video_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to extract last frame from video: {video_path}: {str(e)}")
+    if not _is_valid_frame(frame, expected_size):
+        raise RuntimeError(f"Failed to extract last frame from video: {video_path}")
+    return frame
+
+
+def extract_last_frame(video_path: str, image_format: str = ".jpg", quality: int = DEFAULT_JPEG_QUALITY,
+                       tail_seconds: float = DEFAULT_TAIL_SECONDS) -> bytes:
+    """
+    Return the last frame of a video as an encoded image buffer.
+
+    Args:
+        video_path (str): Path of the video
+        image_format (str): Image extension understood by cv2.imencode (default: .jpg)
+        quality (int): JPEG quality
+        tail_seconds (float): How far before the end to start decoding
+
+    Returns:
+        bytes: The encoded image
+    """
+    frame = extract_last_frame_array(video_path, tail_seconds)
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if image_format.lower() in (".jpg", ".jpeg") else []
+    ok, buffer = cv2.imencode(image_format, frame, params)
+    if not ok:
+        raise RuntimeError(f"Failed to encode last frame of video: {video_path}")
+    return buffer.tobytes()
@@ -0,0 +1,141 @@
+"""
+Frame handoff between chained video segments.
+
+The last frame of a segment has to be reachable by URL before the next segment
+can start. Uploading it to GCS and signing a URL is only needed for engines
+that fetch the keyframe from an arbitrary URL (Luma); FAL-hosted engines (LTX)
+accept files uploaded to FAL's own storage, which avoids the extra hop.
+
+Every handoff is keyed by the SHA-256 of the image bytes: GCS blobs are named
+after the hash, so uploads from different runs or segments never overwrite each
+other, and CachedFrameHandoff remembers the URL of every frame already handed
+off in this process so identical frames are uploaded once. get_frame_handoff
+returns the same cached handoff for every caller of an engine, so the cache
+spans scenes, resumes and runs in the process; a URL is reused while it is
+younger than FRAME_URL_MAX_AGE.
+
+Usage:
+    from frame_handoff import get_frame_handoff
+    frame_handoff = get_frame_handoff("ltx")
+    frame_url = frame_handoff.upload_bytes(jpeg_bytes, "scene_1_last_frame.jpg")
+"""
+
+import os
+import hashlib
+import mimetypes
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple, Type
+
+# Handed-off frame URLs (signed GCS URLs last 7 days) are reused while younger than this
+FRAME_URL_MAX_AGE = 6 * 24 * 3600
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _guess_content_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "image/jpeg"
+
+
+class FrameHandoff(ABC):
+    """Makes an image reachable by URL for the video engine"""
+
+    name = "base"
+
+    @abstractmethod
+    def upload_bytes(self, data: bytes, filename: str) -> str:
+        """Hand off the encoded image and return its URL"""
+
+    def upload_file(self, image_path: str) -> str:
+        with open(image_path, "rb") as f:
+            return self.upload_bytes(f.read(), os.path.basename(image_path))
+
+
+class GCSFrameHandoff(FrameHandoff):
+    """Uploads to the GCS bucket and returns a signed URL"""
+
+    name = "gcs"
+
+    def __init__(self, uploader=None):
+        self._uploader = uploader
+        self._lock = threading.Lock()
+
+    @property
+    def uploader(self):
+        # Created lazily so engines that never hand off through GCS do not need credentials
+        with self._lock:
+            if self._uploader is None:
+                from img_bucket import GCPImageUploader
+                self._uploader = GCPImageUploader()
+            return self._uploader
+
+    def upload_bytes(self, data: bytes, filename: str) -> str:
+        blob_name = f"{content_hash(data)[:16]}_{filename}"
+        return self.uploader.upload_bytes(data, blob_name, content_type=_guess_content_type(filename))
+
+
+class FalFrameHandoff(FrameHandoff):
+    """Uploads to FAL storage, which FAL-hosted models read directly"""
+
+    name = "fal"
+
+    def upload_bytes(self, data: bytes, filename: str) -> str:
+        import fal_client
+        return fal_client.upload(data, _guess_content_type(filename), file_name=filename)
+
+
+class CachedFrameHandoff(FrameHandoff):
+    """Wraps a handoff and reuses the URL of frames that were already handed off"""
+
+    def __init__(self, handoff: FrameHandoff, max_age: float = FRAME_URL_MAX_AGE):
+        self.handoff = handoff
+        self.name = handoff.name
+        self.max_age = max_age
+        self._urls: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def upload_bytes(self, data: bytes, filename: str) -> str:
+        key = content_hash(data)
+        with self._lock:
+            if key in self._urls and time.time() - self._urls[key][1] <= self.max_age:
+                self.hits += 1
+                return self._urls[key][0]
+            self.misses += 1
+
+        url = self.handoff.upload_bytes(data, filename)
+        with self._lock:
+            self._urls[key] = (url, time.time())
+        return url
+
+
+# Handoff per video engine: FAL storage for FAL-hosted models, GCS signed URLs otherwise
+ENGINE_HANDOFFS = {
+    "ltx": FalFrameHandoff,
+    "luma": GCSFrameHandoff,
+}
+
+# One cached handoff per handoff class, shared by every caller in the process
+_cached_handoffs: Dict[Type[FrameHandoff], CachedFrameHandoff] = {}
+_cached_handoffs_lock = threading.Lock()
+
+
+def get_frame_handoff(video_engine: str) -> FrameHandoff:
+    """
+    Return the shared frame handoff for a video engine, wrapped in the content-hash cache.
+
+    Args:
+        video_engine (str): Video generation engine ('luma' or 'ltx')
+
+    Returns:
+        FrameHandoff: Handoff whose upload_bytes/upload_file return a URL the engine can read
+    """
+    handoff_class = ENGINE_HANDOFFS.get(video_engine, GCSFrameHandoff)
+    with _cached_handoffs_lock:
+        if handoff_class not in _cached_handoffs:
+            _cached_handoffs[handoff_class] = CachedFrameHandoff(handoff_class())
+        return _cached_handoffs[handoff_class]
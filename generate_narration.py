@@ -1,8 +1,8 @@
 import os
 from datetime import datetime
 from elevenlabs import ElevenLabs
-from moviepy.editor import AudioFileClip
 from eleven_labs_tts import generate_speech
+from audio_processing import stretch_to_duration
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -37,29 +37,9 @@ def generate_narration_for_video(narration_text, target_duration, output_dir):
             raise RuntimeError("Failed to generate speech audio")
         
         if success:
-            # Load the generated audio to get its duration
-            audio = AudioFileClip(audio_path)
-            original_duration = audio.duration
-            
-            # Calculate the speed factor needed to match target duration
-            speed_factor = original_duration / target_duration
-            
-            print(f"Adjusting audio speed (original duration: {original_duration:.2f}s, target: {target_duration:.2f}s)")
-            
-            # Create speed-adjusted audio using time transformation
-            def speed_change(t):
-                return speed_factor * t
-                
-            adjusted_audio = audio.set_make_frame(lambda t: audio.get_frame(speed_change(t)))
-            adjusted_audio.duration = target_duration
-            
-            # Save the adjusted audio with a valid sample rate
-            print(f"Saving adjusted audio to: {adjusted_audio_path}")
-            adjusted_audio.write_audiofile(adjusted_audio_path, fps=44100)
-            
-            # Clean up
-            audio.close()
-            adjusted_audio.close()
+            print(f"Adjusting audio speed to {target_duration:.2f}s, saving to: {adjusted_audio_path}")
+            speed_factor = stretch_to_duration(audio_path, adjusted_audio_path, target_duration)
+            print(f"Speed factor: {speed_factor:.2f}")
             
             print(f"Successfully generated narration audio: {adjusted_audio_path}")
             return adjusted_audio_path
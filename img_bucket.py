@@ -33,6 +33,20 @@ class GCPImageUploader:
         # Return the signed URL
         return url
 
+    def upload_bytes(self, data, filename, content_type="image/jpeg"):
+        # Upload an in-memory image (e.g. an encoded video frame) without writing it to disk first
+        blob = self.bucket.blob(filename)
+        blob.upload_from_string(data, content_type=content_type)
+
+        # Generate a signed URL with a default expiration of 7 days
+        url = blob.generate_signed_url(
+            version="v4",
+            expiration=datetime.timedelta(days=7),
+            method="GET"
+        )
+
+        return url
+
 # Example usage
 if __name__ == "__main__":
     uploader = GCPImageUploader()
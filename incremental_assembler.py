@@ -0,0 +1,233 @@
+"""
+Incremental final stitching from per-scene normalized intermediates.
+
+Stitching used to be all or nothing: when the scene videos did not share codec
+parameters, every clip was decoded and the whole film re-encoded through
+MoviePy, and regenerating one scene meant doing that again for all of them.
+
+The assembler keeps one normalized intermediate per scene instead. The target
+format is the one most scenes share (codec, profile, resolution, pixel format
+and frame rate; H.264 High yuv420p at their resolution and frame rate when that
+is not an H.264 format libx264 can write), so all intermediates can be joined
+with the concat demuxer and stream copy. A scene that is already in the target
+format is its own intermediate; any other scene is encoded once into it. Encoded
+intermediates are keyed by the SHA-256 of the scene video and the target, and
+kept both in the run directory and in an AssetCache namespace shared by all
+runs. The final video is then a stream-copy concat of the intermediates plus the
+soundtrack, mixed by audio_mixer (sound effects and narration). That mix is
+audio only and takes a fraction of a second per minute.
+
+Appending or replacing a scene therefore costs at most one scene encode plus the
+final mux: after scene 7 of 12 is regenerated, the other eleven intermediates
+are found by their hash.
+
+The encode does not have to wait for stitching either. prepare_scene() builds
+the intermediate of one scene as soon as it is complete, in the format most
+scenes set so far share; video_generation.generate_scenes runs it as a task
+after each scene's sound effect, so normalization overlaps with the generation
+of the other scenes. When the final target turns out to be the same (the usual
+case), assemble() finds those intermediates by their hash and only concatenates
+and muxes. The soundtrack is still mixed at the end, since the narration spans
+all scenes.
+
+Usage:
+    assembler = IncrementalAssembler(os.path.join(video_dir, "intermediates"))
+    for position, (video_path, sound_path) in enumerate(zip(video_files, sound_effect_files), start=1):
+        assembler.set_scene(position, video_path, sound_path)   # appends, or replaces the scene
+        assembler.prepare_scene(position)                        # optional: encode it right away
+    drift = assembler.assemble(output_path, narration_audio_path)
+"""
+
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from asset_cache import AssetCache, ASSET_CACHE_DIR
+from audio_mixer import mix_scene_audio
+from ffmpeg_stitcher import run_ffmpeg, probe_video, streams_compatible, mux_pcm_audio
+from run_manifest import hash_file
+
+INTERMEDIATE_DIR = "intermediates"
+NORMALIZED_CODEC = "h264"
+NORMALIZED_PROFILE = "High"
+NORMALIZED_PIX_FMT = "yuv420p"
+# H.264 profiles as probed, and the libx264 profile that writes them
+X264_PROFILES = {"Constrained Baseline": "baseline", "Main": "main", "High": "high"}
+NORMALIZE_PRESET = "veryfast"
+NORMALIZE_CRF = 18
+NORMALIZE_WORKERS = 2
+
+intermediate_cache = AssetCache(os.path.join(ASSET_CACHE_DIR, "scene_intermediates"), extension=".mp4")
+
+
+def choose_target(probes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pick the format of the intermediates: the stream parameters most scenes share.
+
+    Ties go to the earliest scene, so replacing one scene rarely changes the target.
+    When the most common format is not one libx264 can write, the scenes are
+    normalized to NORMALIZED_CODEC/NORMALIZED_PROFILE/NORMALIZED_PIX_FMT at the most
+    common resolution and frame rate.
+
+    Returns:
+        dict: codec, profile, width, height, pix_fmt and fps, comparable with probe_video results
+    """
+    if not probes:
+        raise ValueError("No scenes to assemble")
+    keys = ("codec", "profile", "width", "height", "pix_fmt", "fps")
+    counts = Counter(tuple(round(probe[key], 3) if key == "fps" else probe[key] for key in keys) for probe in probes)
+    target = dict(zip(keys, counts.most_common(1)[0][0]))
+    if (target["codec"], target["pix_fmt"]) != (NORMALIZED_CODEC, NORMALIZED_PIX_FMT) or target["profile"] not in X264_PROFILES:
+        target.update(codec=NORMALIZED_CODEC, profile=NORMALIZED_PROFILE, pix_fmt=NORMALIZED_PIX_FMT)
+    return target
+
+
+def normalize_video(video_path: str, output_path: str, target: Dict[str, Any]) -> str:
+    """
+    Encode the video track of video_path into the target format (letterboxed if its aspect ratio differs).
+
+    Returns:
+        str: output_path
+    """
+    width, height = target["width"], target["height"]
+    temp_path = f"{output_path}.tmp.mp4"
+    run_ffmpeg([
+        "-i", video_path, "-map", "0:v:0",
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+               f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={target['fps']}",
+        "-c:v", "libx264", "-profile:v", X264_PROFILES[target["profile"]], "-pix_fmt", target["pix_fmt"],
+        "-preset", NORMALIZE_PRESET, "-crf", str(NORMALIZE_CRF),
+        "-an", "-movflags", "+faststart",
+        temp_path
+    ])
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+class IncrementalAssembler:
+    def __init__(self, work_dir: str, cache: Optional[AssetCache] = intermediate_cache,
+                 max_workers: int = NORMALIZE_WORKERS):
+        """
+        Args:
+            work_dir (str): Directory of the encoded intermediates of this run
+            cache (AssetCache): Store shared across runs (None to keep intermediates in work_dir only)
+            max_workers (int): Scenes encoded at the same time
+        """
+        self.work_dir = work_dir
+        self.cache = cache
+        self.max_workers = max_workers
+        self.scenes: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.encoded = 0
+        self.reused = 0
+        self._probes: Dict[Tuple[str, float, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def set_scene(self, scene_number: int, video_path: str, sound_effect_path: Optional[str] = None):
+        """Add a scene, or replace the video and sound effect of an existing one"""
+        with self._lock:
+            self.scenes[scene_number] = (video_path, sound_effect_path)
+
+    def remove_scene(self, scene_number: int):
+        with self._lock:
+            self.scenes.pop(scene_number, None)
+
+    def _probe(self, video_path: str) -> Dict[str, Any]:
+        """probe_video, remembered for as long as the file keeps its size and modification time"""
+        stat = os.stat(video_path)
+        key = (os.path.abspath(video_path), stat.st_mtime, stat.st_size)
+        with self._lock:
+            if key in self._probes:
+                return self._probes[key]
+        probe = probe_video(video_path)
+        with self._lock:
+            self._probes[key] = probe
+        return probe
+
+    def prepare_scene(self, scene_number: int) -> str:
+        """
+        Build the intermediate of one scene in the target format of the scenes set so far.
+
+        Meant to run as soon as the scene is complete; assemble() reuses the intermediate
+        as long as the final target is the same.
+
+        Returns:
+            str: Path of the intermediate (the scene video itself when it is already in the target format)
+        """
+        with self._lock:
+            scenes = dict(self.scenes)
+        scene_numbers = sorted(scenes)
+        probes = [self._probe(scenes[number][0]) for number in scene_numbers]
+        target = choose_target(probes)
+        position = scene_numbers.index(scene_number)
+        return self._intermediate(scene_number, scenes[scene_number][0], probes[position], target)
+
+    def _intermediate(self, scene_number: int, video_path: str, probe: Dict[str, Any], target: Dict[str, Any]) -> str:
+        if streams_compatible([target, probe]):
+            return video_path
+
+        key = AssetCache.make_key(source_sha256=hash_file(video_path), preset=NORMALIZE_PRESET,
+                                  crf=NORMALIZE_CRF, **target)
+        output_path = os.path.join(self.work_dir, f"scene_{scene_number}_{key[:16]}.mp4")
+        if os.path.exists(output_path) or (self.cache and self.cache.fetch(key, output_path)):
+            with self._lock:
+                self.reused += 1
+            return output_path
+
+        print(f"Normalizing scene {scene_number} to {target['width']}x{target['height']} at {target['fps']} fps...")
+        os.makedirs(self.work_dir, exist_ok=True)
+        normalize_video(video_path, output_path, target)
+        if self.cache:
+            self.cache.store(key, output_path, metadata={"source": os.path.basename(video_path)})
+        with self._lock:
+            self.encoded += 1
+        return output_path
+
+    def prepare(self) -> List[str]:
+        """
+        Make sure every scene has an intermediate in the current target format.
+
+        Returns:
+            list: Paths of the intermediates, in scene order
+        """
+        with self._lock:
+            scenes = dict(self.scenes)
+        scene_numbers = sorted(scenes)
+        video_paths = [scenes[scene_number][0] for scene_number in scene_numbers]
+        probes = [self._probe(video_path) for video_path in video_paths]
+        target = choose_target(probes)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            intermediates = list(executor.map(self._intermediate, scene_numbers, video_paths, probes,
+                                              [target] * len(probes)))
+        self._remove_stale(intermediates)
+        return intermediates
+
+    def _remove_stale(self, intermediates: List[str]):
+        """Delete intermediates of replaced scenes; they stay in the shared cache"""
+        if not os.path.isdir(self.work_dir):
+            return
+        in_use = {os.path.abspath(path) for path in intermediates}
+        for name in os.listdir(self.work_dir):
+            path = os.path.abspath(os.path.join(self.work_dir, name))
+            if name.startswith("scene_") and name.endswith(".mp4") and path not in in_use:
+                os.remove(path)
+
+    def assemble(self, output_path: str, narration_audio_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Join the scene intermediates with stream copy and mux the mixed soundtrack.
+
+        Args:
+            output_path (str): Path of the final video
+            narration_audio_path (str): Narration laid from the start of the video, or None
+
+        Returns:
+            list: Per-scene drift report of the sound effects (see audio_mixer.place_sound_effects)
+        """
+        intermediates = self.prepare()
+        with self._lock:
+            sound_effect_files = [self.scenes[scene_number][1] for scene_number in sorted(self.scenes)]
+        durations = [probe_video(path)["duration"] for path in intermediates]
+        samples, drift = mix_scene_audio(durations, sound_effect_files, narration_audio_path)
+        mux_pcm_audio(intermediates, samples, output_path)
+        return drift
@@ -0,0 +1,400 @@
+"""
+Persistent job queue and worker pool for video generation.
+
+A generation run takes minutes, so the Gradio app does not run it inside the
+request handler. It submits a job to a SQLite-backed queue and returns the job
+id; a pool of worker processes claims queued jobs and runs the pipeline, writing
+stage progress back to the queue. The UI polls the job for status and
+progress, can cancel it and shows the result when the job has completed.
+
+Job states: queued -> running -> completed | failed | cancelled
+
+Cancelling a queued job removes it from the queue. Cancelling a running job
+sets the run's cancel event (checked between pipeline stages and segments and
+while waiting for Luma); if the worker is still busy CANCEL_GRACE_SECONDS
+later, the pool terminates the worker process and starts a new one.
+
+A worker heartbeats its running job every POLL_INTERVAL. When one of the
+pool's workers dies, its job is failed (or marked cancelled) right away; jobs of
+workers the pool does not know about, e.g. after a restart, are failed once
+their heartbeat is older than JOB_HEARTBEAT_TIMEOUT. Jobs of another app
+instance sharing the database keep heartbeating and are left alone.
+
+Each worker process gets 1/JOB_WORKERS of every provider rate limit (see
+rate_limiter), so the pool as a whole stays within the configured limits.
+
+Configuration:
+    JOB_QUEUE_DB   Path of the SQLite database (default: jobs.db)
+    JOB_WORKERS    Number of worker processes (default: 2)
+    JOB_HEARTBEAT_TIMEOUT  Seconds without a heartbeat before a running job is
+                   considered orphaned (default: 60)
+
+Usage:
+    queue = JobQueue()
+    pool = WorkerPool(queue.db_path, num_workers=2)
+    pool.start()
+    job_id = queue.submit({"script_text": script, "video_engine": "luma"})
+    queue.get(job_id)["status"]
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+import rate_limiter
+
+# Load environment variables
+load_dotenv()
+
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "jobs.db")
+DEFAULT_NUM_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL = 1.0
+CANCEL_GRACE_SECONDS = 30
+HEARTBEAT_TIMEOUT = float(os.getenv("JOB_HEARTBEAT_TIMEOUT", "60"))
+
+FINAL_STATES = ("completed", "failed", "cancelled")
+
+
+class JobQueue:
+    """SQLite-backed queue of generation jobs, safe to use from several processes"""
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '[]',
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                )
+            """)
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, params: Dict[str, Any]) -> str:
+        """Queue a job with JSON-serializable params and return its id"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(params), time.time())
+            )
+        return job_id
+
+    def claim(self, worker_pid: int) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it, or None"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                (worker_pid, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def add_progress(self, job_id: str, stage: str, status: str, info: Optional[Dict[str, Any]] = None):
+        """Append a progress event to the job"""
+        event = {"time": time.time(), "stage": stage, "status": status, "info": info or {}}
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None:
+                progress = json.loads(row["progress"])
+                progress.append(event)
+                conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress, default=str), job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._finish(job_id, "completed", result=result)
+
+    def fail(self, job_id: str, error: str, result: Optional[Dict[str, Any]] = None):
+        self._finish(job_id, "failed", result=result, error=error)
+
+    def mark_cancelled(self, job_id: str, result: Optional[Dict[str, Any]] = None):
+        self._finish(job_id, "cancelled", result=result, error="Cancelled")
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Queued jobs are cancelled immediately, running jobs are asked to stop.
+
+        Returns:
+            bool: False if the job does not exist or has already finished
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = 'Cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            if cursor.rowcount:
+                return True
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+            )
+            return cursor.rowcount > 0
+
+    def heartbeat(self, job_id: str):
+        """Record that the worker running the job is alive"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def running_jobs(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE status = 'running'").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def recover_orphans(self, live_pids: List[int], dead_pids: List[int] = (), timeout: float = HEARTBEAT_TIMEOUT):
+        """
+        Fail running jobs whose worker process is gone, e.g. after a crash or restart.
+
+        Args:
+            live_pids (list): Pids of workers known to be alive; their jobs are never recovered
+            dead_pids (list): Pids of workers known to have exited; their jobs are recovered at once
+            timeout (float): Seconds without a heartbeat after which any other worker is considered gone
+        """
+        stale_before = time.time() - timeout
+        for job in self.running_jobs():
+            last_seen = job["heartbeat_at"] or job["started_at"] or 0
+            if job["worker_pid"] in dead_pids or (job["worker_pid"] not in live_pids and last_seen < stale_before):
+                if job["cancel_requested"]:
+                    self.mark_cancelled(job["id"])
+                else:
+                    self.fail(job["id"], "Worker process exited while running the job")
+
+
+def run_video_job(params: Dict[str, Any], ctx) -> Dict[str, Any]:
+    """
+    Default job handler: run video_generation.generate_video with the job params.
+
+    Returns:
+        dict: scenes_json, final_video and video_dir of the run
+
+    Raises:
+        RuntimeError: If the pipeline reported an error
+    """
+    import video_generation
+
+    params = dict(params)
+    script_text = params.pop("script_text", "")
+    scenes_json, final_video = video_generation.generate_video(script_text, ctx=ctx, **params)
+    result = {"scenes_json": scenes_json, "final_video": final_video, "video_dir": ctx.video_dir, "metrics": ctx.metrics}
+    if not final_video and not params.get("metadata_only"):
+        raise RuntimeError(scenes_json)
+    return result
+
+
+def _watch_job(queue: JobQueue, job_id: str, cancel_event: threading.Event, done: threading.Event):
+    """Heartbeat the running job and set cancel_event once it is cancelled"""
+    while not done.wait(POLL_INTERVAL):
+        queue.heartbeat(job_id)
+        if not cancel_event.is_set() and queue.is_cancel_requested(job_id):
+            cancel_event.set()
+
+
+def run_job(queue: JobQueue, job: Dict[str, Any], handler: Callable[[Dict[str, Any], Any], Dict[str, Any]] = run_video_job,
+            context_factory: Optional[Callable[..., Any]] = None):
+    """
+    Run one claimed job in this process and record its outcome.
+
+    Args:
+        queue (JobQueue): Queue the job was claimed from
+        job (dict): The claimed job
+        handler (callable): Called as handler(params, ctx), returns the JSON-serializable result
+        context_factory (callable): Creates the RunContext (default: video_generation.new_run_context)
+    """
+    if context_factory is None:
+        from video_generation import new_run_context as context_factory
+
+    job_id = job["id"]
+    cancel_event = threading.Event()
+    done = threading.Event()
+    watcher = threading.Thread(target=_watch_job, args=(queue, job_id, cancel_event, done), daemon=True)
+    watcher.start()
+
+    ctx = None
+    try:
+        ctx = context_factory(
+            run_id=job_id,
+            config=job["params"],
+            cancel_event=cancel_event,
+            progress_callback=lambda stage, status, info: queue.add_progress(job_id, stage, status, info)
+        )
+        queue.add_progress(job_id, "job", "started", {"video_dir": ctx.video_dir})
+        result = handler(job["params"], ctx)
+        queue.complete(job_id, result)
+    except Exception as e:
+        partial_result = {"video_dir": ctx.video_dir, "metrics": ctx.metrics} if ctx else None
+        if cancel_event.is_set():
+            queue.mark_cancelled(job_id, partial_result)
+        else:
+            traceback.print_exc()
+            queue.fail(job_id, str(e), partial_result)
+    finally:
+        done.set()
+
+
+def worker_main(db_path: str, stop_event=None, handler: Callable[[Dict[str, Any], Any], Dict[str, Any]] = run_video_job,
+                num_workers: int = 1):
+    """
+    Worker process loop: claim queued jobs and run them one at a time.
+
+    Args:
+        num_workers (int): Workers in the pool; this one keeps 1/num_workers of every provider rate limit
+    """
+    rate_limiter.default_registry.split(num_workers)
+    queue = JobQueue(db_path)
+    pid = os.getpid()
+    print(f"Job worker {pid} started")
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(pid)
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        print(f"Worker {pid} running job {job['id']}")
+        run_job(queue, job, handler)
+
+
+class WorkerPool:
+    """
+    Keeps num_workers worker processes running against the queue.
+
+    A supervisor thread restarts workers that exit, fails jobs orphaned by a dead
+    worker (or by a worker whose heartbeat is stale) and terminates workers that ignore a cancellation for longer than
+    CANCEL_GRACE_SECONDS.
+    """
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB, num_workers: int = DEFAULT_NUM_WORKERS,
+                 handler: Callable[[Dict[str, Any], Any], Dict[str, Any]] = run_video_job):
+        self.db_path = db_path
+        self.handler = handler
+        self.num_workers = max(1, num_workers)
+        self.queue = JobQueue(db_path)
+        # Spawn rather than fork, so workers do not inherit the web server's threads
+        self._mp = multiprocessing.get_context("spawn")
+        self._stop_event = self._mp.Event()
+        self._processes: List[multiprocessing.Process] = []
+        self._cancel_seen: Dict[str, float] = {}
+        self._supervisor = None
+        self._stopped = threading.Event()
+
+    def _spawn(self) -> multiprocessing.Process:
+        process = self._mp.Process(target=worker_main, args=(self.db_path, self._stop_event, self.handler, self.num_workers),
+                                   daemon=True)
+        process.start()
+        return process
+
+    def start(self):
+        self.queue.recover_orphans([])
+        self._processes = [self._spawn() for _ in range(self.num_workers)]
+        self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self):
+        while not self._stopped.wait(POLL_INTERVAL):
+            dead_pids = []
+            for i, process in enumerate(self._processes):
+                if not process.is_alive():
+                    print(f"Job worker {process.pid} exited, starting a new one")
+                    dead_pids.append(process.pid)
+                    self._processes[i] = self._spawn()
+            live_pids = [process.pid for process in self._processes]
+            self.queue.recover_orphans(live_pids, dead_pids)
+            self._enforce_cancellations()
+
+    def _enforce_cancellations(self):
+        now = time.time()
+        for job in self.queue.running_jobs():
+            if not job["cancel_requested"]:
+                continue
+            first_seen = self._cancel_seen.setdefault(job["id"], now)
+            if now - first_seen < CANCEL_GRACE_SECONDS:
+                continue
+            for process in self._processes:
+                if process.pid == job["worker_pid"] and process.is_alive():
+                    print(f"Job {job['id']} did not stop after cancellation, terminating worker {process.pid}")
+                    process.terminate()
+            self._cancel_seen.pop(job["id"], None)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopped.set()
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,232 @@
+"""
+Content-addressed on-disk cache for LLM responses.
+
+Re-running the same script with a different video engine or audio settings
+repeats the exact same metadata, environment and narration prompts. This cache
+sits in front of gemini_client.models.generate_content and
+anthropic.messages.create: the key is a SHA-256 hash of the provider, model id,
+prompt contents and sampling config, and the value is the response text.
+
+Entries are JSON files under LLM_CACHE_DIR (default: .llm_cache). The cache is
+bounded by LLM_CACHE_MAX_BYTES and evicts least recently used entries first.
+Set LLM_CACHE_DISABLED=1 (or pass --no_llm_cache to video_generation.py) to
+always call the API.
+
+Usage:
+    from llm_cache import cached_gemini_generate_content
+    response = cached_gemini_generate_content(gemini_client, model="gemini-2.0-flash-001",
+                                              contents=[script, prompt], config=config)
+    response.parsed
+"""
+
+import os
+import json
+import hashlib
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+from rate_limiter import get_limiter
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class LLMResponseCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model: str, request: Dict[str, Any]) -> str:
+        """Hash everything that determines the response into a cache key"""
+        payload = json.dumps(
+            {"provider": provider, "model": model, "request": request},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, or None. Counts a hit or a miss."""
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """Store an entry and evict least recently used entries beyond max_bytes"""
+        if not self.enabled:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._entry_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total_bytes = 0
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        # Oldest first
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Shared cache used by the pipeline
+default_cache = LLMResponseCache(enabled=os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes"))
+
+
+def _lookup_gemini(cache: LLMResponseCache, model: str, contents, config: Dict[str, Any]):
+    is_json = config.get("response_mime_type") == "application/json"
+    key = cache.make_key("gemini", model, {"contents": contents, "config": config})
+    entry = cache.get(key)
+    if entry is None:
+        return key, is_json, None
+    text = entry["text"]
+    return key, is_json, SimpleNamespace(text=text, parsed=json.loads(text) if is_json else None)
+
+
+def _store_gemini(cache: LLMResponseCache, key: str, is_json: bool, response, validate: Optional[Callable[[str], Any]]):
+    # Only keep responses the pipeline can use
+    if response.text:
+        try:
+            if is_json:
+                json.loads(response.text)
+            if validate:
+                validate(response.text)
+            cache.put(key, {"text": response.text})
+        except Exception:
+            pass
+
+
+def _store_anthropic(cache: LLMResponseCache, key: str, response, validate: Optional[Callable[[str], Any]]):
+    text = response.content[0].text
+    try:
+        if validate:
+            validate(text)
+        cache.put(key, {"text": text})
+    except Exception:
+        pass
+
+
+def cached_gemini_generate_content(client, model: str, contents, config: Dict[str, Any], cache: Optional[LLMResponseCache] = None, validate: Optional[Callable[[str], Any]] = None):
+    """
+    Call client.models.generate_content through the cache.
+
+    Returns the SDK response on a miss. On a hit, returns an object with the same
+    .text and .parsed attributes the pipeline reads from the SDK response. JSON
+    responses are only cached when they parse, and if validate is given, only when
+    validate(text) does not raise.
+    """
+    cache = cache or default_cache
+    key, is_json, cached_response = _lookup_gemini(cache, model, contents, config)
+    if cached_response is not None:
+        return cached_response
+
+    response = get_limiter("gemini", model).call(client.models.generate_content, model=model, contents=contents, config=config)
+    _store_gemini(cache, key, is_json, response, validate)
+    return response
+
+
+async def cached_gemini_generate_content_async(client, model: str, contents, config: Dict[str, Any], cache: Optional[LLMResponseCache] = None, validate: Optional[Callable[[str], Any]] = None):
+    """Async variant of cached_gemini_generate_content using client.aio"""
+    cache = cache or default_cache
+    key, is_json, cached_response = _lookup_gemini(cache, model, contents, config)
+    if cached_response is not None:
+        return cached_response
+
+    response = await get_limiter("gemini", model).call_async(client.aio.models.generate_content, model=model,
+                                                              contents=contents, config=config)
+    _store_gemini(cache, key, is_json, response, validate)
+    return response
+
+
+def cached_anthropic_messages_create(client, cache: Optional[LLMResponseCache] = None, validate: Optional[Callable[[str], Any]] = None, **kwargs):
+    """
+    Call client.messages.create(**kwargs) through the cache.
+
+    Returns the SDK response on a miss. On a hit, returns an object with the same
+    .content[0].text shape. If validate is given, the response text is only cached
+    when validate(text) does not raise, so unparseable answers are not replayed.
+    """
+    cache = cache or default_cache
+    key = cache.make_key("anthropic", kwargs.get("model"), kwargs)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return SimpleNamespace(content=[SimpleNamespace(text=entry["text"])])
+
+    response = get_limiter("anthropic", kwargs.get("model")).call(client.messages.create, **kwargs)
+    _store_anthropic(cache, key, response, validate)
+    return response
+
+
+async def cached_anthropic_messages_create_async(client, cache: Optional[LLMResponseCache] = None, validate: Optional[Callable[[str], Any]] = None, **kwargs):
+    """Async variant of cached_anthropic_messages_create for an AsyncAnthropic client"""
+    cache = cache or default_cache
+    key = cache.make_key("anthropic", kwargs.get("model"), kwargs)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return SimpleNamespace(content=[SimpleNamespace(text=entry["text"])])
+
+    response = await get_limiter("anthropic", kwargs.get("model")).call_async(client.messages.create, **kwargs)
+    _store_anthropic(cache, key, response, validate)
+    return response
@@ -47,11 +47,12 @@ of the prompt and server load.
 
 import os
 import fal_client
-import requests
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Optional, Union, Dict, Any
+from typing import Callable, Optional, Union, Dict, Any, Tuple
 import json
+from rate_limiter import get_limiter
+from downloader import download
 
 # Load environment variables
 load_dotenv()
@@ -67,20 +68,7 @@ def download_video(url: str, output_path: str) -> str:
     Returns:
         str: The path where the video was saved
     """
-    # Create directory if it doesn't exist
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-    
-    # Download the video
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    with open(output_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    
-    return output_path
+    return download(url, output_path)
 
 def on_queue_update(update):
     """Callback function to handle queue updates and print progress logs."""
@@ -88,27 +76,22 @@ def on_queue_update(update):
         for log in update.logs:
             print(log["message"])
 
-def generate_ltx_video(
+def wait_for_request(handle, limiter=None) -> Dict[str, Any]:
+    """Wait for a queued FAL request, printing its logs, and return its result"""
+    for update in handle.iter_events(with_logs=True):
+        on_queue_update(update)
+    return limiter.retry(handle.get) if limiter else handle.get()
+
+def build_ltx_request(
     prompt: str,
     image_url: Optional[str] = None,
-    output_path: Optional[str] = None,
     model_args: Optional[Dict[str, Any]] = None
-) -> Dict[str, Any]:
+) -> Tuple[str, Dict[str, Any]]:
     """
-    Generate a video using Fal AI's LTX models, supporting both image-to-video and text-to-video generation.
-    
-    Args:
-        prompt (str): The text description of the desired video.
-        image_url (Optional[str]): URL of the input image for image-to-video generation.
-                                 If None, text-to-video generation will be used.
-        output_path (Optional[str]): Path where the generated video should be saved.
-                                   If None, only the URL will be returned.
-        model_args (Optional[Dict[str, Any]]): Additional model arguments to pass to the API.
+    Pick the LTX endpoint and build its arguments.
     
     Returns:
-        Dict[str, Any]: The API response containing the generated video information.
-                       If output_path is provided, also includes 'saved_path' key.
-                       Response includes: seed, video.url, video.file_name, video.file_size
+        Tuple[str, Dict[str, Any]]: (model_endpoint, arguments)
     """
     # Set up the API key
     fal_api_key = os.getenv("FAL_API_KEY")
@@ -131,14 +114,54 @@ def generate_ltx_video(
     if model_args:
         arguments.update(model_args)
     
+    return model_endpoint, arguments
+
+def generate_ltx_video(
+    prompt: str,
+    image_url: Optional[str] = None,
+    output_path: Optional[str] = None,
+    model_args: Optional[Dict[str, Any]] = None,
+    request_id: Optional[str] = None,
+    on_submitted: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Generate a video using Fal AI's LTX models, supporting both image-to-video and text-to-video generation.
+    
+    Args:
+        prompt (str): The text description of the desired video.
+        image_url (Optional[str]): URL of the input image for image-to-video generation.
+                                 If None, text-to-video generation will be used.
+        output_path (Optional[str]): Path where the generated video should be saved.
+                                   If None, only the URL will be returned.
+        model_args (Optional[Dict[str, Any]]): Additional model arguments to pass to the API.
+        request_id (Optional[str]): FAL request id of an earlier submission of this video to wait for
+                                  instead of submitting again. A new request is submitted if it cannot be resumed.
+        on_submitted (Optional[Callable[[str, str], None]]): Called with (model_endpoint, request_id) as soon as
+                                  the request is queued, so the id can be persisted.
+    
+    Returns:
+        Dict[str, Any]: The API response containing the generated video information.
+                       If output_path is provided, also includes 'saved_path' key.
+                       Response includes: seed, video.url, video.file_name, video.file_size
+    """
+    model_endpoint, arguments = build_ltx_request(prompt, image_url, model_args)
+    
     try:
-        # Make the API call
-        result = fal_client.subscribe(
-            model_endpoint,
-            arguments=arguments,
-            with_logs=True,
-            on_queue_update=on_queue_update,
-        )
+        # Hold a FAL slot from submission until the result is ready
+        limiter = get_limiter("fal", model_endpoint)
+        with limiter.slot():
+            result = None
+            if request_id:
+                try:
+                    print(f"Resuming FAL request {request_id}")
+                    result = wait_for_request(fal_client.sync_client.get_handle(model_endpoint, request_id), limiter)
+                except Exception as e:
+                    print(f"Warning: Could not resume FAL request {request_id}, submitting again: {str(e)}")
+            if result is None:
+                handle = limiter.retry(fal_client.submit, model_endpoint, arguments=arguments)
+                if on_submitted:
+                    on_submitted(model_endpoint, handle.request_id)
+                result = wait_for_request(handle, limiter)
         
         # Extract video URL from the response
         video_url = result.get('video', {}).get('url')
@@ -1,6 +1,7 @@
 import os
-import requests
-import time
+from rate_limiter import get_limiter
+from downloader import download
+from polling import poll_until, luma_is_done, luma_failure, PollTimeout, LUMA_IMAGE_DEADLINE
 from dotenv import load_dotenv
 from lumaai import LumaAI
 
@@ -27,23 +28,28 @@ def generate_image(prompt, output_dir="generated_images"):
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
-        # Start the generation
-        generation = client.generations.image.create(
-            prompt=prompt,
-        )
-        
-        # Wait for completion
-        completed = False
-        print("Starting image generation...")
-        while not completed:
-            generation = client.generations.get(id=generation.id)
-            if generation.state == "completed":
-                completed = True
-            elif generation.state == "failed":
-                print(f"Generation failed: {generation.failure_reason}")
+        # Hold a Luma image concurrency slot from creation until the generation completes
+        image_limiter = get_limiter("luma", "photon")
+        with image_limiter.slot():
+            # Start the generation
+            generation = image_limiter.retry(
+                client.generations.image.create,
+                prompt=prompt,
+            )
+            
+            # Wait for completion
+            print("Starting image generation...")
+            try:
+                generation = poll_until(
+                    lambda: get_limiter("luma").call(client.generations.get, id=generation.id),
+                    is_done=luma_is_done,
+                    is_failed=luma_failure,
+                    deadline=LUMA_IMAGE_DEADLINE,
+                    name="luma_image"
+                )
+            except (RuntimeError, PollTimeout) as e:
+                print(str(e))
                 return None, None
-            print("Dreaming...")
-            time.sleep(2)
         
         # Get the image URL
         image_url = generation.assets.image
@@ -56,11 +62,7 @@ def generate_image(prompt, output_dir="generated_images"):
         filepath = os.path.join(output_dir, filename)
         
         # Download the image
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        with open(filepath, 'wb') as file:
-            file.write(response.content)
+        download(image_url, filepath)
             
         if not os.path.exists(filepath):
             print(f"Failed to save image to {filepath}")
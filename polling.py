@@ -0,0 +1,378 @@
+"""
+Shared polling primitives for long-running generation jobs.
+
+Luma generations take from tens of seconds to minutes. Polling them at a fixed
+interval forever wastes API calls on long jobs, reacts late to short ones and
+never gives up on a stuck job. This module polls on an adaptive schedule (fast
+at first, then backing off, with jitter so concurrent jobs do not poll in
+lockstep), enforces a per-job deadline, supports cancellation through a
+threading.Event and records time-to-complete metrics.
+
+A failed status fetch does not fail the job: network errors, 5xx responses and
+throttling (408/429) say nothing about the generation itself, which keeps
+running and is billed either way, so they are logged and polling continues on
+the same schedule until the deadline. Other errors (e.g. 401, 404) and failed
+job states end polling at once.
+
+poll_until() blocks on a single job and poll_until_async() is its coroutine
+counterpart. GenerationWatcher tracks many job ids in one background loop and
+hands out a Future per job, so one thread can watch dozens of in-flight
+generations.
+
+Usage:
+    generation = poll_until(
+        lambda: client.generations.get(id=generation_id),
+        is_done=luma_is_done, is_failed=luma_failure, deadline=600
+    )
+
+    watcher = GenerationWatcher(lambda job_id: client.generations.get(id=job_id),
+                                is_done=luma_is_done, is_failed=luma_failure)
+    generation = watcher.watch(generation_id, deadline=600).result()
+"""
+
+import time
+import random
+import asyncio
+import heapq
+import threading
+import itertools
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from rate_limiter import get_status_code
+
+LUMA_VIDEO_DEADLINE = 900
+LUMA_IMAGE_DEADLINE = 300
+
+# Status codes of a failed status fetch after which the job is polled again
+TRANSIENT_STATUS_CODES = (408, 429)
+# SDK exceptions without a status code that mean the request never got a response
+TRANSIENT_ERROR_NAMES = ("APIConnectionError", "TransportError")
+# Marks a poll whose status fetch failed transiently
+_NO_STATUS = object()
+
+
+class PollTimeout(TimeoutError):
+    """Raised when a job has not finished before its deadline"""
+
+
+class PollCancelled(RuntimeError):
+    """Raised when polling is cancelled through the cancel event"""
+
+
+class BackoffSchedule:
+    """
+    Poll intervals that start short and grow geometrically up to max_interval.
+
+    Args:
+        initial (float): First interval in seconds
+        factor (float): Growth factor per poll
+        max_interval (float): Upper bound of the interval
+        jitter (float): Relative random spread applied to every interval
+    """
+
+    def __init__(self, initial: float = 1.0, factor: float = 1.5, max_interval: float = 15.0, jitter: float = 0.2):
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def interval(self, attempt: int) -> float:
+        base = min(self.max_interval, self.initial * (self.factor ** attempt))
+        return max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class PollMetrics:
+    """Thread-safe record of how long jobs took and how many polls they needed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = {}
+        self.polls: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    def record(self, name: str, duration: float, polls: int, timed_out: bool = False):
+        with self._lock:
+            self.polls[name] = self.polls.get(name, 0) + polls
+            if timed_out:
+                self.timeouts[name] = self.timeouts.get(name, 0) + 1
+            else:
+                self.durations.setdefault(name, []).append(duration)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return count, mean/max time-to-complete, polls and timeouts per job name"""
+        with self._lock:
+            result = {}
+            for name in set(self.durations) | set(self.timeouts):
+                durations = sorted(self.durations.get(name, []))
+                result[name] = {
+                    "completed": len(durations),
+                    "mean_seconds": sum(durations) / len(durations) if durations else 0.0,
+                    "median_seconds": durations[len(durations) // 2] if durations else 0.0,
+                    "max_seconds": durations[-1] if durations else 0.0,
+                    "polls": self.polls.get(name, 0),
+                    "timeouts": self.timeouts.get(name, 0)
+                }
+            return result
+
+
+default_metrics = PollMetrics()
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True if a status fetch failed for reasons unrelated to the job (network, 5xx, throttling)"""
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code >= 500 or status_code in TRANSIENT_STATUS_CODES
+    if isinstance(error, OSError):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def _fetch_failed(error: Exception, name: str):
+    """Re-raise a non-transient fetch error, log a transient one"""
+    if not is_transient_error(error):
+        raise error
+    print(f"Warning: Could not fetch the status of {name}, polling again: {str(error)}")
+
+
+def luma_is_done(generation) -> bool:
+    return generation.state == "completed"
+
+
+def luma_failure(generation) -> Optional[str]:
+    """Return the failure reason of a failed Luma generation, or None"""
+    if generation.state == "failed":
+        return generation.failure_reason or "unknown reason"
+    return None
+
+
+def poll_until(
+    fetch: Callable[[], Any],
+    is_done: Callable[[Any], bool],
+    is_failed: Optional[Callable[[Any], Optional[str]]] = None,
+    deadline: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    schedule: Optional[BackoffSchedule] = None,
+    name: str = "job",
+    metrics: Optional[PollMetrics] = None
+):
+    """
+    Call fetch until is_done returns True for its result.
+
+    Args:
+        fetch (callable): Returns the current job status
+        is_done (callable): True when the status is final and successful
+        is_failed (callable): Returns a failure reason for failed statuses, None otherwise
+        deadline (float): Seconds after which PollTimeout is raised (None waits forever)
+        cancel_event (threading.Event): Set it to stop waiting with PollCancelled
+        schedule (BackoffSchedule): Poll intervals (default: BackoffSchedule())
+        name (str): Job name used for metrics
+        metrics (PollMetrics): Where to record time-to-complete (default: default_metrics)
+
+    Returns:
+        The final status returned by fetch
+
+    Raises:
+        RuntimeError: If is_failed reports a failure
+    """
+    schedule = schedule or BackoffSchedule()
+    metrics = metrics or default_metrics
+    start_time = time.monotonic()
+    attempt = 0
+
+    while True:
+        try:
+            status = fetch()
+        except Exception as e:
+            _fetch_failed(e, name)
+            status = _NO_STATUS
+        attempt += 1
+        if status is not _NO_STATUS and is_done(status):
+            metrics.record(name, time.monotonic() - start_time, attempt)
+            return status
+        failure_reason = is_failed(status) if is_failed and status is not _NO_STATUS else None
+        if failure_reason:
+            metrics.record(name, time.monotonic() - start_time, attempt)
+            raise RuntimeError(f"Generation failed: {failure_reason}")
+
+        elapsed = time.monotonic() - start_time
+        if deadline is not None and elapsed >= deadline:
+            metrics.record(name, elapsed, attempt, timed_out=True)
+            raise PollTimeout(f"{name} did not complete within {deadline} seconds")
+
+        wait = schedule.interval(attempt - 1)
+        if deadline is not None:
+            wait = min(wait, deadline - elapsed)
+        if cancel_event is not None:
+            if cancel_event.wait(wait):
+                raise PollCancelled(f"Polling for {name} was cancelled")
+        else:
+            time.sleep(wait)
+
+
+async def poll_until_async(
+    fetch: Callable[[], Awaitable[Any]],
+    is_done: Callable[[Any], bool],
+    is_failed: Optional[Callable[[Any], Optional[str]]] = None,
+    deadline: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    schedule: Optional[BackoffSchedule] = None,
+    name: str = "job",
+    metrics: Optional[PollMetrics] = None
+):
+    """
+    Coroutine version of poll_until: fetch is awaited and waits use asyncio.sleep.
+
+    Cancelling the awaiting task stops polling as well as setting cancel_event.
+    """
+    schedule = schedule or BackoffSchedule()
+    metrics = metrics or default_metrics
+    start_time = time.monotonic()
+    attempt = 0
+
+    while True:
+        try:
+            status = await fetch()
+        except Exception as e:
+            _fetch_failed(e, name)
+            status = _NO_STATUS
+        attempt += 1
+        if status is not _NO_STATUS and is_done(status):
+            metrics.record(name, time.monotonic() - start_time, attempt)
+            return status
+        failure_reason = is_failed(status) if is_failed and status is not _NO_STATUS else None
+        if failure_reason:
+            metrics.record(name, time.monotonic() - start_time, attempt)
+            raise RuntimeError(f"Generation failed: {failure_reason}")
+
+        elapsed = time.monotonic() - start_time
+        if deadline is not None and elapsed >= deadline:
+            metrics.record(name, elapsed, attempt, timed_out=True)
+            raise PollTimeout(f"{name} did not complete within {deadline} seconds")
+        if cancel_event is not None and cancel_event.is_set():
+            raise PollCancelled(f"Polling for {name} was cancelled")
+
+        wait = schedule.interval(attempt - 1)
+        if deadline is not None:
+            wait = min(wait, deadline - elapsed)
+        await asyncio.sleep(wait)
+
+
+class _WatchedJob:
+    def __init__(self, job_id, deadline, cancel_event):
+        self.job_id = job_id
+        self.future = Future()
+        self.start_time = time.monotonic()
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+        self.attempt = 0
+
+
+class GenerationWatcher:
+    """
+    Poll many job ids from a single background thread.
+
+    Each job keeps its own backoff schedule and deadline; the loop sleeps until
+    the next job is due. watch() returns a Future that resolves to the final
+    status, or fails with RuntimeError, PollTimeout or PollCancelled.
+
+    Args:
+        fetch (callable): fetch(job_id) returns the current status of a job
+        is_done (callable): True when the status is final and successful
+        is_failed (callable): Returns a failure reason for failed statuses, None otherwise
+        schedule (BackoffSchedule): Poll intervals per job
+        name (str): Job name used for metrics
+        metrics (PollMetrics): Where to record time-to-complete
+    """
+
+    def __init__(self, fetch, is_done, is_failed=None, schedule: Optional[BackoffSchedule] = None,
+                 name: str = "job", metrics: Optional[PollMetrics] = None):
+        self.fetch = fetch
+        self.is_done = is_done
+        self.is_failed = is_failed
+        self.schedule = schedule or BackoffSchedule()
+        self.name = name
+        self.metrics = metrics or default_metrics
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def watch(self, job_id, deadline: Optional[float] = None, cancel_event: Optional[threading.Event] = None) -> Future:
+        """Start tracking job_id and return a Future for its final status"""
+        job = _WatchedJob(job_id, deadline, cancel_event)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("GenerationWatcher has been stopped")
+            heapq.heappush(self._heap, (time.monotonic(), next(self._counter), job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-watcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job.future
+
+    def in_flight(self) -> int:
+        with self._condition:
+            return len(self._heap)
+
+    def stop(self):
+        """Stop the loop and cancel every job that is still being watched"""
+        with self._condition:
+            self._stopped = True
+            jobs = [entry[2] for entry in self._heap]
+            self._heap = []
+            self._condition.notify()
+        for job in jobs:
+            job.future.set_exception(PollCancelled(f"Polling for {self.name} {job.job_id} was cancelled"))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+
+            if self._poll(job):
+                with self._condition:
+                    due = time.monotonic() + self.schedule.interval(job.attempt - 1)
+                    if job.deadline is not None:
+                        due = min(due, job.start_time + job.deadline)
+                    heapq.heappush(self._heap, (due, next(self._counter), job))
+
+    def _poll(self, job: _WatchedJob) -> bool:
+        """Poll one job; returns True if it should be polled again"""
+        if job.cancel_event is not None and job.cancel_event.is_set():
+            job.future.set_exception(PollCancelled(f"Polling for {self.name} {job.job_id} was cancelled"))
+            return False
+
+        try:
+            status = self.fetch(job.job_id)
+        except Exception as e:
+            try:
+                _fetch_failed(e, f"{self.name} {job.job_id}")
+            except Exception:
+                job.future.set_exception(e)
+                return False
+            status = _NO_STATUS
+        job.attempt += 1
+        elapsed = time.monotonic() - job.start_time
+
+        if status is not _NO_STATUS and self.is_done(status):
+            self.metrics.record(self.name, elapsed, job.attempt)
+            job.future.set_result(status)
+            return False
+        failure_reason = self.is_failed(status) if self.is_failed and status is not _NO_STATUS else None
+        if failure_reason:
+            self.metrics.record(self.name, elapsed, job.attempt)
+            job.future.set_exception(RuntimeError(f"Generation failed: {failure_reason}"))
+            return False
+        if job.deadline is not None and elapsed >= job.deadline:
+            self.metrics.record(self.name, elapsed, job.attempt, timed_out=True)
+            job.future.set_exception(PollTimeout(f"{self.name} {job.job_id} did not complete within {job.deadline} seconds"))
+            return False
+        return True
@@ -0,0 +1,382 @@
+"""
+Per-provider rate limiting and concurrency governor.
+
+With scenes generated in parallel, Luma, FAL and ElevenLabs calls arrive in
+bursts that exceed the providers' request rates and concurrent-job limits.
+Every provider call goes through a ProviderLimiter, which combines:
+
+- a token bucket (rate requests per second, bursts of up to burst requests),
+- an optional cap on calls in flight at the same time (max_in_flight),
+- a shared back-off window: when a call is throttled (HTTP 429) the limiter
+  honours the Retry-After header (or backs off exponentially when there is
+  none), pauses every caller of that limiter and retries the call.
+
+Limiters are keyed by provider and optionally endpoint, e.g. "fal" and
+"fal/fal-ai/ltx-video-v095/image-to-video". An endpoint with its own entry in
+the limits gets its own limiter; other endpoints share the provider's limiter.
+Each limiter reports queue depth (callers waiting), calls in flight, throttled
+calls and total wait time.
+
+Limiters live in one process. The job queue's worker processes each have their
+own registry, so WorkerPool gives every worker 1/JOB_WORKERS of each limit
+(RateLimiterRegistry.split). Rates divide exactly; burst and max_in_flight are
+rounded down to at least 1, so with more workers than a limit allows the
+combined cap is one per worker. Calls made by other processes (e.g. a second
+app instance) are not counted.
+
+Configuration:
+    RATE_LIMITS  JSON object merged over DEFAULT_LIMITS, e.g.
+                 '{"luma/ray-2": {"max_in_flight": 10}, "elevenlabs": {"rate": 5}}'
+
+Usage:
+    from rate_limiter import get_limiter
+    result = get_limiter("fal", "fal-ai/sana").call(fal_client.subscribe, "fal-ai/sana", arguments=arguments)
+
+    limiter = get_limiter("luma", "ray-2")
+    with limiter.slot():  # hold a concurrency slot for the whole generation
+        generation = limiter.retry(luma_client.generations.create, **params)
+        ...
+
+    # Coroutines (async_providers) share the same slots, tokens and back-off
+    async with limiter.async_slot():
+        generation = await limiter.retry_async(async_luma_client.generations.create, **params)
+"""
+
+import os
+import json
+import time
+import asyncio
+import inspect
+import threading
+import email.utils
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# rate: requests per second, burst: bucket size, max_in_flight: concurrent calls (None = unbounded)
+DEFAULT_LIMITS = {
+    "luma": {"rate": 2.0, "burst": 5, "max_in_flight": None},
+    "luma/ray-2": {"rate": 0.5, "burst": 3, "max_in_flight": 5},
+    "luma/photon": {"rate": 0.5, "burst": 3, "max_in_flight": 5},
+    "fal": {"rate": 2.0, "burst": 5, "max_in_flight": 8},
+    "fal/fal-ai/ltx-video-v095": {"rate": 1.0, "burst": 3, "max_in_flight": 4},
+    "fal/fal-ai/ltx-video-v095/image-to-video": {"rate": 1.0, "burst": 3, "max_in_flight": 4},
+    "fal/fal-ai/sana": {"rate": 2.0, "burst": 5, "max_in_flight": 4},
+    "elevenlabs": {"rate": 2.0, "burst": 4, "max_in_flight": 4},
+    "gemini": {"rate": 5.0, "burst": 10, "max_in_flight": 8},
+    "anthropic": {"rate": 1.0, "burst": 4, "max_in_flight": 4},
+}
+
+DEFAULT_MAX_RETRIES = 3
+MAX_BACKOFF_SECONDS = 60.0
+# How often a coroutine waiting for a concurrency slot checks again
+SLOT_POLL_SECONDS = 0.05
+
+
+def _load_limits() -> Dict[str, Dict[str, Any]]:
+    limits = {key: dict(value) for key, value in DEFAULT_LIMITS.items()}
+    overrides = os.getenv("RATE_LIMITS")
+    if overrides:
+        try:
+            for key, value in json.loads(overrides).items():
+                limits.setdefault(key, {}).update(value)
+        except (ValueError, AttributeError) as e:
+            print(f"Warning: Ignoring invalid RATE_LIMITS: {str(e)}")
+    return limits
+
+
+def split_limits(limits: Dict[str, Dict[str, Any]], parts: int) -> Dict[str, Dict[str, Any]]:
+    """Divide rate, burst and max_in_flight of every limit by parts (burst and max_in_flight at least 1)"""
+    shared = {}
+    for key, value in limits.items():
+        value = dict(value)
+        value["rate"] = value.get("rate", 1.0) / parts
+        value["burst"] = max(1, value.get("burst", 1) // parts)
+        if value.get("max_in_flight"):
+            value["max_in_flight"] = max(1, value["max_in_flight"] // parts)
+        shared[key] = value
+    return shared
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status of an SDK exception (Luma, Anthropic, ElevenLabs, FAL/httpx, Gemini)"""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return get_status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+class ProviderLimiter:
+    """
+    Token bucket plus max-in-flight cap for one provider or endpoint.
+
+    Args:
+        name (str): Key of the limiter, e.g. "fal/fal-ai/sana"
+        rate (float): Requests per second
+        burst (int): Bucket size
+        max_in_flight (int): Concurrent calls allowed (None for no cap)
+        max_retries (int): Retries of a throttled call
+    """
+
+    def __init__(self, name: str, rate: float = 1.0, burst: int = 1, max_in_flight: Optional[int] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self._local = threading.local()
+
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.total_wait_seconds = 0.0
+
+    def _token_wait(self) -> Optional[float]:
+        """Take a token and return None, or return the seconds to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+    def _take_token(self):
+        wait = self._token_wait()
+        while wait is not None:
+            time.sleep(wait)
+            wait = self._token_wait()
+
+    async def _take_token_async(self):
+        wait = self._token_wait()
+        while wait is not None:
+            await asyncio.sleep(wait)
+            wait = self._token_wait()
+
+    def back_off(self, seconds: float):
+        """Pause every caller of this limiter for seconds"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+    @contextmanager
+    def slot(self):
+        """Hold a concurrency slot (re-entrant per thread) and take a token"""
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            # Already holding a slot of this limiter in this thread, e.g. retry() inside slot()
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        start_time = self._start_waiting()
+        try:
+            if self._slots:
+                self._slots.acquire()
+            try:
+                self._take_token()
+            except BaseException:
+                if self._slots:
+                    self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        self._start_call(start_time)
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            self._end_call()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """
+        slot() for coroutines: waits without blocking the event loop.
+
+        The slots, tokens and back-off are shared with the synchronous callers, so
+        the async facade and the threaded pipeline together stay within the limits.
+        Not re-entrant; use retry_async() for calls inside the slot.
+        """
+        start_time = self._start_waiting()
+        try:
+            if self._slots:
+                while not self._slots.acquire(blocking=False):
+                    await asyncio.sleep(SLOT_POLL_SECONDS)
+            try:
+                await self._take_token_async()
+            except BaseException:
+                if self._slots:
+                    self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        self._start_call(start_time)
+        try:
+            yield
+        finally:
+            self._end_call()
+
+    def _start_waiting(self) -> float:
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+        return time.monotonic()
+
+    def _start_call(self, start_time: float):
+        with self._lock:
+            self.total_wait_seconds += time.monotonic() - start_time
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.calls += 1
+
+    def _end_call(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self._slots:
+            self._slots.release()
+
+    def _back_off_throttled(self, error: Exception, attempt: int) -> bool:
+        """Back off after a throttled call; returns False when error should be raised instead"""
+        if not is_rate_limited(error) or attempt >= self.max_retries:
+            return False
+        wait = get_retry_after(error)
+        if wait is None:
+            wait = min(MAX_BACKOFF_SECONDS, 2.0 ** (attempt + 1))
+        with self._lock:
+            self.throttled += 1
+        print(f"Rate limited by {self.name}, retrying in {wait:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+        self.back_off(wait)
+        return True
+
+    def retry(self, fn: Callable, *args, **kwargs):
+        """Call fn, backing off and retrying when the provider answers 429"""
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self._back_off_throttled(e, attempt):
+                    raise
+                attempt += 1
+                self._take_token()
+
+    async def retry_async(self, fn: Callable, *args, **kwargs):
+        """retry() for a coroutine function (or any function returning an awaitable)"""
+        attempt = 0
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+                return await result if inspect.isawaitable(result) else result
+            except Exception as e:
+                if not self._back_off_throttled(e, attempt):
+                    raise
+                attempt += 1
+                await self._take_token_async()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Call fn inside a slot, retrying throttled calls"""
+        with self.slot():
+            return self.retry(fn, *args, **kwargs)
+
+    async def call_async(self, fn: Callable, *args, **kwargs):
+        """call() for a coroutine function: await fn inside an async slot, retrying throttled calls"""
+        async with self.async_slot():
+            return await self.retry_async(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self.waiting,
+                "peak_queue_depth": self.peak_waiting,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "total_wait_seconds": round(self.total_wait_seconds, 3)
+            }
+
+
+class RateLimiterRegistry:
+    """Creates and hands out one ProviderLimiter per configured provider/endpoint"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.limits = limits if limits is not None else _load_limits()
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, endpoint: Optional[str] = None) -> ProviderLimiter:
+        key = f"{provider}/{endpoint}" if endpoint and f"{provider}/{endpoint}" in self.limits else provider
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = ProviderLimiter(key, **self.limits.get(key, {}))
+            return self._limiters[key]
+
+    def split(self, parts: int):
+        """Keep 1/parts of every limit, for parts processes sharing the providers' quotas"""
+        if parts <= 1:
+            return
+        with self._lock:
+            self.limits = split_limits(self.limits, parts)
+            self._limiters.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.stats() for key, limiter in limiters.items()}
+
+
+# Shared registry used by every provider call site
+default_registry = RateLimiterRegistry()
+
+
+def get_limiter(provider: str, endpoint: Optional[str] = None) -> ProviderLimiter:
+    return default_registry.get(provider, endpoint)
@@ -0,0 +1,139 @@
+"""
+Per-run state for the video generation pipeline.
+
+A RunContext carries everything that belongs to one generation run: its output
+directory and timestamp, a run id, the API clients and run configuration, stage
+timings, the run manifest and an optional progress callback. The pipeline
+functions in video_generation.py take a RunContext instead of reading module
+globals, so one process can run several jobs at the same time (e.g. concurrent
+Gradio requests) without them writing into the same directory.
+
+Usage:
+    from run_context import RunContext
+    ctx = RunContext.create(config={"video_engine": "luma"})
+    scenes = generate_scene_metadata(ctx, script)
+    print(ctx.video_dir, ctx.metrics)
+"""
+
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from run_manifest import RunManifest
+
+DEFAULT_OUTPUT_DIR = "generated_videos"
+
+
+class RunCancelled(RuntimeError):
+    """Raised inside the pipeline once the run has been cancelled"""
+
+
+class RunContext:
+    """
+    State of one generation run.
+
+    Args:
+        video_dir (str): Directory all files of the run are written to
+        timestamp (str): Timestamp used in file names (YYYYmmdd_HHMMSS)
+        run_id (str): Unique id of the run (default: random)
+        clients (dict): API clients by name, e.g. {"gemini": ..., "luma": ...}
+        config (dict): Run configuration, e.g. the generate_video arguments
+        progress_callback (callable): Called as progress_callback(stage, status, info) on stage changes
+        cancel_event (threading.Event): Set it to stop the run at the next cancellation point
+        task_slots (threading.Semaphore): Generation task budget shared with other runs (batch mode)
+    """
+
+    def __init__(self, video_dir: str, timestamp: str, run_id: Optional[str] = None,
+                 clients: Optional[Dict[str, Any]] = None, config: Optional[Dict[str, Any]] = None,
+                 progress_callback: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 task_slots: Optional[threading.Semaphore] = None):
+        self.video_dir = video_dir
+        self.timestamp = timestamp
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.clients = clients or {}
+        self.config = config or {}
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self.task_slots = task_slots
+        self.metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._manifest: Optional[RunManifest] = None
+
+    @classmethod
+    def create(cls, output_dir: str = DEFAULT_OUTPUT_DIR, **kwargs) -> "RunContext":
+        """
+        Start a new run in output_dir/video_{timestamp}.
+
+        The directory is reserved atomically; if another run started in the same
+        second, the run id is appended to the directory name.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ctx = cls(os.path.join(output_dir, f"video_{timestamp}"), timestamp, **kwargs)
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            os.mkdir(ctx.video_dir)
+        except FileExistsError:
+            ctx.video_dir = os.path.join(output_dir, f"video_{timestamp}_{ctx.run_id}")
+            os.mkdir(ctx.video_dir)
+        return ctx
+
+    @classmethod
+    def from_existing_dir(cls, video_dir: str, timestamp: Optional[str] = None, **kwargs) -> "RunContext":
+        """Resume a run in an existing directory, keeping its timestamp when known"""
+        return cls(video_dir, timestamp or datetime.now().strftime("%Y%m%d_%H%M%S"), **kwargs)
+
+    def path(self, *parts: str) -> str:
+        """Path inside the run directory"""
+        return os.path.join(self.video_dir, *parts)
+
+    @property
+    def manifest(self) -> RunManifest:
+        """Run manifest of the current run directory"""
+        with self._lock:
+            if self._manifest is None or self._manifest.video_dir != self.video_dir:
+                self._manifest = RunManifest(self.video_dir)
+            return self._manifest
+
+    def client(self, name: str, default: Any = None) -> Any:
+        """API client registered under name, or default"""
+        return self.clients.get(name, default)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise RunCancelled if the run has been cancelled"""
+        if self.cancel_event.is_set():
+            raise RunCancelled(f"Run {self.run_id} was cancelled")
+
+    def report_progress(self, stage: str, status: str, **info: Any):
+        if self.progress_callback:
+            try:
+                self.progress_callback(stage, status, info)
+            except Exception as e:
+                print(f"Warning: Progress callback failed: {str(e)}")
+
+    def record_metric(self, name: str, value: Any):
+        with self._lock:
+            self.metrics[name] = value
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage, record it in metrics and report its start and end"""
+        self.check_cancelled()
+        self.report_progress(name, "started")
+        start_time = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.record_metric(f"{name}_seconds", round(time.monotonic() - start_time, 3))
+            self.report_progress(name, "failed")
+            raise
+        self.record_metric(f"{name}_seconds", round(time.monotonic() - start_time, 3))
+        self.report_progress(name, "completed")
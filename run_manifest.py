@@ -0,0 +1,248 @@
+"""
+Append-only manifest of a generation run.
+
+Every step that produces a file (scene metadata, video segments and their last
+frames, scene videos, sound effects, narration, final video) appends one JSON
+line to run_manifest.jsonl in the run directory. A line records the stage, its
+key (e.g. the scene number), status, inputs, the outputs with their sizes and
+SHA-256 hashes, and other results such as handed-off frame URLs. Output paths
+are stored relative to the run directory so a run can be moved.
+
+Luma generation ids and FAL request ids are recorded as "remote_job" steps when
+a segment is submitted, so a resumed run waits for a generation that was still
+running instead of paying for it again.
+
+Resuming (--continue_from_dir) reads the manifest once and looks completed steps
+up by (stage, key), instead of listing the directory and matching file names for
+every scene. An output only counts as done while its file still exists with the
+recorded size. Directories written before the manifest existed are scanned once
+with scan_directory, and what the scan finds is recorded in a new manifest.
+
+Lines are flushed and fsynced as they are written; a line torn by a crash is
+ignored when the manifest is read.
+
+Usage:
+    manifest = RunManifest(video_dir)
+    manifest.record("scene", 3, outputs={"video": scene_video_path}, inputs={"segments": segment_paths})
+    manifest.output("scene", 3, "video")  # -> absolute path, or None if not completed
+    state = load_run_state(video_dir)     # same shape as scan_directory()
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from scan_directory import scan_directory
+
+MANIFEST_FILENAME = "run_manifest.jsonl"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class RunManifest:
+    """Append-only JSON Lines record of the steps of one run directory"""
+
+    def __init__(self, video_dir: str):
+        self.video_dir = video_dir
+        self.path = os.path.join(video_dir, MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+        self._state: Optional[Dict[tuple, Dict[str, Any]]] = None
+        self._seq = 0
+
+    @staticmethod
+    def exists(video_dir: str) -> bool:
+        return os.path.exists(os.path.join(video_dir, MANIFEST_FILENAME))
+
+    def _relative(self, path: str) -> str:
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.video_dir))
+        return path if relative.startswith("..") else relative
+
+    def _absolute(self, path: str) -> str:
+        return path if os.path.isabs(path) else os.path.join(self.video_dir, path)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """All records in the order they were written"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn last line of a crashed run
+                    continue
+        return records
+
+    def _load_state(self) -> Dict[tuple, Dict[str, Any]]:
+        if self._state is None:
+            self._state = {}
+            for record in self.records():
+                self._state[(record["stage"], record.get("key"))] = record
+                self._seq = max(self._seq, record.get("seq", 0))
+        return self._state
+
+    def record(self, stage: str, key: Any = None, status: str = "completed",
+               inputs: Optional[Dict[str, Any]] = None, outputs: Optional[Dict[str, Optional[str]]] = None,
+               data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Append a record for a step.
+
+        Args:
+            stage (str): Step name, e.g. "scene" or "narration"
+            key: Identifies the step within the stage, e.g. the scene number
+            status (str): "completed", "failed", ...
+            inputs (dict): JSON-serializable inputs of the step
+            outputs (dict): Output name -> file path; size and hash are recorded for existing files
+            data (dict): Other JSON-serializable results of the step, e.g. URLs
+
+        Returns:
+            dict: The record
+        """
+        key = None if key is None else str(key)
+        output_paths, sizes, hashes = {}, {}, {}
+        for name, path in (outputs or {}).items():
+            if not path:
+                continue
+            output_paths[name] = self._relative(path)
+            if os.path.exists(path):
+                sizes[name] = os.path.getsize(path)
+                hashes[name] = hash_file(path)
+
+        with self._lock:
+            self._load_state()
+            self._seq += 1
+            record = {
+                "seq": self._seq,
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "stage": stage,
+                "key": key,
+                "status": status,
+                "inputs": inputs or {},
+                "outputs": output_paths,
+                "sizes": sizes,
+                "hashes": hashes,
+                "data": data or {}
+            }
+            os.makedirs(self.video_dir, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._state[(stage, key)] = record
+        return record
+
+    def get(self, stage: str, key: Any = None) -> Optional[Dict[str, Any]]:
+        """Latest record of a step, or None"""
+        with self._lock:
+            return self._load_state().get((stage, None if key is None else str(key)))
+
+    def output(self, stage: str, key: Any = None, name: str = "output") -> Optional[str]:
+        """Path of an output of a completed step, or None if the step is not done or the file changed size"""
+        record = self.get(stage, key)
+        if not record or record["status"] != "completed" or name not in record["outputs"]:
+            return None
+        path = self._absolute(record["outputs"][name])
+        expected_size = record["sizes"].get(name)
+        if not os.path.exists(path) or (expected_size is not None and os.path.getsize(path) != expected_size):
+            return None
+        return path
+
+    def keys(self, stage: str) -> List[str]:
+        """Keys of the steps of a stage that have records"""
+        with self._lock:
+            return [key for (record_stage, key) in self._load_state() if record_stage == stage]
+
+
+def _state_from_manifest(manifest: RunManifest) -> Optional[Dict[str, Any]]:
+    run = manifest.get("run") or {}
+    scenes_json_path = manifest.output("scene_metadata", name="scenes_json")
+    if not scenes_json_path:
+        return None
+    with open(scenes_json_path, "r") as f:
+        scenes_data = json.load(f)
+
+    result = {
+        "directory": manifest.video_dir,
+        "scenes_json_path": scenes_json_path,
+        "scenes_data": scenes_data,
+        "completed_scenes": [],
+        "incomplete_scenes": [],
+        "scene_videos": {},
+        "sound_effects": {},
+        "narration_text_path": manifest.output("narration", name="text"),
+        "narration_audio_path": manifest.output("narration", name="audio"),
+        "final_video_path": manifest.output("final_video", name="video"),
+        "timestamp": run.get("inputs", {}).get("timestamp"),
+        "source": "manifest"
+    }
+    for scene in scenes_data:
+        scene_number = scene.get("scene_number")
+        if scene_number is None:
+            continue
+        scene_video = manifest.output("scene", scene_number, "video")
+        if scene_video:
+            result["scene_videos"][scene_number] = scene_video
+            result["completed_scenes"].append(scene_number)
+            result["sound_effects"][scene_number] = manifest.output("sound_effect", scene_number, "audio")
+        else:
+            result["incomplete_scenes"].append(scene_number)
+    return result
+
+
+def import_scan_result(manifest: RunManifest, scan_result: Dict[str, Any]):
+    """Record what a directory scan found, so the next resume can use the manifest"""
+    source = {"source": "directory_scan"}
+    if scan_result["timestamp"]:
+        manifest.record("run", inputs=dict(source, timestamp=scan_result["timestamp"]))
+    if scan_result["scenes_json_path"]:
+        manifest.record("scene_metadata", inputs=source, outputs={"scenes_json": scan_result["scenes_json_path"]})
+    for scene_number, video_path in scan_result["scene_videos"].items():
+        manifest.record("scene", scene_number, inputs=source, outputs={"video": video_path})
+    for scene_number, sound_path in scan_result["sound_effects"].items():
+        if sound_path:
+            manifest.record("sound_effect", scene_number, inputs=source, outputs={"audio": sound_path})
+    if scan_result["narration_audio_path"]:
+        manifest.record("narration", inputs=source, outputs={
+            "text": scan_result["narration_text_path"],
+            "audio": scan_result["narration_audio_path"]
+        })
+    if scan_result["final_video_path"]:
+        manifest.record("final_video", inputs=source, outputs={"video": scan_result["final_video_path"]})
+
+
+def load_run_state(video_dir: str) -> Dict[str, Any]:
+    """
+    State of a run directory for resuming, in the shape returned by scan_directory.
+
+    Reads the run manifest when the directory has one; otherwise scans the
+    directory and records the result in a new manifest.
+    """
+    if not os.path.exists(video_dir):
+        raise FileNotFoundError(f"Directory {video_dir} does not exist")
+
+    manifest = RunManifest(video_dir)
+    if RunManifest.exists(video_dir):
+        state = _state_from_manifest(manifest)
+        if state is not None:
+            print(f"Loaded run state from {manifest.path}")
+            return state
+        print("Warning: Run manifest has no scene metadata, scanning the directory instead")
+
+    scan_result = scan_directory(video_dir)
+    scan_result["source"] = "directory_scan"
+    try:
+        import_scan_result(manifest, scan_result)
+    except OSError as e:
+        print(f"Warning: Could not write run manifest: {str(e)}")
+    return scan_result
@@ -3,6 +3,8 @@ import json
 import re
 from typing import Dict, List, Tuple, Optional
 
+SCENE_FILE_PATTERN = re.compile(r'^scene_(\d+)_')
+
 def scan_directory(directory_path: str) -> Dict:
     """
     Scan a video generation directory to determine the state of the generation process.
@@ -22,6 +24,8 @@ def scan_directory(directory_path: str) -> Dict:
         "scenes_data": None,
         "completed_scenes": [],
         "incomplete_scenes": [],
+        "scene_videos": {},
+        "sound_effects": {},
         "narration_text_path": None,
         "narration_audio_path": None,
         "final_video_path": None,
@@ -83,12 +87,15 @@ def scan_directory(directory_path: str) -> Dict:
             except Exception:
                 continue
     
+    # List the directory once and index the files by kind
+    entries = os.listdir(directory_path)
+    
     # Find narration files
-    narration_text_files = [f for f in os.listdir(directory_path) if f.endswith('.txt') and 'narration_text_' in f]
+    narration_text_files = [f for f in entries if f.endswith('.txt') and 'narration_text_' in f]
     if narration_text_files:
         result["narration_text_path"] = os.path.join(directory_path, narration_text_files[0])
     
-    narration_audio_files = [f for f in os.listdir(directory_path) if f.endswith('.mp3') and 'narration_audio_' in f]
+    narration_audio_files = [f for f in entries if f.endswith('.mp3') and 'narration_audio_' in f]
     if narration_audio_files:
         # Prefer adjusted audio if available
         adjusted_files = [f for f in narration_audio_files if 'adjusted' in f]
@@ -98,10 +105,24 @@ def scan_directory(directory_path: str) -> Dict:
             result["narration_audio_path"] = os.path.join(directory_path, narration_audio_files[0])
     
     # Find final video if it exists
-    final_video_files = [f for f in os.listdir(directory_path) if f.endswith('.mp4') and 'final_video_' in f]
+    final_video_files = [f for f in entries if f.endswith('.mp4') and 'final_video_' in f]
     if final_video_files:
         result["final_video_path"] = os.path.join(directory_path, final_video_files[0])
     
+    # Scene videos are scene_{n}_{timestamp}.mp4, scene directories scene_{n}_all_vid_{timestamp}.
+    # Match the scene number exactly, so scene 1 never picks up the files of scene 11.
+    scene_video_files = {}
+    scene_dirs = {}
+    for entry in sorted(entries, reverse=True):  # Most recent first
+        scene_match = SCENE_FILE_PATTERN.match(entry)
+        if not scene_match:
+            continue
+        scene_number = int(scene_match.group(1))
+        if entry.endswith('.mp4'):
+            scene_video_files.setdefault(scene_number, os.path.join(directory_path, entry))
+        elif os.path.isdir(os.path.join(directory_path, entry)):
+            scene_dirs.setdefault(scene_number, []).append(os.path.join(directory_path, entry))
+    
     # Check which scenes have been completed
     if result["scenes_data"]:
         for scene in result["scenes_data"]:
@@ -109,17 +130,23 @@ def scan_directory(directory_path: str) -> Dict:
             if scene_number is None:
                 continue
             
-            # Check if scene video exists
-            scene_video_pattern = f"scene_{scene_number}_"
-            scene_videos = [f for f in os.listdir(directory_path) if f.endswith('.mp4') and scene_video_pattern in f]
-            
-            if scene_videos:
+            if scene_number in scene_video_files:
                 result["completed_scenes"].append(scene_number)
+                result["scene_videos"][scene_number] = scene_video_files[scene_number]
+                result["sound_effects"][scene_number] = _find_sound_effect(scene_dirs.get(scene_number, []), scene_number)
             else:
                 result["incomplete_scenes"].append(scene_number)
     
     return result
 
+def _find_sound_effect(scene_dirs: List[str], scene_number: int) -> Optional[str]:
+    sound_file_name = f"scene_{scene_number}_sound.mp3"
+    for scene_dir in scene_dirs:
+        sound_file = os.path.join(scene_dir, sound_file_name)
+        if os.path.exists(sound_file):
+            return sound_file
+    return None
+
 def get_remaining_scenes(scan_result: Dict) -> List[Dict]:
     """
     Get the list of scenes that still need to be generated.
@@ -149,27 +176,9 @@ def get_completed_scene_videos(scan_result: Dict) -> List[str]:
         scan_result: Result from scan_directory function
         
     Returns:
-        List of file paths to completed scene videos
+        List of file paths to completed scene videos, in scene order
     """
-    if not scan_result["completed_scenes"]:
-        return []
-    
-    directory = scan_result["directory"]
-    completed_videos = []
-    
-    for scene_number in scan_result["completed_scenes"]:
-        scene_video_pattern = f"scene_{scene_number}_"
-        scene_videos = [f for f in os.listdir(directory) if f.endswith('.mp4') and scene_video_pattern in f]
-        
-        if scene_videos:
-            # Sort by timestamp if available
-            scene_videos.sort(reverse=True)  # Most recent first
-            completed_videos.append(os.path.join(directory, scene_videos[0]))
-    
-    # Sort videos by scene number
-    completed_videos.sort(key=lambda x: int(re.search(r'scene_(\d+)_', os.path.basename(x)).group(1)))
-    
-    return completed_videos
+    return [scan_result["scene_videos"][scene_number] for scene_number in scan_result["completed_scenes"]]
 
 def get_sound_effect_files(scan_result: Dict) -> List[Optional[str]]:
     """
@@ -181,25 +190,4 @@ def get_sound_effect_files(scan_result: Dict) -> List[Optional[str]]:
     Returns:
         List of file paths to sound effect files (None for scenes without sound effects)
     """
-    if not scan_result["completed_scenes"]:
-        return []
-    
-    directory = scan_result["directory"]
-    sound_files = []
-    
-    for scene_number in scan_result["completed_scenes"]:
-        # Look for sound effect files in scene subdirectories
-        scene_dirs = [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)) and f"scene_{scene_number}_" in d]
-        
-        sound_file = None
-        for scene_dir in scene_dirs:
-            scene_dir_path = os.path.join(directory, scene_dir)
-            sound_files_in_dir = [f for f in os.listdir(scene_dir_path) if f.endswith('.mp3') and f"scene_{scene_number}_sound" in f]
-            
-            if sound_files_in_dir:
-                sound_file = os.path.join(scene_dir_path, sound_files_in_dir[0])
-                break
-        
-        sound_files.append(sound_file)
-    
-    return sound_files 
\ No newline at end of file
+    return [scan_result["sound_effects"].get(scene_number) for scene_number in scan_result["completed_scenes"]]
@@ -0,0 +1,117 @@
+"""
+Dependency-aware task scheduler used by the scene generation pipeline.
+
+Scene generation is a graph rather than a list: the first segment of a scene
+depends on the scene keyframe (or on the previous scene's last frame when no
+keyframe is generated), each following segment depends on the segment before
+it, and a scene's sound effect depends on the scene's assembled video, whose
+length it is generated to match. TaskGraph runs every task as soon as its
+dependencies have finished, with at most max_workers tasks in flight at once.
+
+Usage:
+    graph = TaskGraph()
+    graph.add_task("keyframe", lambda deps: make_keyframe())
+    graph.add_task("segment_1", lambda deps: make_segment(deps["keyframe"]), deps=["keyframe"])
+    results = graph.run(max_workers=4)
+"""
+
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def _holding(slots: threading.Semaphore, fn: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+    def run(dep_results):
+        with slots:
+            return fn(dep_results)
+    return run
+
+
+class TaskGraph:
+    def __init__(self):
+        self._tasks = {}  # name -> (insertion index, fn, deps)
+        self._dependents = {}  # name -> list of task names waiting on it
+
+    def add_task(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Iterable[str] = ()):
+        """
+        Register a task.
+
+        Args:
+            name (str): Unique task name
+            fn (callable): Called with a dict mapping each dependency name to its result
+            deps (iterable): Names of tasks that must finish first. They must already be
+                             registered, which also keeps the graph acyclic.
+        """
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task name: {name}")
+        deps = tuple(deps)
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name} depends on unknown task: {dep}")
+
+        self._tasks[name] = (len(self._tasks), fn, deps)
+        self._dependents[name] = []
+        for dep in deps:
+            self._dependents[dep].append(name)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run(self, max_workers: int = DEFAULT_MAX_WORKERS, slots: Optional[threading.Semaphore] = None) -> Dict[str, Any]:
+        """
+        Run all tasks, each one as soon as its dependencies are done.
+
+        Ready tasks are started in registration order, so earlier scenes are
+        preferred when more tasks are ready than there are workers. If a task
+        raises, no new tasks are started, the running ones are allowed to
+        finish and the first exception is re-raised.
+
+        Args:
+            max_workers (int): Maximum number of tasks running at the same time
+            slots (threading.Semaphore): Optional budget shared with other graphs; each
+                                         task holds one slot while it runs
+
+        Returns:
+            dict: Mapping of task name to the value its function returned
+        """
+        max_workers = max(1, int(max_workers))
+        results = {}
+        remaining = {name: len(deps) for name, (_, _, deps) in self._tasks.items()}
+        ready: List = [(index, name) for name, (index, _, deps) in self._tasks.items() if not deps]
+        heapq.heapify(ready)
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while running or (ready and error is None):
+                while ready and error is None and len(running) < max_workers:
+                    _, name = heapq.heappop(ready)
+                    _, fn, deps = self._tasks[name]
+                    dep_results = {dep: results[dep] for dep in deps}
+                    if slots is not None:
+                        fn = _holding(slots, fn)
+                    running[executor.submit(fn, dep_results)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        if error is None:
+                            print(f"Task {name} failed: {str(e)}")
+                            error = e
+                        continue
+
+                    for dependent in self._dependents[name]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            heapq.heappush(ready, (self._tasks[dependent][0], dependent))
+
+        if error is not None:
+            raise error
+
+        return results
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from asset_cache import AssetCache
+
+def _store_many(cache_dir, src_path, prefix, count):
+    cache = AssetCache(cache_dir, extension=".mp3", enabled=True)
+    for i in range(count):
+        cache.store(f"{prefix}-{i}", src_path)
+
+class TestAssetCache(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = AssetCache(os.path.join(self.work_dir, "sound_effects"), extension=".mp3", enabled=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _write(self, name, size):
+        path = os.path.join(self.work_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"\x00" * size)
+        return path
+
+    def test_store_then_fetch_into_scene_dir(self):
+        key = self.cache.make_key(text="gentle wind, distant birds", duration_seconds=5, prompt_influence=0.5)
+        self.cache.store(key, self._write("scene_1_sound.mp3", 64))
+
+        dest_path = os.path.join(self.work_dir, "scene_2_all_vid", "scene_2_sound.mp3")
+        self.assertTrue(self.cache.fetch(key, dest_path))
+        self.assertEqual(os.path.getsize(dest_path), 64)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_key_changes_with_duration(self):
+        key_5 = self.cache.make_key(text="rain", duration_seconds=5, prompt_influence=0.5)
+        key_10 = self.cache.make_key(text="rain", duration_seconds=10, prompt_influence=0.5)
+        self.cache.store(key_5, self._write("rain.mp3", 16))
+
+        self.assertFalse(self.cache.fetch(key_10, os.path.join(self.work_dir, "out.mp3")))
+
+    def test_eviction_by_total_bytes(self):
+        self.cache.max_bytes = 150
+        self.cache.store("old", self._write("old.mp3", 100))
+        self.cache.fetch("old", os.path.join(self.work_dir, "touch.mp3"))
+        self.cache.store("new", self._write("new.mp3", 100))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertLessEqual(stats["bytes"], 150)
+        self.assertTrue(self.cache.fetch("new", os.path.join(self.work_dir, "out.mp3")))
+
+    def test_disabled_cache_never_hits(self):
+        self.cache.enabled = False
+        self.cache.store("key", self._write("a.mp3", 8))
+        self.assertFalse(self.cache.fetch("key", os.path.join(self.work_dir, "b.mp3")))
+
+    def test_concurrent_processes_keep_every_index_entry(self):
+        src_path = self._write("wind.mp3", 8)
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_store_many, args=(self.cache.cache_dir, src_path, f"worker{n}", 20))
+                     for n in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+
+        self.assertEqual(self.cache.stats()["entries"], 60)
+
+if __name__ == "__main__":
+    unittest.main()
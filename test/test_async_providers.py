@@ -0,0 +1,76 @@
+import os
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import async_providers
+from asset_cache import AssetCache
+from async_providers import gather_with_limit, run_sync
+
+class TestAsyncProviders(unittest.TestCase):
+    def test_gather_with_limit_bounds_concurrency_and_keeps_order(self):
+        running = {"now": 0, "peak": 0}
+
+        async def job(i):
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return i
+
+        results = run_sync(gather_with_limit([job(i) for i in range(20)], limit=4))
+
+        self.assertEqual(results, list(range(20)))
+        self.assertEqual(running["peak"], 4)
+
+    def test_run_sync_inside_running_loop(self):
+        async def answer():
+            return 42
+
+        async def caller():
+            return run_sync(answer())
+
+        self.assertEqual(asyncio.run(caller()), 42)
+
+    def test_run_sync_propagates_errors(self):
+        async def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            run_sync(fail())
+
+class TestAsyncSoundEffect(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = AssetCache(os.path.join(self.work_dir, "cache"), extension=".mp3", enabled=True)
+        self.requests = []
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _client(self):
+        requests = self.requests
+
+        class SoundEffects:
+            def convert(self, **kwargs):
+                requests.append(kwargs)
+
+                async def stream():
+                    yield b"sound"
+                return stream()
+
+        return mock.Mock(text_to_sound_effects=SoundEffects())
+
+    def test_identical_prompts_are_served_from_the_sound_effect_cache(self):
+        with mock.patch("eleven_labs_tts.sound_effect_cache", self.cache), \
+                mock.patch.object(async_providers, "get_elevenlabs_client", return_value=self._client()):
+            for name in ("a.mp3", "b.mp3"):
+                run_sync(async_providers.generate_sound_effect("wind", os.path.join(self.work_dir, name), 5.0))
+
+        self.assertEqual(len(self.requests), 1)
+        with open(os.path.join(self.work_dir, "b.mp3"), "rb") as f:
+            self.assertEqual(f.read(), b"sound")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import audio_mixer
+from audio_mixer import duck_gain, fit_to_length, limit, mix_scene_audio, place_sound_effects
+from audio_processing import encode_audio
+from ffmpeg_stitcher import get_ffmpeg_exe
+
+SAMPLE_RATE = 8000
+
+def tone(seconds, amplitude=0.5, frequency=200.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    return np.stack([samples, samples], axis=1)
+
+class TestMixerStages(unittest.TestCase):
+    def test_ducking_follows_narration(self):
+        narration = np.concatenate([np.zeros((SAMPLE_RATE, 2), np.float32), tone(2), np.zeros((2 * SAMPLE_RATE, 2), np.float32)])
+        gains = duck_gain(narration, SAMPLE_RATE)
+        ducked = 10 ** (audio_mixer.DUCK_DEPTH_DB / 20)
+
+        self.assertEqual(len(gains), len(narration))
+        self.assertAlmostEqual(gains[SAMPLE_RATE // 2], 1.0, places=3)
+        self.assertAlmostEqual(gains[2 * SAMPLE_RATE], ducked, places=3)
+        # Held through the release time, back to 1 well after the narration stops
+        self.assertAlmostEqual(gains[3 * SAMPLE_RATE + SAMPLE_RATE // 10], ducked, places=3)
+        self.assertAlmostEqual(gains[-1], 1.0, places=3)
+
+    def test_short_audio_is_looped_or_padded_to_video_length(self):
+        effect = tone(1.5)
+        looped, action = fit_to_length(effect, 4 * SAMPLE_RATE, SAMPLE_RATE)
+        self.assertEqual((looped.shape, action), ((4 * SAMPLE_RATE, 2), "looped"))
+        # No gap at the loop points: the level stays up across the whole length
+        block_peaks = np.abs(looped[:, 0]).reshape(-1, SAMPLE_RATE // 20).max(axis=1)
+        self.assertGreater(block_peaks.min(), 0.3)
+
+        padded, action = fit_to_length(effect, 4 * SAMPLE_RATE, SAMPLE_RATE, mode="pad")
+        self.assertEqual(action, "padded")
+        self.assertEqual(np.abs(padded[2 * SAMPLE_RATE:]).max(), 0.0)
+
+        trimmed, action = fit_to_length(effect, SAMPLE_RATE, SAMPLE_RATE)
+        self.assertEqual((len(trimmed), action), (SAMPLE_RATE, "trimmed"))
+
+    def test_limiter_keeps_peaks_under_ceiling(self):
+        samples = np.concatenate([tone(1, amplitude=0.3), tone(0.2, amplitude=2.0), tone(1, amplitude=0.3)])
+        limited = limit(samples, SAMPLE_RATE)
+
+        self.assertLessEqual(np.abs(limited).max(), audio_mixer.LIMITER_CEILING + 1e-6)
+        np.testing.assert_allclose(limited[:SAMPLE_RATE // 2], samples[:SAMPLE_RATE // 2])
+
+@unittest.skipUnless(get_ffmpeg_exe(), "ffmpeg is not available")
+class TestMixScenes(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, samples):
+        return encode_audio(samples, os.path.join(self.temp_dir, name), SAMPLE_RATE)
+
+    def test_effects_are_fitted_per_scene_with_crossfade_and_drift_report(self):
+        effects = [self.write("scene_1_sound.wav", tone(3)), None, self.write("scene_3_sound.wav", tone(0.5))]
+        timeline, drift = place_sound_effects([2.0, 1.0, 1.0], effects, SAMPLE_RATE)
+        crossfade = int(audio_mixer.CROSSFADE_SECONDS * SAMPLE_RATE)
+
+        self.assertEqual(timeline.shape, (4 * SAMPLE_RATE, 2))
+        # Scene 1's effect fades out over the start of scene 2, then scene 2 is silent
+        self.assertGreater(np.abs(timeline[2 * SAMPLE_RATE:2 * SAMPLE_RATE + crossfade // 2]).max(), 0.1)
+        self.assertEqual(np.abs(timeline[2 * SAMPLE_RATE + crossfade:3 * SAMPLE_RATE]).max(), 0.0)
+        # Scene 3's effect is too short to loop and is padded with silence
+        self.assertGreater(np.abs(timeline[3 * SAMPLE_RATE + SAMPLE_RATE // 4:3 * SAMPLE_RATE + SAMPLE_RATE // 3]).max(), 0.1)
+        self.assertEqual(np.abs(timeline[3 * SAMPLE_RATE + SAMPLE_RATE // 2:]).max(), 0.0)
+
+        self.assertEqual([entry["action"] for entry in drift], ["trimmed", "missing", "padded"])
+        self.assertEqual([entry["drift_seconds"] for entry in drift], [1.0, None, -0.5])
+
+    def test_mix_is_scene_length_and_deterministic(self):
+        effects = [self.write("scene_1_sound.wav", tone(2, amplitude=0.9)), self.write("scene_2_sound.wav", tone(2, amplitude=0.9))]
+        narration = self.write("narration.wav", tone(5, amplitude=0.9, frequency=300.0))
+
+        mix, drift = mix_scene_audio([1.5, 1.5], effects, narration, SAMPLE_RATE)
+        self.assertEqual(mix.shape, (3 * SAMPLE_RATE, 2))
+        self.assertEqual(len(drift), 2)
+        self.assertLessEqual(np.abs(mix).max(), audio_mixer.LIMITER_CEILING + 1e-6)
+        np.testing.assert_array_equal(mix, mix_scene_audio([1.5, 1.5], effects, narration, SAMPLE_RATE)[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from audio_processing import decode_audio, encode_audio, stretch_to_duration, time_stretch
+from ffmpeg_stitcher import get_ffmpeg_exe
+
+SAMPLE_RATE = 44100
+
+def tone(seconds, frequency=220.0, channels=1):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    return samples if channels == 1 else np.stack([samples] * channels, axis=1)
+
+def dominant_frequency(samples):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * SAMPLE_RATE / len(samples)
+
+class TestTimeStretch(unittest.TestCase):
+    def test_length_follows_rate_and_pitch_is_kept(self):
+        for rate in (0.7, 1.0, 1.4):
+            stretched = time_stretch(tone(4), rate, SAMPLE_RATE)
+            self.assertEqual(len(stretched), int(round(4 * SAMPLE_RATE / rate)))
+            self.assertAlmostEqual(dominant_frequency(stretched[SAMPLE_RATE // 2:-SAMPLE_RATE // 2]), 220.0, delta=2.0)
+
+    def test_level_is_kept_without_gaps(self):
+        stretched = time_stretch(tone(3), 0.8, SAMPLE_RATE)
+        middle = stretched[SAMPLE_RATE // 2:-SAMPLE_RATE // 2]
+        rms = np.sqrt(np.mean(middle ** 2))
+        self.assertAlmostEqual(rms, 0.5 / np.sqrt(2), delta=0.02)
+
+    def test_exact_output_length_and_channel_layout(self):
+        stretched = time_stretch(tone(2, channels=2), 1.3, SAMPLE_RATE, output_length=12345)
+        self.assertEqual(stretched.shape, (12345, 2))
+        self.assertEqual(stretched.dtype, np.float32)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            time_stretch(tone(1), 0)
+
+@unittest.skipUnless(get_ffmpeg_exe(), "ffmpeg is not available")
+class TestStretchToDuration(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_file_is_stretched_to_target_duration(self):
+        input_path = encode_audio(tone(3), os.path.join(self.temp_dir, "narration.wav"))
+        output_path = os.path.join(self.temp_dir, "narration_adjusted.wav")
+
+        rate = stretch_to_duration(input_path, output_path, 2.5)
+        self.assertAlmostEqual(rate, 1.2, places=3)
+        samples = decode_audio(output_path, channels=1)[:, 0]
+        self.assertEqual(len(samples), int(2.5 * SAMPLE_RATE))
+        self.assertAlmostEqual(dominant_frequency(samples[SAMPLE_RATE // 2:-SAMPLE_RATE // 2]), 220.0, delta=2.0)
+
+if __name__ == "__main__":
+    unittest.main()
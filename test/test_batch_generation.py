@@ -0,0 +1,69 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from batch_generation import collect_jobs, load_manifest
+
+class TestBatchJobs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, "scripts"))
+        for name in ("heist", "noir"):
+            with open(os.path.join(self.temp_dir, "scripts", f"{name}.txt"), "w") as f:
+                f.write(f"{name} script")
+        with open(os.path.join(self.temp_dir, "scripts", "notes.md"), "w") as f:
+            f.write("not a script")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_manifest(self, filename, content):
+        path = os.path.join(self.temp_dir, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_directory_random_scripts_and_unique_names(self):
+        manifest = self.write_manifest("batch.json", json.dumps(["scripts/noir.txt"]))
+        jobs = collect_jobs(os.path.join(self.temp_dir, "scripts"), manifest, random_scripts=2)
+
+        self.assertEqual([job["name"] for job in jobs], ["heist", "noir", "noir_2", "random_1", "random_2"])
+        self.assertTrue(jobs[0]["script_file"].endswith("heist.txt"))
+        self.assertTrue(jobs[3]["random_script"])
+
+    def test_suffixed_names_do_not_collide_with_other_jobs(self):
+        manifest = self.write_manifest("batch.json", json.dumps([
+            {"name": "noir", "script_text": "a"},
+            {"name": "noir", "script_text": "b"},
+            {"name": "noir_2", "script_text": "c"}
+        ]))
+        jobs = collect_jobs(manifest_path=manifest)
+
+        self.assertEqual([job["name"] for job in jobs], ["noir", "noir_3", "noir_2"])
+
+    def test_manifest_paths_are_relative_to_manifest(self):
+        manifest = self.write_manifest("batch.json", json.dumps([
+            {"name": "noir", "script_file": "scripts/noir.txt", "max_scenes": 8},
+            {"random_script": True, "model_choice": "claude"}
+        ]))
+        jobs = load_manifest(manifest)
+
+        self.assertEqual(jobs[0]["script_file"], os.path.join(self.temp_dir, "scripts/noir.txt"))
+        self.assertEqual(jobs[0]["max_scenes"], 8)
+        self.assertEqual(jobs[1]["name"], "job_2")
+        self.assertEqual(jobs[1]["model_choice"], "claude")
+
+    def test_jsonl_manifest(self):
+        manifest = self.write_manifest("batch.jsonl", '{"script_text": "A short script"}\n\n{"script_file": "scripts/heist.txt"}\n')
+        jobs = load_manifest(manifest)
+        self.assertEqual([job["name"] for job in jobs], ["job_1", "heist"])
+
+    def test_invalid_entries_rejected(self):
+        for entry in ({"name": "empty"}, {"script_text": "x", "random_script": True}, {"script_text": "x", "max_scene": 3}):
+            manifest = self.write_manifest("bad.json", json.dumps([entry]))
+            with self.assertRaises(ValueError):
+                load_manifest(manifest)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import downloader
+from downloader import DownloadError, download
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves BODY with byte ranges; drops the connection halfway through the first `drops` requests"""
+    drops = 0
+    ranges = True
+    requests_seen = []
+
+    def do_GET(self):
+        start, end = 0, len(BODY) - 1
+        range_header = self.headers.get("Range")
+        type(self).requests_seen.append(range_header)
+        if range_header and self.ranges:
+            first, last = range_header.split("=")[1].split("-")
+            start, end = int(first), int(last) if last else len(BODY) - 1
+            if start >= len(BODY):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(BODY)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(BODY)}")
+        else:
+            self.send_response(200)
+        body = BODY[start:end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if type(self).drops > 0:
+            type(self).drops -= 1
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestDownloader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/video.mp4"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.temp_dir, "clips", "video.mp4")
+        RangeHandler.drops = 0
+        RangeHandler.ranges = True
+        RangeHandler.requests_seen = []
+        self.schedule = downloader.RETRY_SCHEDULE
+        downloader.RETRY_SCHEDULE = downloader.BackoffSchedule(initial=0.01, max_interval=0.01, jitter=0)
+
+    def tearDown(self):
+        downloader.RETRY_SCHEDULE = self.schedule
+        shutil.rmtree(self.temp_dir)
+
+    def read_output(self):
+        with open(self.output_path, "rb") as f:
+            return f.read()
+
+    def test_interrupted_download_resumes_with_range(self):
+        RangeHandler.drops = 1
+        download(self.url, self.output_path, sha256=hashlib.sha256(BODY).hexdigest())
+
+        self.assertEqual(self.read_output(), BODY)
+        self.assertEqual(RangeHandler.requests_seen[0], None)
+        self.assertEqual(RangeHandler.requests_seen[1], f"bytes={len(BODY) // 2}-")
+        self.assertEqual(os.listdir(os.path.dirname(self.output_path)), ["video.mp4"])
+
+    def test_server_without_ranges_restarts(self):
+        RangeHandler.drops = 1
+        RangeHandler.ranges = False
+        download(self.url, self.output_path)
+        self.assertEqual(self.read_output(), BODY)
+
+    def test_partial_file_of_earlier_process_is_continued(self):
+        os.makedirs(os.path.dirname(self.output_path))
+        with open(f"{self.output_path}.part", "wb") as f:
+            f.write(BODY[:1000])
+        with open(f"{self.output_path}.part.json", "w") as f:
+            f.write(f'{{"url": "{self.url}"}}')
+
+        download(self.url, self.output_path)
+        self.assertEqual(RangeHandler.requests_seen, ["bytes=1000-"])
+        self.assertEqual(self.read_output(), BODY)
+
+    def write_partial(self, data, meta):
+        os.makedirs(os.path.dirname(self.output_path))
+        with open(f"{self.output_path}.part", "wb") as f:
+            f.write(data)
+        with open(f"{self.output_path}.part.json", "w") as f:
+            json.dump(meta, f)
+
+    def test_partial_file_is_continued_from_a_newly_signed_url(self):
+        self.write_partial(BODY[:1000], {"url": f"{self.url}?signature=old", "key": "gen-1", "total": len(BODY)})
+
+        download(f"{self.url}?signature=new", self.output_path, resume_key="gen-1")
+        self.assertEqual(RangeHandler.requests_seen, ["bytes=1000-"])
+        self.assertEqual(self.read_output(), BODY)
+
+    def test_partial_file_of_another_asset_is_discarded(self):
+        self.write_partial(b"x" * 1000, {"url": self.url, "key": "gen-1", "total": len(BODY)})
+        download(self.url, self.output_path, resume_key="gen-2")
+        self.assertEqual(RangeHandler.requests_seen, [None])
+        self.assertEqual(self.read_output(), BODY)
+
+    def test_partial_file_with_another_total_size_restarts(self):
+        self.write_partial(b"x" * 1000, {"url": f"{self.url}?signature=old", "key": None, "total": len(BODY) + 10})
+        download(self.url, self.output_path)
+        self.assertEqual(RangeHandler.requests_seen, ["bytes=1000-", None])
+        self.assertEqual(self.read_output(), BODY)
+
+    def test_verification_failure_keeps_no_file(self):
+        with self.assertRaises(DownloadError):
+            download(self.url, self.output_path, sha256="0" * 64)
+        with self.assertRaises(DownloadError):
+            download(self.url, self.output_path, expected_size=len(BODY) + 1)
+        self.assertEqual(os.listdir(os.path.dirname(self.output_path)), [])
+
+    def test_parallel_ranges(self):
+        original_min = downloader.PARALLEL_MIN_BYTES
+        downloader.PARALLEL_MIN_BYTES = 1024
+        try:
+            download(self.url, self.output_path, parallel=4)
+        finally:
+            downloader.PARALLEL_MIN_BYTES = original_min
+        self.assertEqual(self.read_output(), BODY)
+        self.assertIn(f"bytes=0-{len(BODY) // 4 - 1}", RangeHandler.requests_seen)
+
+if __name__ == "__main__":
+    unittest.main()
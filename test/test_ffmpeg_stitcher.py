@@ -0,0 +1,53 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import numpy as np
+from ffmpeg_stitcher import (get_ffmpeg_exe, probe_video, can_stream_copy, concat_stream_copy,
+                             render_preview, PREVIEW_HEIGHT, PREVIEW_FPS)
+
+FFMPEG = get_ffmpeg_exe()
+
+@unittest.skipUnless(FFMPEG, "ffmpeg is not available")
+class TestFfmpegStitcher(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _make_video(self, name, duration, size="320x240"):
+        path = os.path.join(self.work_dir, name)
+        subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=size={size}:rate=24",
+                        "-t", str(duration), "-c:v", "libx264", "-pix_fmt", "yuv420p", path], check=True)
+        return path
+
+    def test_mismatched_resolution_falls_back(self):
+        videos = [self._make_video("a.mp4", 1), self._make_video("b.mp4", 1, size="640x480")]
+        self.assertFalse(can_stream_copy(videos))
+
+    def test_concat_keeps_total_duration(self):
+        videos = [self._make_video("a.mp4", 2), self._make_video("b.mp4", 3)]
+        self.assertTrue(can_stream_copy(videos))
+
+        output_path = concat_stream_copy(videos, os.path.join(self.work_dir, "scene.mp4"))
+
+        self.assertAlmostEqual(probe_video(output_path)["duration"], 5.0, delta=0.1)
+
+    def test_preview_is_downscaled_and_joins_mismatched_videos(self):
+        videos = [self._make_video("a.mp4", 2, size="1280x720"), self._make_video("b.mp4", 1, size="640x480")]
+        samples = np.zeros((3 * 44100, 2), dtype=np.float32)
+
+        output_path = render_preview(videos, samples, os.path.join(self.work_dir, "preview.mp4"),
+                                     labels=["Scene 1", "Scene 2"])
+
+        probe = probe_video(output_path)
+        self.assertEqual(probe["height"], PREVIEW_HEIGHT)
+        self.assertEqual(probe["width"], 640)
+        self.assertAlmostEqual(probe["fps"], PREVIEW_FPS, delta=0.01)
+        self.assertTrue(probe["has_audio"])
+        self.assertAlmostEqual(probe["duration"], 3.0, delta=0.1)
+
+if __name__ == "__main__":
+    unittest.main()
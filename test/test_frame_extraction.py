@@ -0,0 +1,51 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from ffmpeg_stitcher import get_ffmpeg_exe
+from frame_extraction import extract_last_frame
+
+FFMPEG = get_ffmpeg_exe()
+
+@unittest.skipUnless(FFMPEG, "ffmpeg is not available")
+class TestFrameExtraction(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _make_video(self, name, filter_graph, duration, gop=250):
+        path = os.path.join(self.work_dir, name)
+        subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-f", "lavfi", "-i", filter_graph,
+                        "-t", str(duration), "-c:v", "libx264", "-g", str(gop), "-pix_fmt", "yuv420p", path], check=True)
+        return path
+
+    def test_returns_decodable_jpeg_of_video_size(self):
+        video_path = self._make_video("a.mp4", "testsrc=size=320x240:rate=24", 3)
+
+        frame_bytes = extract_last_frame(video_path)
+
+        frame = cv2.imdecode(np.frombuffer(frame_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(frame.shape[:2], (240, 320))
+
+    def test_returns_final_frame_on_long_gop(self):
+        # Red for 2.5 seconds, then blue for the last half second, all in one GOP
+        video_path = self._make_video(
+            "b.mp4", "color=c=red:size=160x120:rate=24,drawbox=c=blue:t=fill:enable='gte(t,2.5)'", 3
+        )
+
+        frame = cv2.imdecode(np.frombuffer(extract_last_frame(video_path), dtype=np.uint8), cv2.IMREAD_COLOR)
+
+        blue, green, red = frame.reshape(-1, 3).mean(axis=0)
+        self.assertGreater(blue, red)
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(RuntimeError):
+            extract_last_frame(os.path.join(self.work_dir, "missing.mp4"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import unittest
+from frame_handoff import CachedFrameHandoff, GCSFrameHandoff, FalFrameHandoff, get_frame_handoff, content_hash
+
+class FakeUploader:
+    def __init__(self):
+        self.blob_names = []
+
+    def upload_bytes(self, data, filename, content_type="image/jpeg"):
+        self.blob_names.append(filename)
+        return f"https://storage.example.com/{filename}"
+
+class TestFrameHandoff(unittest.TestCase):
+    def test_identical_frames_upload_once(self):
+        uploader = FakeUploader()
+        handoff = CachedFrameHandoff(GCSFrameHandoff(uploader))
+
+        first_url = handoff.upload_bytes(b"frame", "scene_1_last_frame.jpg")
+        second_url = handoff.upload_bytes(b"frame", "scene_2_vid_1_last_frame.jpg")
+
+        self.assertEqual(first_url, second_url)
+        self.assertEqual(len(uploader.blob_names), 1)
+        self.assertEqual(handoff.hits, 1)
+
+    def test_gcs_blob_is_keyed_by_content(self):
+        uploader = FakeUploader()
+        handoff = GCSFrameHandoff(uploader)
+
+        handoff.upload_bytes(b"frame a", "scene_1_last_frame.jpg")
+        handoff.upload_bytes(b"frame b", "scene_1_last_frame.jpg")
+
+        self.assertEqual(len(set(uploader.blob_names)), 2)
+        self.assertTrue(uploader.blob_names[0].startswith(content_hash(b"frame a")[:16]))
+
+    def test_handoff_is_picked_per_engine(self):
+        self.assertIsInstance(get_frame_handoff("ltx").handoff, FalFrameHandoff)
+        self.assertIsInstance(get_frame_handoff("luma").handoff, GCSFrameHandoff)
+
+    def test_expired_url_is_handed_off_again(self):
+        uploader = FakeUploader()
+        handoff = CachedFrameHandoff(GCSFrameHandoff(uploader), max_age=0)
+        handoff.upload_bytes(b"frame", "a.jpg")
+        time.sleep(0.01)
+        handoff.upload_bytes(b"frame", "a.jpg")
+        self.assertEqual(handoff.misses, 2)
+
+    def test_engine_handoff_is_shared_across_calls(self):
+        self.assertIs(get_frame_handoff("ltx"), get_frame_handoff("ltx"))
+        self.assertIsNot(get_frame_handoff("ltx"), get_frame_handoff("luma"))
+
+if __name__ == "__main__":
+    unittest.main()
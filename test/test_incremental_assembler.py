@@ -0,0 +1,125 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+import incremental_assembler
+from asset_cache import AssetCache
+from ffmpeg_stitcher import get_ffmpeg_exe, probe_video
+from incremental_assembler import IncrementalAssembler, choose_target
+
+FFMPEG = get_ffmpeg_exe()
+
+def probe(width=1280, height=720, fps=24.0, codec="h264", profile="High", pix_fmt="yuv420p"):
+    return {"codec": codec, "profile": profile, "width": width, "height": height, "pix_fmt": pix_fmt, "fps": fps}
+
+class TestChooseTarget(unittest.TestCase):
+    def test_most_common_format_wins(self):
+        target = choose_target([probe(640, 480), probe(), probe(profile="Main"), probe()])
+        self.assertEqual(target, probe())
+
+    def test_format_libx264_cannot_write_falls_back_to_high(self):
+        target = choose_target([probe(codec="hevc", profile="Main"), probe(codec="hevc", profile="Main"), probe(640, 480)])
+        self.assertEqual(target, probe())
+
+@unittest.skipUnless(FFMPEG, "ffmpeg is not available")
+class TestIncrementalAssembler(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.cache = AssetCache(os.path.join(self.work_dir, "cache"), extension=".mp4", enabled=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _make_video(self, name, duration, size="320x240", pattern="testsrc"):
+        path = os.path.join(self.work_dir, name)
+        subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{pattern}=size={size}:rate=24",
+                        "-t", str(duration), "-c:v", "libx264", "-pix_fmt", "yuv420p", path], check=True)
+        return path
+
+    def _make_audio(self, name, duration):
+        path = os.path.join(self.work_dir, name)
+        subprocess.run([FFMPEG, "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+                        path], check=True)
+        return path
+
+    def _assembler(self, videos, run_dir="run"):
+        assembler = IncrementalAssembler(os.path.join(self.work_dir, run_dir, "intermediates"), cache=self.cache)
+        for position, video in enumerate(videos, start=1):
+            assembler.set_scene(position, video)
+        return assembler
+
+    def test_compatible_scenes_are_stream_copied(self):
+        videos = [self._make_video("a.mp4", 1), self._make_video("b.mp4", 2)]
+        assembler = self._assembler(videos)
+        output_path = os.path.join(self.work_dir, "final.mp4")
+
+        assembler.assemble(output_path)
+
+        self.assertEqual(assembler.encoded, 0)
+        self.assertEqual(assembler.prepare(), videos)
+        self.assertAlmostEqual(probe_video(output_path)["duration"], 3.0, delta=0.1)
+
+    def test_short_sound_effect_does_not_truncate_video(self):
+        videos = [self._make_video("a.mp4", 2), self._make_video("b.mp4", 2)]
+        assembler = self._assembler(videos)
+        assembler.set_scene(1, videos[0], self._make_audio("scene_1_sound.mp3", 1))
+        output_path = os.path.join(self.work_dir, "final.mp4")
+
+        assembler.assemble(output_path, self._make_audio("narration.mp3", 6))
+
+        probe_result = probe_video(output_path)
+        self.assertTrue(probe_result["has_audio"])
+        self.assertAlmostEqual(probe_result["duration"], 4.0, delta=0.1)
+
+    def test_only_the_replaced_scene_is_normalized_again(self):
+        videos = [self._make_video("a.mp4", 1), self._make_video("b.mp4", 1, size="640x480"),
+                  self._make_video("c.mp4", 1), self._make_video("d.mp4", 1, size="640x480", pattern="testsrc2")]
+        assembler = self._assembler(videos)
+        output_path = os.path.join(self.work_dir, "final.mp4")
+        assembler.assemble(output_path)
+        self.assertEqual(assembler.encoded, 2)
+        probe_result = probe_video(output_path)
+        self.assertEqual((probe_result["width"], probe_result["height"]), (320, 240))
+        self.assertTrue(probe_result["has_audio"])
+        self.assertAlmostEqual(probe_result["duration"], 4.0, delta=0.1)
+
+        # Regenerate scene 2; scene 4 keeps its intermediate and scene 2's old one is removed
+        assembler.set_scene(2, self._make_video("b2.mp4", 2, size="640x480", pattern="testsrc2"))
+        with mock.patch.object(incremental_assembler, "normalize_video", wraps=incremental_assembler.normalize_video) as normalize:
+            assembler.assemble(output_path)
+        self.assertEqual(normalize.call_count, 1)
+        self.assertEqual(normalize.call_args[0][0], os.path.join(self.work_dir, "b2.mp4"))
+        self.assertEqual(len(os.listdir(assembler.work_dir)), 2)
+        self.assertAlmostEqual(probe_video(output_path)["duration"], 5.0, delta=0.1)
+
+    def test_intermediates_are_shared_across_runs(self):
+        videos = [self._make_video("a.mp4", 1), self._make_video("a2.mp4", 1), self._make_video("b.mp4", 1, size="640x480")]
+        self._assembler(videos).assemble(os.path.join(self.work_dir, "first.mp4"))
+
+        assembler = self._assembler(videos, run_dir="second_run")
+        assembler.assemble(os.path.join(self.work_dir, "second.mp4"))
+
+        self.assertEqual((assembler.encoded, assembler.reused), (0, 1))
+
+    def test_scenes_prepared_during_generation_are_not_encoded_again(self):
+        videos = [self._make_video("a.mp4", 1), self._make_video("b.mp4", 1), self._make_video("c.mp4", 1, size="640x480")]
+        work_dir = os.path.join(self.work_dir, "run", "intermediates")
+        generation = IncrementalAssembler(work_dir, cache=None)
+        for scene_number, video in enumerate(videos, start=1):
+            generation.set_scene(scene_number, video)
+            generation.prepare_scene(scene_number)
+        self.assertEqual(generation.encoded, 1)
+
+        stitching = IncrementalAssembler(work_dir, cache=None)
+        for scene_number, video in enumerate(videos, start=1):
+            stitching.set_scene(scene_number, video)
+        with mock.patch.object(incremental_assembler, "normalize_video") as normalize:
+            stitching.assemble(os.path.join(self.work_dir, "final.mp4"))
+
+        normalize.assert_not_called()
+        self.assertEqual((stitching.encoded, stitching.reused), (0, 1))
+
+if __name__ == "__main__":
+    unittest.main()
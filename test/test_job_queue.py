@@ -0,0 +1,136 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import job_queue
+from job_queue import JobQueue, run_job
+from run_context import RunContext
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue = JobQueue(os.path.join(self.temp_dir, "jobs.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def context_factory(self, **kwargs):
+        return RunContext.create(output_dir=os.path.join(self.temp_dir, "runs"), **kwargs)
+
+    def test_jobs_are_claimed_once_in_submission_order(self):
+        first = self.queue.submit({"script_text": "one"})
+        second = self.queue.submit({"script_text": "two"})
+
+        self.assertEqual(self.queue.claim(worker_pid=1)["id"], first)
+        claimed = self.queue.claim(worker_pid=2)
+        self.assertEqual(claimed["id"], second)
+        self.assertEqual(claimed["status"], "running")
+        self.assertEqual(claimed["params"], {"script_text": "two"})
+        self.assertIsNone(self.queue.claim(worker_pid=3))
+
+    def test_concurrent_claims_never_share_a_job(self):
+        job_ids = {self.queue.submit({"n": i}) for i in range(20)}
+        claimed = []
+        lock = threading.Lock()
+
+        def worker(pid):
+            queue = JobQueue(self.queue.db_path)
+            while True:
+                job = queue.claim(pid)
+                if job is None:
+                    return
+                with lock:
+                    claimed.append(job["id"])
+
+        threads = [threading.Thread(target=worker, args=(pid,)) for pid in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(claimed), sorted(job_ids))
+
+    def test_run_job_records_progress_and_result(self):
+        def handler(params, ctx):
+            with ctx.stage("scenes"):
+                ctx.report_progress("scenes", "scene_completed", scene_number=1)
+            return {"final_video": "final.mp4", "video_dir": ctx.video_dir}
+
+        job_id = self.queue.submit({"script_text": "one"})
+        run_job(self.queue, self.queue.claim(1), handler, context_factory=self.context_factory)
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["result"]["final_video"], "final.mp4")
+        self.assertTrue(os.path.isdir(job["result"]["video_dir"]))
+        self.assertEqual(
+            [(event["stage"], event["status"]) for event in job["progress"]],
+            [("job", "started"), ("scenes", "started"), ("scenes", "scene_completed"), ("scenes", "completed")]
+        )
+
+    def test_failed_job_keeps_error(self):
+        def handler(params, ctx):
+            raise RuntimeError("No video generated")
+
+        job_id = self.queue.submit({})
+        run_job(self.queue, self.queue.claim(1), handler, context_factory=self.context_factory)
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "No video generated")
+
+    def test_cancel_queued_job(self):
+        job_id = self.queue.submit({})
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertEqual(self.queue.get(job_id)["status"], "cancelled")
+        self.assertIsNone(self.queue.claim(1))
+        self.assertFalse(self.queue.cancel(job_id))
+
+    def test_cancel_running_job_sets_run_cancel_event(self):
+        original_interval = job_queue.POLL_INTERVAL
+        job_queue.POLL_INTERVAL = 0.01
+        self.addCleanup(setattr, job_queue, "POLL_INTERVAL", original_interval)
+
+        job_id = self.queue.submit({})
+        started = threading.Event()
+
+        def handler(params, ctx):
+            started.set()
+            self.assertTrue(ctx.cancel_event.wait(5))
+            with ctx.stage("stitching"):
+                pass
+
+        thread = threading.Thread(target=run_job, args=(self.queue, self.queue.claim(1), handler, self.context_factory))
+        thread.start()
+        started.wait(5)
+        self.assertTrue(self.queue.cancel(job_id))
+        thread.join(5)
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], "cancelled")
+        self.assertTrue(job["cancel_requested"])
+
+    def test_recover_orphans_fails_jobs_of_dead_workers(self):
+        job_id = self.queue.submit({})
+        self.queue.claim(worker_pid=12345)
+        self.queue.recover_orphans(live_pids=[1], dead_pids=[12345])
+        self.assertEqual(self.queue.get(job_id)["status"], "failed")
+
+    def test_recover_orphans_spares_jobs_with_a_fresh_heartbeat(self):
+        other_instance_job = self.queue.submit({})
+        self.queue.claim(worker_pid=12345)
+        stale_job = self.queue.submit({})
+        self.queue.claim(worker_pid=23456)
+        with self.queue._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 120, stale_job))
+
+        self.queue.heartbeat(other_instance_job)
+        self.queue.recover_orphans(live_pids=[], timeout=60)
+
+        self.assertEqual(self.queue.get(other_instance_job)["status"], "running")
+        self.assertEqual(self.queue.get(stale_job)["status"], "failed")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from llm_cache import LLMResponseCache, cached_gemini_generate_content, cached_anthropic_messages_create
+
+class FakeGeminiModels:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        return SimpleNamespace(text=self.text, parsed=json.loads(self.text))
+
+class FakeAnthropicMessages:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)])
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = LLMResponseCache(cache_dir=self.cache_dir)
+        self.config = {'response_mime_type': 'application/json', 'temperature': 0.7}
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_depends_on_sampling_config(self):
+        key = self.cache.make_key("gemini", "gemini-2.0-flash-001", {"contents": ["script"], "config": {"temperature": 0.7}})
+        same = self.cache.make_key("gemini", "gemini-2.0-flash-001", {"config": {"temperature": 0.7}, "contents": ["script"]})
+        other = self.cache.make_key("gemini", "gemini-2.0-flash-001", {"contents": ["script"], "config": {"temperature": 0.2}})
+        self.assertEqual(key, same)
+        self.assertNotEqual(key, other)
+
+    def test_gemini_hit_skips_api_call(self):
+        client = SimpleNamespace(models=FakeGeminiModels('[{"scene_number": 1}]'))
+
+        first = cached_gemini_generate_content(client, "gemini-2.0-flash-001", ["script"], self.config, cache=self.cache)
+        second = cached_gemini_generate_content(client, "gemini-2.0-flash-001", ["script"], self.config, cache=self.cache)
+
+        self.assertEqual(client.models.calls, 1)
+        self.assertEqual(first.parsed, second.parsed)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_invalid_anthropic_response_not_cached(self):
+        client = SimpleNamespace(messages=FakeAnthropicMessages("not a number"))
+
+        for _ in range(2):
+            cached_anthropic_messages_create(client, cache=self.cache, validate=int, model="claude", messages=[])
+
+        self.assertEqual(client.messages.calls, 2)
+
+    def test_disabled_cache_always_calls_api(self):
+        self.cache.enabled = False
+        client = SimpleNamespace(messages=FakeAnthropicMessages("5"))
+
+        for _ in range(2):
+            cached_anthropic_messages_create(client, cache=self.cache, model="claude", messages=[])
+
+        self.assertEqual(client.messages.calls, 2)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_least_recently_used_entry_evicted(self):
+        self.cache.put("a", {"text": "x" * 100})
+        self.cache.put("b", {"text": "x" * 100})
+        os.utime(os.path.join(self.cache_dir, "a.json"), (1, 1))
+        os.utime(os.path.join(self.cache_dir, "b.json"), (2, 2))
+        self.cache.get("a")  # a becomes the most recently used entry
+
+        self.cache.max_bytes = 250
+        self.cache.put("c", {"text": "x" * 100})
+
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+from unittest import mock
+import ltx_video_generation
+from ltx_video_generation import generate_ltx_video
+
+VIDEO = {"video": {"url": "https://fal/video.mp4"}}
+
+class FakeHandle:
+    def __init__(self, request_id, result=None, error=None):
+        self.request_id = request_id
+        self.result = result
+        self.error = error
+
+    def iter_events(self, with_logs=False):
+        return iter([])
+
+    def get(self):
+        if self.error:
+            raise self.error
+        return dict(self.result)
+
+def fake_client(handle):
+    return mock.Mock(get_handle=mock.Mock(return_value=handle))
+
+@mock.patch.dict(os.environ, {"FAL_API_KEY": "test"})
+class TestLtxResume(unittest.TestCase):
+    def test_new_request_id_reported_on_submit(self):
+        submitted = []
+        with mock.patch.object(ltx_video_generation.fal_client, "submit", return_value=FakeHandle("req-1", VIDEO)):
+            result = generate_ltx_video("a cat", on_submitted=lambda endpoint, request_id: submitted.append((endpoint, request_id)))
+        self.assertEqual(submitted, [("fal-ai/ltx-video-v095", "req-1")])
+        self.assertEqual(result["video_url"], "https://fal/video.mp4")
+
+    def test_recorded_request_is_resumed_without_submitting(self):
+        with mock.patch.object(ltx_video_generation.fal_client, "sync_client", new=fake_client(FakeHandle("req-1", VIDEO))), \
+             mock.patch.object(ltx_video_generation.fal_client, "submit") as submit:
+            result = generate_ltx_video("a cat", request_id="req-1")
+        submit.assert_not_called()
+        self.assertEqual(result["video_url"], "https://fal/video.mp4")
+
+    def test_unresumable_request_is_submitted_again(self):
+        submitted = []
+        with mock.patch.object(ltx_video_generation.fal_client, "sync_client", new=fake_client(FakeHandle("req-1", error=ValueError("expired")))), \
+             mock.patch.object(ltx_video_generation.fal_client, "submit", return_value=FakeHandle("req-2", VIDEO)):
+            generate_ltx_video("a cat", request_id="req-1", on_submitted=lambda endpoint, request_id: submitted.append(request_id))
+        self.assertEqual(submitted, ["req-2"])
+
+if __name__ == "__main__":
+    unittest.main()
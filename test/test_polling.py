@@ -0,0 +1,108 @@
+import threading
+import unittest
+from types import SimpleNamespace
+from polling import BackoffSchedule, GenerationWatcher, PollCancelled, PollMetrics, PollTimeout, luma_failure, luma_is_done, poll_until
+
+FAST = BackoffSchedule(initial=0.01, factor=2, max_interval=0.05, jitter=0)
+
+class FakeLuma:
+    """Returns 'dreaming' for the first polls of every id, then the final state"""
+    def __init__(self, polls_needed, final_state="completed"):
+        self.polls_needed = polls_needed
+        self.final_state = final_state
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def get(self, job_id):
+        with self.lock:
+            self.calls[job_id] = self.calls.get(job_id, 0) + 1
+            done = self.calls[job_id] >= self.polls_needed.get(job_id, 1)
+        state = self.final_state if done else "dreaming"
+        return SimpleNamespace(id=job_id, state=state, failure_reason="bad prompt")
+
+class FlakyLuma(FakeLuma):
+    """Raises the given errors on the first polls before answering like FakeLuma"""
+    def __init__(self, errors, polls_needed=None):
+        super().__init__(polls_needed or {})
+        self.errors = list(errors)
+
+    def get(self, job_id):
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().get(job_id)
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class TestPolling(unittest.TestCase):
+    def test_backoff_grows_to_max_interval(self):
+        schedule = BackoffSchedule(initial=1, factor=2, max_interval=5, jitter=0)
+        self.assertEqual([schedule.interval(i) for i in range(5)], [1, 2, 4, 5, 5])
+
+    def test_poll_until_records_metrics(self):
+        luma = FakeLuma({"a": 3})
+        metrics = PollMetrics()
+
+        generation = poll_until(lambda: luma.get("a"), luma_is_done, luma_failure, schedule=FAST, name="luma", metrics=metrics)
+
+        self.assertEqual(generation.state, "completed")
+        self.assertEqual(metrics.stats()["luma"]["polls"], 3)
+
+    def test_poll_until_raises_on_failure_and_deadline(self):
+        with self.assertRaisesRegex(RuntimeError, "bad prompt"):
+            poll_until(lambda: FakeLuma({}, "failed").get("a"), luma_is_done, luma_failure, schedule=FAST)
+        with self.assertRaises(PollTimeout):
+            poll_until(lambda: FakeLuma({"a": 1000}).get("a"), luma_is_done, luma_failure, deadline=0.05, schedule=FAST)
+
+    def test_poll_until_cancel(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(PollCancelled):
+            poll_until(lambda: FakeLuma({"a": 1000}).get("a"), luma_is_done, luma_failure, cancel_event=cancel_event, schedule=FAST)
+
+    def test_watcher_tracks_many_jobs_in_one_loop(self):
+        luma = FakeLuma({f"job_{i}": i + 1 for i in range(20)})
+        watcher = GenerationWatcher(luma.get, luma_is_done, luma_failure, schedule=FAST, metrics=PollMetrics())
+
+        futures = [watcher.watch(f"job_{i}", deadline=5) for i in range(20)]
+
+        self.assertEqual([f.result(timeout=5).id for f in futures], [f"job_{i}" for i in range(20)])
+        self.assertEqual(luma.calls["job_19"], 20)
+        watcher.stop()
+
+    def test_watcher_deadline(self):
+        watcher = GenerationWatcher(FakeLuma({"slow": 1000}).get, luma_is_done, luma_failure, schedule=FAST, metrics=PollMetrics())
+        with self.assertRaises(PollTimeout):
+            watcher.watch("slow", deadline=0.1).result(timeout=5)
+        watcher.stop()
+
+    def test_transient_fetch_errors_keep_polling(self):
+        luma = FlakyLuma([ConnectionResetError("reset"), FakeHTTPError(503)])
+        generation = poll_until(lambda: luma.get("a"), luma_is_done, luma_failure, schedule=FAST, metrics=PollMetrics())
+        self.assertEqual(generation.state, "completed")
+
+        watcher = GenerationWatcher(FlakyLuma([FakeHTTPError(502)]).get, luma_is_done, luma_failure,
+                                    schedule=FAST, metrics=PollMetrics())
+        self.assertEqual(watcher.watch("b", deadline=5).result(timeout=5).state, "completed")
+        watcher.stop()
+
+    def test_client_errors_end_polling(self):
+        luma = FlakyLuma([FakeHTTPError(404)])
+        with self.assertRaises(FakeHTTPError):
+            poll_until(lambda: luma.get("a"), luma_is_done, luma_failure, schedule=FAST, metrics=PollMetrics())
+
+        watcher = GenerationWatcher(FlakyLuma([FakeHTTPError(401)]).get, luma_is_done, luma_failure,
+                                    schedule=FAST, metrics=PollMetrics())
+        with self.assertRaises(FakeHTTPError):
+            watcher.watch("b").result(timeout=5)
+        watcher.stop()
+
+    def test_transient_errors_until_deadline_time_out(self):
+        luma = FlakyLuma([FakeHTTPError(500)] * 1000)
+        with self.assertRaises(PollTimeout):
+            poll_until(lambda: luma.get("a"), luma_is_done, luma_failure, deadline=0.1, schedule=FAST, metrics=PollMetrics())
+
+if __name__ == "__main__":
+    unittest.main()
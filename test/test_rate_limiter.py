@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+import unittest
+from rate_limiter import ProviderLimiter, RateLimiterRegistry, get_retry_after, is_rate_limited
+
+class FakeResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers or {})
+
+class TestRateLimiter(unittest.TestCase):
+    def test_max_in_flight_caps_concurrency(self):
+        limiter = ProviderLimiter("fal", rate=1000, burst=1000, max_in_flight=2)
+        running = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+            time.sleep(0.02)
+            with lock:
+                running["now"] -= 1
+
+        threads = [threading.Thread(target=limiter.call, args=(job,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(running["peak"], 2)
+        self.assertEqual(limiter.stats()["calls"], 8)
+        self.assertGreaterEqual(limiter.stats()["peak_queue_depth"], 6)
+
+    def test_token_bucket_spaces_calls_after_burst(self):
+        limiter = ProviderLimiter("luma", rate=20, burst=2)
+        start_time = time.monotonic()
+        for _ in range(4):
+            limiter.call(lambda: None)
+        # Two calls from the burst, then two more at 20 per second
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.09)
+
+    def test_retries_throttled_call_after_retry_after(self):
+        limiter = ProviderLimiter("elevenlabs", rate=1000, burst=1000)
+        attempts = []
+
+        def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise FakeHTTPError(429, {"retry-after": "0.1"})
+            return "ok"
+
+        self.assertEqual(limiter.call(flaky), "ok")
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.1)
+        self.assertEqual(limiter.stats()["throttled"], 1)
+
+    def test_other_errors_are_not_retried(self):
+        limiter = ProviderLimiter("fal", rate=1000, burst=1000)
+        with self.assertRaises(FakeHTTPError):
+            limiter.call(self._raise_server_error)
+        self.assertFalse(is_rate_limited(FakeHTTPError(500)))
+        self.assertIsNone(get_retry_after(FakeHTTPError(429)))
+
+    def _raise_server_error(self):
+        raise FakeHTTPError(500)
+
+    def test_endpoints_without_own_limits_share_the_provider_limiter(self):
+        registry = RateLimiterRegistry({"fal": {"rate": 1}, "fal/fal-ai/sana": {"rate": 2}})
+        self.assertIsNot(registry.get("fal", "fal-ai/sana"), registry.get("fal"))
+        self.assertIs(registry.get("fal", "fal-ai/other"), registry.get("fal"))
+
+    def test_split_gives_each_worker_a_share_of_the_limits(self):
+        registry = RateLimiterRegistry({"luma/ray-2": {"rate": 0.5, "burst": 3, "max_in_flight": 5},
+                                        "gemini": {"rate": 5.0, "burst": 10, "max_in_flight": None}})
+        registry.get("luma", "ray-2")
+        registry.split(2)
+
+        ray = registry.get("luma", "ray-2")
+        self.assertEqual((ray.rate, ray.burst, ray.max_in_flight), (0.25, 1, 2))
+        gemini = registry.get("gemini")
+        self.assertEqual((gemini.rate, gemini.burst, gemini.max_in_flight), (2.5, 5, None))
+
+class TestAsyncRateLimiter(unittest.TestCase):
+    def test_async_and_sync_callers_share_the_in_flight_cap(self):
+        limiter = ProviderLimiter("luma", rate=1000, burst=1000, max_in_flight=2)
+        running = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def enter():
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+
+        def leave():
+            with lock:
+                running["now"] -= 1
+
+        def sync_job():
+            enter()
+            time.sleep(0.03)
+            leave()
+
+        async def async_job():
+            enter()
+            await asyncio.sleep(0.03)
+            leave()
+
+        async def main():
+            await asyncio.gather(*(limiter.call_async(async_job) for _ in range(4)))
+
+        threads = [threading.Thread(target=limiter.call, args=(sync_job,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        asyncio.run(main())
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(running["peak"], 2)
+        self.assertEqual(limiter.stats()["calls"], 8)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    def test_async_call_is_retried_after_retry_after(self):
+        limiter = ProviderLimiter("elevenlabs", rate=1000, burst=1000)
+        attempts = []
+
+        async def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise FakeHTTPError(429, {"retry-after": "0.1"})
+            return "ok"
+
+        self.assertEqual(asyncio.run(limiter.call_async(flaky)), "ok")
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.1)
+        self.assertEqual(limiter.stats()["throttled"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
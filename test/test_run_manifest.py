@@ -0,0 +1,118 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from run_manifest import RunManifest, load_run_state
+from scan_directory import scan_directory, get_completed_scene_videos, get_sound_effect_files
+
+TIMESTAMP = "20250101_120000"
+
+class TestRunManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.video_dir = os.path.join(self.temp_dir, f"video_{TIMESTAMP}")
+        os.makedirs(self.video_dir)
+        self.scenes = [{"scene_number": n, "scene_duration": 5} for n in (1, 2, 11)]
+        self.scenes_json = self.write(f"scenes_{TIMESTAMP}.json", json.dumps(self.scenes))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, content="data"):
+        path = os.path.join(self.video_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_record_and_lookup_outputs(self):
+        video = self.write(f"scene_1_{TIMESTAMP}.mp4")
+        manifest = RunManifest(self.video_dir)
+        record = manifest.record("scene", 1, inputs={"segments": ["a.mp4"]}, outputs={"video": video})
+
+        self.assertEqual(record["outputs"]["video"], f"scene_1_{TIMESTAMP}.mp4")
+        self.assertEqual(len(record["hashes"]["video"]), 64)
+
+        # A fresh instance reads the same state back from disk
+        reloaded = RunManifest(self.video_dir)
+        self.assertEqual(reloaded.output("scene", 1, "video"), video)
+        self.assertEqual(reloaded.get("scene", "1")["inputs"], {"segments": ["a.mp4"]})
+        self.assertIsNone(reloaded.output("scene", 2, "video"))
+
+    def test_segment_checkpoint_keeps_frame_and_url(self):
+        video = self.write(f"scene_1_all_vid_{TIMESTAMP}/scene_1_vid_2_{TIMESTAMP}.mp4")
+        frame = self.write(f"scene_1_all_vid_{TIMESTAMP}/scene_1_vid_2_last_frame.jpg", "jpeg")
+        RunManifest(self.video_dir).record(
+            "segment", "1_2", inputs={"image_url": "https://frames/1_1.jpg"},
+            outputs={"video": video, "frame": frame}, data={"frame_url": "https://frames/1_2.jpg"}
+        )
+
+        reloaded = RunManifest(self.video_dir)
+        self.assertEqual(reloaded.output("segment", "1_2", "frame"), frame)
+        self.assertEqual(reloaded.get("segment", "1_2")["data"]["frame_url"], "https://frames/1_2.jpg")
+        self.assertEqual(reloaded.keys("segment"), ["1_2"])
+
+    def test_changed_or_missing_output_is_not_completed(self):
+        video = self.write(f"scene_1_{TIMESTAMP}.mp4")
+        manifest = RunManifest(self.video_dir)
+        manifest.record("scene", 1, outputs={"video": video})
+
+        self.write(f"scene_1_{TIMESTAMP}.mp4", "truncated")
+        self.assertIsNone(manifest.output("scene", 1, "video"))
+        os.remove(video)
+        self.assertIsNone(manifest.output("scene", 1, "video"))
+
+    def test_latest_record_wins_and_torn_line_is_ignored(self):
+        video = self.write(f"scene_1_{TIMESTAMP}.mp4")
+        manifest = RunManifest(self.video_dir)
+        manifest.record("scene", 1, status="failed")
+        manifest.record("scene", 1, outputs={"video": video})
+        with open(manifest.path, "a") as f:
+            f.write('{"stage": "scene", "key": "1", "sta')
+
+        reloaded = RunManifest(self.video_dir)
+        self.assertEqual(reloaded.get("scene", 1)["status"], "completed")
+        self.assertEqual(reloaded.record("scene", 2)["seq"], 3)
+
+    def test_resume_state_from_manifest(self):
+        manifest = RunManifest(self.video_dir)
+        manifest.record("run", inputs={"timestamp": TIMESTAMP})
+        manifest.record("scene_metadata", outputs={"scenes_json": self.scenes_json})
+        video = self.write(f"scene_11_{TIMESTAMP}.mp4")
+        sound = self.write(f"scene_11_all_vid_{TIMESTAMP}/scene_11_sound.mp3")
+        manifest.record("scene", 11, outputs={"video": video})
+        manifest.record("sound_effect", 11, outputs={"audio": sound})
+
+        state = load_run_state(self.video_dir)
+        self.assertEqual(state["source"], "manifest")
+        self.assertEqual(state["timestamp"], TIMESTAMP)
+        self.assertEqual(state["completed_scenes"], [11])
+        self.assertEqual(state["incomplete_scenes"], [1, 2])
+        self.assertEqual(get_completed_scene_videos(state), [video])
+        self.assertEqual(get_sound_effect_files(state), [sound])
+
+    def test_legacy_scan_matches_scene_numbers_exactly(self):
+        video = self.write(f"scene_11_{TIMESTAMP}.mp4")
+        sound = self.write(f"scene_11_all_vid_{TIMESTAMP}/scene_11_sound.mp3")
+
+        scan_result = scan_directory(self.video_dir)
+        self.assertEqual(scan_result["completed_scenes"], [11])
+        self.assertEqual(scan_result["incomplete_scenes"], [1, 2])
+        self.assertEqual(get_completed_scene_videos(scan_result), [video])
+        self.assertEqual(get_sound_effect_files(scan_result), [sound])
+
+    def test_legacy_directory_is_imported_into_manifest(self):
+        video = self.write(f"scene_2_{TIMESTAMP}.mp4")
+
+        state = load_run_state(self.video_dir)
+        self.assertEqual(state["source"], "directory_scan")
+        self.assertTrue(RunManifest.exists(self.video_dir))
+
+        state = load_run_state(self.video_dir)
+        self.assertEqual(state["source"], "manifest")
+        self.assertEqual(state["completed_scenes"], [2])
+        self.assertEqual(get_completed_scene_videos(state), [video])
+
+if __name__ == "__main__":
+    unittest.main()
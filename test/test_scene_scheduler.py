@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+from scene_scheduler import TaskGraph
+
+class TestTaskGraph(unittest.TestCase):
+    def test_dependencies_receive_results(self):
+        graph = TaskGraph()
+        graph.add_task("keyframe", lambda deps: "frame_url")
+        graph.add_task("segment_1", lambda deps: deps["keyframe"] + "/seg1", deps=["keyframe"])
+        graph.add_task("segment_2", lambda deps: deps["segment_1"] + "/seg2", deps=["segment_1"])
+
+        results = graph.run(max_workers=2)
+
+        self.assertEqual(results["segment_2"], "frame_url/seg1/seg2")
+
+    def test_independent_tasks_run_concurrently(self):
+        graph = TaskGraph()
+        barrier = threading.Barrier(3, timeout=5)
+        for i in range(3):
+            graph.add_task(f"scene_{i}", lambda deps: barrier.wait())
+
+        # Would raise BrokenBarrierError if the tasks ran one after another
+        results = graph.run(max_workers=3)
+        self.assertEqual(len(results), 3)
+
+    def test_worker_cap_is_respected(self):
+        graph = TaskGraph()
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def task(deps):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        for i in range(6):
+            graph.add_task(f"task_{i}", task)
+        graph.run(max_workers=2)
+
+        self.assertLessEqual(state["peak"], 2)
+
+    def test_shared_slots_cap_tasks_across_graphs(self):
+        slots = threading.Semaphore(2)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def task(deps):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        graphs = []
+        for g in range(2):
+            graph = TaskGraph()
+            for i in range(4):
+                graph.add_task(f"task_{i}", task)
+            graphs.append(graph)
+
+        threads = [threading.Thread(target=graph.run, kwargs={"max_workers": 4, "slots": slots}) for graph in graphs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(state["peak"], 2)
+
+    def test_failure_stops_dependents_and_reraises(self):
+        graph = TaskGraph()
+        ran = []
+
+        def fail(deps):
+            raise RuntimeError("Generation failed")
+
+        graph.add_task("segment_1", fail)
+        graph.add_task("segment_2", lambda deps: ran.append("segment_2"), deps=["segment_1"])
+
+        with self.assertRaises(RuntimeError):
+            graph.run()
+        self.assertEqual(ran, [])
+
+    def test_unknown_dependency_rejected(self):
+        graph = TaskGraph()
+        with self.assertRaises(ValueError):
+            graph.add_task("segment_1", lambda deps: None, deps=["missing"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+# The module creates its API clients on import
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("LUMAAI_API_KEY", "test")
+import video_generation
+
+SCENE_FIELDS = ("scene_name", "scene_description", "scene_physical_environment", "scene_movement_description",
+                "scene_emotions", "scene_camera_movement", "artistic_style", "sound_effects_prompt")
+
+class FakeHandoff:
+    name = "fake"
+
+    def upload_bytes(self, data, filename):
+        return f"https://frames/{data.decode()}"
+
+    def upload_file(self, path):
+        with open(path, "rb") as f:
+            return self.upload_bytes(f.read(), os.path.basename(path))
+
+@mock.patch.dict(os.environ, {"FAL_API_KEY": "test"})
+class TestResume(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.scenes = [dict({field: "x" for field in SCENE_FIELDS}, scene_number=n, scene_duration=5) for n in (1, 2, 3)]
+        self.ltx_calls = []
+        self.failing_scene = 2
+        self.frames = 0
+        self.sound_calls = []
+        self.failing_sounds = set()
+        self.stitch = mock.Mock(return_value="final.mp4")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_metadata(self, ctx, script, **kwargs):
+        with open(ctx.path(f"scenes_{ctx.timestamp}.json"), "w") as f:
+            json.dump(self.scenes, f)
+        return self.scenes
+
+    def fake_ltx(self, prompt, output_path, image_url=None, request_id=None, on_submitted=None):
+        scene_number = int(os.path.basename(output_path).split("_")[1])
+        self.ltx_calls.append((scene_number, image_url))
+        if scene_number == self.failing_scene:
+            raise RuntimeError("FAL is down")
+        with open(output_path, "wb") as f:
+            f.write(b"video")
+        return {}
+
+    def fake_sound_effect(self, scene, scene_dir, duration_seconds=None):
+        self.sound_calls.append(scene["scene_number"])
+        if scene["scene_number"] in self.failing_sounds:
+            return None
+        path = os.path.join(scene_dir, f"scene_{scene['scene_number']}_sound.mp3")
+        with open(path, "wb") as f:
+            f.write(b"sound")
+        return path
+
+    def fake_last_frame(self, video_path):
+        self.frames += 1
+        return f"frame{self.frames}".encode()
+
+    @contextmanager
+    def fake_providers(self):
+        with mock.patch.object(video_generation, "generate_scene_metadata", self.write_metadata), \
+             mock.patch.object(video_generation, "generate_ltx_video", self.fake_ltx), \
+             mock.patch.object(video_generation, "extract_last_frame", self.fake_last_frame), \
+             mock.patch.object(video_generation, "get_frame_handoff", lambda video_engine: FakeHandoff()), \
+             mock.patch.object(video_generation, "generate_scene_sound_effect", self.fake_sound_effect), \
+             mock.patch.object(video_generation, "stitch_videos", self.stitch):
+            yield
+
+    def run_pipeline(self, **kwargs):
+        kwargs = dict({"skip_sound_effects": True}, **kwargs)
+        with self.fake_providers():
+            return video_generation.generate_video("script", video_engine="ltx", skip_narration=True,
+                                                   max_workers=1, **kwargs)
+
+    def test_first_remaining_scene_chains_from_last_frame_of_completed_scene(self):
+        ctx = video_generation.new_run_context(output_dir=self.temp_dir)
+        self.run_pipeline(ctx=ctx)
+        self.assertEqual(self.ltx_calls, [(1, None), (2, "https://frames/frame1")])
+
+        self.ltx_calls.clear()
+        self.failing_scene = None
+        _, final_video = self.run_pipeline(continue_from_dir=ctx.video_dir)
+
+        self.assertEqual(final_video, "final.mp4")
+        self.assertEqual(self.ltx_calls, [(2, "https://frames/frame1"), (3, "https://frames/frame2")])
+
+    def test_resume_generates_sound_effects_that_failed_after_assembly(self):
+        ctx = video_generation.new_run_context(output_dir=self.temp_dir)
+        self.failing_scene = 3
+        self.failing_sounds = {1}
+        self.run_pipeline(ctx=ctx, skip_sound_effects=False)
+        self.assertEqual(sorted(self.sound_calls), [1, 2])
+
+        self.sound_calls.clear()
+        self.failing_scene = None
+        self.failing_sounds = set()
+        self.run_pipeline(continue_from_dir=ctx.video_dir, skip_sound_effects=False)
+
+        self.assertEqual(sorted(self.sound_calls), [1, 3])
+        video_files, sound_effect_files = self.stitch.call_args.args[1:3]
+        self.assertEqual(len(video_files), 3)
+        self.assertTrue(all(sound_effect_files))
+
+    def test_scene_after_a_gap_does_not_chain_from_an_earlier_scene(self):
+        ctx = video_generation.new_run_context(output_dir=self.temp_dir)
+        self.failing_scene = None
+        scenes = [dict(self.scenes[0], scene_number=n) for n in (2, 5)]
+        with self.fake_providers():
+            video_generation.generate_scenes(ctx, scenes, "ltx", skip_sound_effects=True,
+                                             start_frame_urls={2: "https://frames/scene1"}, max_workers=1)
+
+        self.assertEqual(sorted(self.ltx_calls), [(2, "https://frames/scene1"), (5, None)])
+
+class TestLumaReattach(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.ctx = video_generation.new_run_context(output_dir=self.temp_dir)
+        self.scene = {"scene_number": 1, "scene_duration": 5}
+        self.luma = mock.Mock()
+        self.luma.generations.create.return_value = mock.Mock(id="gen-new")
+        self.ctx.clients["luma"] = self.luma
+        self.watched = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def fake_watch(self, generation_id, **kwargs):
+        self.watched.append(generation_id)
+        generation = mock.Mock(id=generation_id)
+        generation.model_dump.return_value = {"id": generation_id}
+        return mock.Mock(result=mock.Mock(return_value=generation))
+
+    def generate_segment(self, image_url):
+        with mock.patch.object(video_generation.luma_video_watcher, "watch", self.fake_watch), \
+             mock.patch.object(video_generation, "download"), \
+             mock.patch.object(video_generation, "extract_last_frame", return_value=b"frame"):
+            video_generation.generate_video_segment(self.ctx, self.scene, self.ctx.video_dir, 1, 1, 5, "prompt",
+                                                    "luma", image_url, FakeHandoff())
+
+    def record_pending_generation(self, image_url):
+        self.ctx.manifest.record("remote_job", "1_1", status="submitted", inputs={"image_url": image_url, "duration": 5},
+                                 data={"generation_id": "gen-old", "engine": "luma"})
+
+    def test_reattaches_to_generation_with_the_same_keyframe(self):
+        self.record_pending_generation("https://frames/keyframe")
+        self.generate_segment("https://frames/keyframe")
+
+        self.assertEqual(self.watched, ["gen-old"])
+        self.luma.generations.create.assert_not_called()
+
+    def test_generation_from_another_keyframe_is_submitted_again(self):
+        self.record_pending_generation("https://frames/old-keyframe")
+        self.generate_segment("https://frames/new-keyframe")
+
+        self.assertEqual(self.watched, ["gen-new"])
+        keyframe = self.luma.generations.create.call_args.kwargs["keyframes"]["frame0"]
+        self.assertEqual(keyframe["url"], "https://frames/new-keyframe")
+        self.assertEqual(self.ctx.manifest.get("remote_job", "1_1")["inputs"]["image_url"], "https://frames/new-keyframe")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,42 @@
 import os
 import json
+import hashlib
+import math
 import time
 import re
-from datetime import datetime
 from google import genai
 from lumaai import LumaAI
-import requests
-from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, CompositeVideoClip
-from img_bucket import GCPImageUploader
-import cv2
+from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip
 from elevenlabs import ElevenLabs
 import argparse
 import ast
 import eleven_labs_tts
-from eleven_labs_tts import generate_speech
+from eleven_labs_tts import generate_speech, sound_effect_cache
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
-from ltx_video_generation import generate_ltx_video
+from ltx_video_generation import generate_ltx_video, build_ltx_request
+from scene_scheduler import TaskGraph, DEFAULT_MAX_WORKERS
+import llm_cache
+from llm_cache import cached_gemini_generate_content, cached_anthropic_messages_create
+from ffmpeg_stitcher import get_ffmpeg_exe, can_stream_copy, concat_stream_copy, probe_video, render_preview
+from frame_extraction import extract_last_frame
+from audio_processing import stretch_to_duration, encode_audio
+from audio_mixer import mix_scene_audio, print_drift_report
+from incremental_assembler import IncrementalAssembler, INTERMEDIATE_DIR
+from frame_handoff import get_frame_handoff, FRAME_URL_MAX_AGE
+from downloader import download
+import polling
+from polling import GenerationWatcher, PollCancelled, luma_is_done, luma_failure, LUMA_VIDEO_DEADLINE
+import rate_limiter
+from rate_limiter import get_limiter
+from run_context import RunContext
+import batch_generation
 # Import scan_directory module
-from scan_directory import scan_directory, get_remaining_scenes, get_completed_scene_videos, get_sound_effect_files
+from scan_directory import get_remaining_scenes, get_completed_scene_videos, get_sound_effect_files
+from run_manifest import load_run_state
 
 # Initialize clients
 gemini_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
@@ -29,19 +45,67 @@ anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
 # Add video duration configuration
 LUMA_VIDEO_GENERATION_DURATION_OPTIONS = [5, 10, 15]  # Duration in seconds
 
+# Sound effects are cached by prompt, duration and prompt influence
+SOUND_EFFECT_PROMPT_INFLUENCE = 0.5
+# ElevenLabs sound effects are 0.5 to 22 seconds long; requested lengths are rounded up to this step
+SOUND_EFFECT_MIN_SECONDS = 0.5
+SOUND_EFFECT_MAX_SECONDS = 22.0
+SOUND_EFFECT_DURATION_STEP = 0.1
+
 luma_client = LumaAI(auth_token=os.getenv("LUMAAI_API_KEY"))
+# One poll loop tracks every in-flight Luma video generation
+luma_video_watcher = GenerationWatcher(
+    lambda generation_id: get_limiter("luma").call(luma_client.generations.get, id=generation_id),
+    is_done=luma_is_done, is_failed=luma_failure, name="luma_video"
+)
+
+# Schema of the final scenes_{timestamp}.json file
+SCENES_RESPONSE_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'scene_number': {'type': 'integer'},
+            'scene_name': {'type': 'string'},
+            'scene_physical_environment': {'type': 'string'},
+            'scene_movement_description': {'type': 'string'},
+            'scene_emotions': {'type': 'string'},
+            'scene_camera_movement': {'type': 'string'},
+            'scene_duration': {'type': 'integer'},
+            'sound_effects_prompt': {'type': 'string'},
+            'artistic_style': {'type': 'string'}
+        },
+        'required': ['scene_number', 'scene_name', 'scene_physical_environment',
+                   'scene_movement_description', 'scene_emotions',
+                   'scene_camera_movement', 'scene_duration', 'sound_effects_prompt', 'artistic_style']
+    }
+}
 
-# Get current timestamp
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+CLAUDE_SCENES_FORMAT = """
+{
+    "scenes": [
+        {
+            "scene_number": "integer value", 
+            "scene_name": "string value",
+            "scene_physical_environment": "string value",
+            "scene_movement_description": "string value",
+            "scene_emotions": "string value",
+            "scene_camera_movement": "string value",
+            "scene_duration": "integer value", # 5, 9, or 14
+            "sound_effects_prompt": "string value",
+            "artistic_style": "string value"
+        },
+        ...
+    ]
+}
+"""
 
-# Define video directory path (but don't create it yet)
-video_dir = f"generated_videos/video_{timestamp}"
 
-def generate_physical_environments(num_scenes, script, max_environments=3, model="gemini", custom_prompt=None, custom_environments=None):
+def generate_physical_environments(ctx, num_scenes, script, max_environments=3, model="gemini", custom_prompt=None, custom_environments=None):
     # If custom environments are provided, use them directly
     if custom_environments is not None:
         print("Using provided custom environment descriptions")
-        json_path = os.path.join(video_dir, f'scene_physical_environment_{timestamp}.json')
+        json_path = os.path.join(ctx.video_dir, f'scene_physical_environment_{ctx.timestamp}.json')
         with open(json_path, 'w') as f:
             json.dump(custom_environments, f, indent=2)
         return custom_environments, json_path
@@ -73,7 +137,8 @@ def generate_physical_environments(num_scenes, script, max_environments=3, model
     
     try:
         if model == "gemini":
-            response = gemini_client.models.generate_content(
+            response = cached_gemini_generate_content(
+                ctx.client("gemini", gemini_client),
                 model="gemini-2.0-flash-001",
                 contents=[script, prompt],
                 config={
@@ -112,7 +177,9 @@ def generate_physical_environments(num_scenes, script, max_environments=3, model
             }
             """
             
-            response = client.messages.create(
+            response = cached_anthropic_messages_create(
+                client,
+                validate=ast.literal_eval,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8192,
                 temperature=0.7,
@@ -136,8 +203,8 @@ def generate_physical_environments(num_scenes, script, max_environments=3, model
         else:
             raise ValueError(f"Unsupported model: {model}")
         
-        os.makedirs(video_dir, exist_ok=True)
-        json_path = os.path.join(video_dir, f'scene_physical_environment_{timestamp}.json')
+        os.makedirs(ctx.video_dir, exist_ok=True)
+        json_path = os.path.join(ctx.video_dir, f'scene_physical_environment_{ctx.timestamp}.json')
         with open(json_path, 'w') as f:
             json.dump(environments, f, indent=2)
         
@@ -146,7 +213,7 @@ def generate_physical_environments(num_scenes, script, max_environments=3, model
     except Exception as e:
         raise e
 
-def generate_metadata_without_environment(num_scenes, script, model="gemini", video_engine="luma"):
+def generate_metadata_without_environment(ctx, num_scenes, script, model="gemini", video_engine="luma"):
     prompt = f"""
     Create a detailed visual storyboard for {num_scenes} scenes based on the movie script. For each scene, describe:
 
@@ -220,7 +287,8 @@ def generate_metadata_without_environment(num_scenes, script, model="gemini", vi
     
     try:
         if model == "gemini":
-            response = gemini_client.models.generate_content(
+            response = cached_gemini_generate_content(
+                ctx.client("gemini", gemini_client),
                 model="gemini-2.0-flash-001",
                 contents=[script, prompt],
                 config={
@@ -282,7 +350,9 @@ def generate_metadata_without_environment(num_scenes, script, model="gemini", vi
             }
             """
             
-            response = client.messages.create(
+            response = cached_anthropic_messages_create(
+                client,
+                validate=ast.literal_eval,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8192,
                 temperature=0.7,
@@ -306,7 +376,7 @@ def generate_metadata_without_environment(num_scenes, script, model="gemini", vi
         else:
             raise ValueError(f"Unsupported model: {model}")
         
-        json_path = os.path.join(video_dir, f'scene_metadata_no_env_{timestamp}.json')
+        json_path = os.path.join(ctx.video_dir, f'scene_metadata_no_env_{ctx.timestamp}.json')
         with open(json_path, 'w') as f:
             json.dump(metadata, f, indent=2)
         
@@ -315,7 +385,7 @@ def generate_metadata_without_environment(num_scenes, script, model="gemini", vi
     except Exception as e:
         raise e
 
-def combine_metadata_with_environment(num_scenes, script, metadata_path, environments_path, model="gemini"):
+def combine_metadata_with_environment(ctx, num_scenes, script, metadata_path, environments_path, model="gemini"):
     # Load both JSON files
     with open(metadata_path, 'r') as f:
         metadata = json.load(f)
@@ -331,7 +401,8 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
     
     try:
         if model == "gemini":
-            response = gemini_client.models.generate_content(
+            response = cached_gemini_generate_content(
+                ctx.client("gemini", gemini_client),
                 model="gemini-2.0-flash-001",
                 contents=[script, json.dumps(metadata), json.dumps(environments), prompt],
                 config={
@@ -339,26 +410,7 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
                     'temperature': 0.7,
                     'top_p': 0.8,
                     'top_k': 40,
-                    'response_schema': {
-                        'type': 'array',
-                        'items': {
-                            'type': 'object',
-                            'properties': {
-                                'scene_number': {'type': 'integer'},
-                                'scene_name': {'type': 'string'},
-                                'scene_physical_environment': {'type': 'string'},
-                                'scene_movement_description': {'type': 'string'},
-                                'scene_emotions': {'type': 'string'},
-                                'scene_camera_movement': {'type': 'string'},
-                                'scene_duration': {'type': 'integer'},
-                                'sound_effects_prompt': {'type': 'string'},
-                                'artistic_style': {'type': 'string'}
-                            },
-                            'required': ['scene_number', 'scene_name', 'scene_physical_environment',
-                                       'scene_movement_description', 'scene_emotions',
-                                       'scene_camera_movement', 'scene_duration', 'sound_effects_prompt', 'artistic_style']
-                        }
-                    }
+                    'response_schema': SCENES_RESPONSE_SCHEMA
                 }
             )
             final_metadata = response.parsed
@@ -370,26 +422,9 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
             system_prompt = """You are an expert at combining scene metadata with appropriate physical environments.
             """
 
-            claude_metadata_with_env_format = """
-            {
-                "scenes": [
-                    {
-                        "scene_number": "integer value", 
-                        "scene_name": "string value",
-                        "scene_physical_environment": "string value",
-                        "scene_movement_description": "string value",
-                        "scene_emotions": "string value",
-                        "scene_camera_movement": "string value",
-                        "scene_duration": "integer value", # 5, 9, or 14
-                        "sound_effects_prompt": "string value",
-                        "artistic_style": "string value"
-                    },
-                    ...
-                ]
-            }
-            """
-            
-            response = client.messages.create(
+            response = cached_anthropic_messages_create(
+                client,
+                validate=ast.literal_eval,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8192,
                 temperature=0.7,
@@ -399,7 +434,7 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
                     "content": f'''
                     Script:\n{script}\n\nMetadata:\n{json.dumps(metadata)}\n\nEnvironments:\n{json.dumps(environments)}\n\n{prompt}
                     Output in JSON format like this:
-                    {claude_metadata_with_env_format}
+                    {CLAUDE_SCENES_FORMAT}
                     '''
                 }]
             )
@@ -416,7 +451,7 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
         else:
             raise ValueError(f"Unsupported model: {model}")
         
-        json_path = os.path.join(video_dir, f'scenes_{timestamp}.json')
+        json_path = os.path.join(ctx.video_dir, f'scenes_{ctx.timestamp}.json')
         with open(json_path, 'w') as f:
             json.dump(final_metadata, f, indent=2)
         
@@ -425,76 +460,680 @@ def combine_metadata_with_environment(num_scenes, script, metadata_path, environ
     except Exception as e:
         raise e
 
-def generate_scene_metadata(script, model="gemini", max_scenes=5, max_environments=3, custom_env_prompt=None, custom_environments=None, video_engine="luma"):
+def generate_scene_plan(ctx, script, model="gemini", max_scenes=5, max_environments=3, custom_env_prompt=None, custom_environments=None, video_engine="luma"):
+    """
+    One-shot planning: ask the LLM for the final scenes_{timestamp}.json in a single structured request.
+    
+    This replaces the scene count -> environments -> metadata -> combine chain with one
+    round trip. Raises if the response is not a usable scene list, so callers can fall
+    back to the four-step chain.
+    """
+    duration_options = LUMA_VIDEO_GENERATION_DURATION_OPTIONS if video_engine == "luma" else [5, 10]
+    
+    if custom_environments is not None:
+        environment_instructions = f"""
+    Use ONLY these physical environments, copying the chosen description verbatim into scene_physical_environment:
+    {json.dumps(custom_environments)}
+    """
+    else:
+        environment_instructions = custom_env_prompt or f"""
+    First invent {max_environments} detailed physical environments (setting details, lighting conditions,
+    weather and atmospheric conditions, time of day, key objects and elements). Reuse the same environment
+    across two or more scenes so the physical environment stays consistent, and write the full environment
+    description into scene_physical_environment for every scene.
+    """
+    
+    prompt = f"""
+    Create a complete visual storyboard for this movie script in a single pass.
+    
+    1. Decide the optimal number of scenes needed to tell the story effectively, at most {max_scenes}.
+       Scenes should be engaging, artistically pleasing and creative, and should not have racist, sexist elements.
+    
+    2. Physical environments:
+    {environment_instructions}
+    
+    3. For each scene describe:
+       - Scene Name: a descriptive title that captures its essence and mood
+       - Character movement and appearance: natural, fluid movements, detailed and consistent character appearances
+         (ethnicity, gender, age, clothing style) and how characters interact with their environment
+       - Emotional atmosphere: mood, tone and the visual cues that convey it
+       - Camera movement: ONLY one of Static, Move Left, Move Right, Move Up, Move Down, Push In, Pull Out,
+         Zoom In, Zoom Out, Pan Left, Pan Right, Orbit Left, Orbit Right, Crane Up, Crane Down,
+         plus a shot type (wide shot, medium shot, close-up)
+       - Sound effects prompt: environmental sounds, ambient audio and action-related effects for the scene
+       - Scene duration: one of {duration_options} seconds
+       - Artistic style: one consistent visual style across all scenes
+    
+    Each scene should flow naturally from the previous one. Focus on a cohesive visual narrative without dialogue.
+    Scene numbers must be sequential starting from 1.
+    
+    Return: array of complete scene descriptions.
+    """
+    
+    if model == "gemini":
+        response = cached_gemini_generate_content(
+            ctx.client("gemini", gemini_client),
+            model="gemini-2.0-flash-001",
+            contents=[script, prompt],
+            config={
+                'response_mime_type': 'application/json',
+                'temperature': 0.7,
+                'top_p': 0.8,
+                'top_k': 40,
+                'response_schema': SCENES_RESPONSE_SCHEMA
+            }
+        )
+        scenes = response.parsed
+    
+    elif model == "claude":
+        import anthropic
+        client = anthropic.Anthropic(api_key=anthropic_api_key)
+        
+        response = cached_anthropic_messages_create(
+            client,
+            validate=ast.literal_eval,
+            model="claude-3-5-sonnet-20241022",
+            max_tokens=8192,
+            temperature=0.7,
+            system="You are an expert at planning video scenes, their physical environments and their sound design.",
+            messages=[{"role": "user", "content": f"""
+            {script}\n\n{prompt}
+            Output JSON format like this:
+            {CLAUDE_SCENES_FORMAT}
+            No explanation is needed.
+            """}]
+        )
+        
+        try:
+            response_text = response.content[0].text
+            scenes = ast.literal_eval(response_text)["scenes"]
+        except Exception as e:
+            print("Raw response content:", response_text)
+            raise RuntimeError(f"Failed to parse Claude's response: {e}")
+    
+    else:
+        raise ValueError(f"Unsupported model: {model}")
+    
+    # Validate the plan before handing it to the video stage
+    if not scenes:
+        raise ValueError("One-shot planning returned no scenes")
+    required_fields = SCENES_RESPONSE_SCHEMA['items']['required']
+    for scene in scenes:
+        missing_fields = [field for field in required_fields if field not in scene]
+        if missing_fields:
+            raise ValueError(f"Scene {scene.get('scene_number')} is missing fields: {missing_fields}")
+        if scene['scene_duration'] not in duration_options:
+            raise ValueError(f"Invalid scene duration: {scene['scene_duration']}")
+    scenes = scenes[:max_scenes]
+    print(f"One-shot planning produced {len(scenes)} scenes (max allowed: {max_scenes})")
+    
+    json_path = os.path.join(ctx.video_dir, f'scenes_{ctx.timestamp}.json')
+    with open(json_path, 'w') as f:
+        json.dump(scenes, f, indent=2)
+    
+    return scenes
+
+def generate_scene_count(ctx, script, model="gemini", max_scenes=5, video_engine="luma"):
+    """Ask the LLM for the optimal number of scenes, capped at max_scenes"""
+    prompt = f"""
+    Analyze this movie script and determine the optimal number of scenes needed to tell the story effectively.
+    Consider that:
+    - Each scene is {LUMA_VIDEO_GENERATION_DURATION_OPTIONS if video_engine == "luma" else "[5, 10]"} seconds long
+    - Scenes should maintain visual continuity
+    - The story should flow naturally
+    - Complex actions may need multiple scenes
+    - The story should be told in a way that is engaging and interesting to watch
+    - The number of scenes should be {max_scenes}
+    - Scene should not have racist, sexist elements
+    - Scene should be artistically pleasing and creative
+    Return only a single integer representing the optimal number of scenes. No explanation is needed.
+    """
+    
+    if model == "gemini":
+        response = cached_gemini_generate_content(
+            ctx.client("gemini", gemini_client),
+            validate=int,
+            model="gemini-2.0-flash-001",
+            contents=[script, prompt],
+            config={
+                'temperature': 0.7,
+                'top_p': 0.8,
+                'top_k': 40
+            }
+        )
+        num_scenes = min(int(response.text.strip()), max_scenes)
+        
+    elif model == "claude":
+        import anthropic
+        client = anthropic.Anthropic(api_key=anthropic_api_key)
+        
+        response = cached_anthropic_messages_create(
+            client,
+            validate=int,
+            model="claude-3-7-sonnet-latest",
+            max_tokens=1048,
+            temperature=0.7,
+            system="You are an expert at analyzing scripts and determining optimal scene counts.",
+            messages=[{"role": "user", "content": f"{script}\n\n{prompt}"}]
+        )
+        num_scenes = min(int(response.content[0].text.strip()), max_scenes)
+    
+    else:
+        raise ValueError(f"Unsupported model: {model}")
+    
+    print(f"LLM determined optimal number of scenes: {num_scenes} (max allowed: {max_scenes})")
+    return num_scenes
+
+def generate_scene_metadata(ctx, script, model="gemini", max_scenes=5, max_environments=3, custom_env_prompt=None, custom_environments=None, video_engine="luma", skip_scene_count=False, planning_mode="chain"):
+    """
+    Generate the final scene list for a script.
+    
+    With planning_mode="one_shot" the final scene list is requested in a single
+    structured call (generate_scene_plan), falling back to the chain below if that fails.
+    
+    In the default "chain" mode the physical environments and the environment-free
+    scene metadata only depend on the script and the scene count, so they are requested
+    concurrently and then combined. With skip_scene_count the scene count round trip is
+    skipped and max_scenes is used directly, leaving two sequential LLM round trips.
+    """
     try:
+        os.makedirs(ctx.video_dir, exist_ok=True)
+        
+        if planning_mode == "one_shot":
+            try:
+                return generate_scene_plan(
+                    ctx,
+                    script,
+                    model=model,
+                    max_scenes=max_scenes,
+                    max_environments=max_environments,
+                    custom_env_prompt=custom_env_prompt,
+                    custom_environments=custom_environments,
+                    video_engine=video_engine
+                )
+            except Exception as e:
+                print(f"Warning: One-shot planning failed, falling back to step-by-step planning: {str(e)}")
+        elif planning_mode != "chain":
+            raise ValueError(f"Unsupported planning mode: {planning_mode}")
+        
         # First, determine optimal number of scenes
-        prompt = f"""
-        Analyze this movie script and determine the optimal number of scenes needed to tell the story effectively.
-        Consider that:
-        - Each scene is {LUMA_VIDEO_GENERATION_DURATION_OPTIONS if video_engine == "luma" else "[5, 10]"} seconds long
-        - Scenes should maintain visual continuity
-        - The story should flow naturally
-        - Complex actions may need multiple scenes
-        - The story should be told in a way that is engaging and interesting to watch
-        - The number of scenes should be {max_scenes}
-        - Scene should not have racist, sexist elements
-        - Scene should be artistically pleasing and creative
-        Return only a single integer representing the optimal number of scenes. No explanation is needed.
-        """
+        if skip_scene_count:
+            num_scenes = max_scenes
+            print(f"Skipping scene count analysis, using {num_scenes} scenes")
+        else:
+            num_scenes = generate_scene_count(ctx, script, model, max_scenes, video_engine)
         
-        if model == "gemini":
-            response = gemini_client.models.generate_content(
-                model="gemini-2.0-flash-001",
-                contents=[script, prompt],
-                config={
-                    'temperature': 0.7,
-                    'top_p': 0.8,
-                    'top_k': 40
-                }
-            )
-            num_scenes = min(int(response.text.strip()), max_scenes)
-            
-        elif model == "claude":
-            import anthropic
-            client = anthropic.Anthropic(api_key=anthropic_api_key)
-            
-            response = client.messages.create(
-                model="claude-3-7-sonnet-latest",
-                max_tokens=1048,
-                temperature=0.7,
-                system="You are an expert at analyzing scripts and determining optimal scene counts.",
-                messages=[{"role": "user", "content": f"{script}\n\n{prompt}"}]
+        # Environments and metadata are independent of each other, so request them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            environments_future = executor.submit(
+                generate_physical_environments,
+                ctx,
+                num_scenes, 
+                script,
+                max_environments=max_environments,
+                model=model,
+                custom_prompt=custom_env_prompt,
+                custom_environments=custom_environments
             )
-            num_scenes = min(int(response.content[0].text.strip()), max_scenes)
+            metadata_future = executor.submit(generate_metadata_without_environment, ctx, num_scenes, script, model, video_engine)
+            environments, env_path = environments_future.result()
+            metadata, metadata_path = metadata_future.result()
         
-        print(f"LLM determined optimal number of scenes: {num_scenes} (max allowed: {max_scenes})")
-        
-        # Continue with existing scene generation logic using determined num_scenes
-        environments, env_path = generate_physical_environments(
-            num_scenes, 
-            script,
-            max_environments=max_environments,
-            model=model,
-            custom_prompt=custom_env_prompt,
-            custom_environments=custom_environments
-        )
-        metadata, metadata_path = generate_metadata_without_environment(num_scenes, script, model, video_engine)
-        final_metadata = combine_metadata_with_environment(num_scenes, script, metadata_path, env_path, model)
+        final_metadata = combine_metadata_with_environment(ctx, num_scenes, script, metadata_path, env_path, model)
         
         return final_metadata
         
     except Exception as e:
-        if os.path.exists(video_dir):
+        if os.path.exists(ctx.video_dir):
             try:
-                os.rmdir(video_dir)
+                os.rmdir(ctx.video_dir)
             except OSError:
                 pass
         raise e
 
-def generate_scenes(scenes, video_engine="luma", skip_sound_effects=False, initial_image_path=None, initial_image_prompt=None, first_frame_image_gen=False, image_gen_model="fal"):
+def get_scene_video_durations(scene, video_engine="luma"):
+    """Split a scene duration into the segment durations the video engine can generate"""
+    scene_duration = scene['scene_duration']
+
+    # For LTX, we support 5, 10 second videos
+    if video_engine == "ltx":
+        if scene_duration == 5:
+            return [5]
+        elif scene_duration == 10:
+            return [5, 5]
+        raise ValueError(f"Invalid scene duration: {scene_duration}")
+
+    # Determine video durations based on scene duration
+    if scene_duration == 5:
+        return [scene_duration]
+    elif scene_duration == 10:
+        return [5, 5]
+    elif scene_duration == 15:
+        return [5, 5, 5]
+    raise ValueError(f"Invalid scene duration: {scene_duration}")
+
+def build_video_prompt(scene):
+    """Construct comprehensive video generation prompt for a scene"""
+    return f"""
+        {scene['scene_physical_environment']}
+        
+        Movement and Action:
+        {scene['scene_movement_description']}
+        
+        Emotional Atmosphere:
+        {scene['scene_emotions']}
+        
+        Camera Instructions:
+        {scene['scene_camera_movement']}
+
+        Artistic Style:
+        {scene['artistic_style']}
+        """
+
+def sound_effect_duration(scene, scene_video_path=None):
+    """
+    Length in seconds to request for a scene's sound effect: the length of the generated
+    scene video (the planned scene duration if it cannot be read), rounded up to
+    SOUND_EFFECT_DURATION_STEP and kept within what ElevenLabs can generate.
+    """
+    duration = scene['scene_duration']
+    if scene_video_path:
+        try:
+            duration = probe_video(scene_video_path)["duration"] or duration
+        except Exception as e:
+            print(f"Warning: Could not read the length of {scene_video_path}: {str(e)}")
+    steps = math.ceil(round(duration / SOUND_EFFECT_DURATION_STEP, 6))
+    return round(min(SOUND_EFFECT_MAX_SECONDS, max(SOUND_EFFECT_MIN_SECONDS, steps * SOUND_EFFECT_DURATION_STEP)), 3)
+
+def generate_scene_sound_effect(scene, scene_dir, duration_seconds=None):
+    """
+    Generate the sound effect for a scene. Returns the mp3 path, or None if generation failed.
+    
+    Identical requests (prompt, duration and prompt influence) are served from the
+    local sound effect store instead of calling ElevenLabs again.
+    
+    Args:
+        scene (dict): Scene metadata
+        scene_dir (str): Directory the sound effect is written to
+        duration_seconds (float): Length to request (default: sound_effect_duration(scene))
+    """
+    duration_seconds = duration_seconds or sound_effect_duration(scene)
+    sound_effect_path = f"{scene_dir}/scene_{scene['scene_number']}_sound.mp3"
+    cache_key = sound_effect_cache.make_key(
+        text=scene['sound_effects_prompt'],
+        duration_seconds=duration_seconds,
+        prompt_influence=SOUND_EFFECT_PROMPT_INFLUENCE
+    )
+    if sound_effect_cache.fetch(cache_key, sound_effect_path):
+        print(f"Reused cached sound effect for Scene {scene['scene_number']}: {sound_effect_path}")
+        return sound_effect_path
+    
+    print(f"Generating sound effect for Scene {scene['scene_number']}")
+    try:
+        def download_sound_effect():
+            sound_effect_generator = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY")).text_to_sound_effects.convert(
+                text=scene['sound_effects_prompt'],
+                duration_seconds=duration_seconds,
+                prompt_influence=SOUND_EFFECT_PROMPT_INFLUENCE
+            )
+            
+            # Write to a temporary file and rename, so a hardlinked cache blob at this path is never overwritten in place
+            temp_path = f"{sound_effect_path}.part"
+            with open(temp_path, 'wb') as f:
+                for chunk in sound_effect_generator:
+                    if chunk is not None:
+                        f.write(chunk)
+            os.replace(temp_path, sound_effect_path)
+        
+        # The request is only sent once the generator is consumed, so the whole download holds the slot
+        get_limiter("elevenlabs", "sound-generation").call(download_sound_effect)
+        
+        sound_effect_cache.store(cache_key, sound_effect_path, metadata={
+            "text": scene['sound_effects_prompt'],
+            "duration_seconds": duration_seconds,
+            "prompt_influence": SOUND_EFFECT_PROMPT_INFLUENCE
+        })
+        print(f"Sound effect saved to: {sound_effect_path}")
+        return sound_effect_path
+    except Exception as e:
+        print(f"Failed to generate sound effect: {e}")
+        return None
+
+def generate_scene_first_frame(scene, scene_dir, video_prompt, image_gen_model="fal"):
+    """Generate the first frame image for a scene. Returns the image URL, or None if generation failed."""
+    print(f"Generating first frame image for Scene {scene['scene_number']}")
+    
+    # Import the appropriate image generation module
+    if image_gen_model == "luma":
+        from luma_image_gen import generate_image
+    else:  # fal
+        from fal_image_gen import generate_image
+        
+    try:
+        # Create a directory for the scene's first frame
+        first_frame_dir = f"{scene_dir}/first_frame"
+        os.makedirs(first_frame_dir, exist_ok=True)
+        
+        # Generate image using the same prompt as the video
+        image_url, image_path = generate_image(video_prompt.strip(), first_frame_dir)
+        
+        if image_url and image_path:
+            print(f"Generated first frame image for Scene {scene['scene_number']}")
+            print(f"Image URL: {image_url}")
+            print(f"Image saved to: {image_path}")
+            return image_url
+        print(f"Warning: Failed to generate first frame image for Scene {scene['scene_number']}")
+    except Exception as e:
+        print(f"Warning: Failed to generate first frame image: {str(e)}")
+    return None
+
+def generate_video_segment(ctx, scene, scene_dir, vid_idx, num_segments, duration, video_prompt, video_engine, image_url, frame_handoff, reattach=True):
+    """
+    Generate one video segment of a scene, starting from image_url when given.
+    
+    The Luma generation id or FAL request id is recorded in the run manifest as soon as
+    the job is submitted. With reattach, a job recorded by an earlier attempt of this run
+    is waited for and downloaded instead of submitting the segment again, as long as it
+    was submitted with the same starting frame (image_url) and duration.
+    
+    Returns:
+        tuple: (video_path, frame_url) - path of the segment video and the handed-off URL of its last frame
+    """
+    ctx.check_cancelled()
+    
+    # Use different naming convention based on number of videos in scene
+    if num_segments == 1:
+        video_path = f"{scene_dir}/scene_{scene['scene_number']}_{ctx.timestamp}.mp4"
+    else:
+        video_path = f"{scene_dir}/scene_{scene['scene_number']}_vid_{vid_idx}_{ctx.timestamp}.mp4"
+    
+    print("Generate video name: ", video_path)
+    print("Generating video with prompt: ", video_prompt.strip())
+    print("Video duration: ", duration)
+    print()
+    
+    # Remote job submitted for this segment by an earlier attempt that did not finish.
+    # A job started from another frame (e.g. a regenerated keyframe) would not continue
+    # the chain, so it is only reattached to when it was submitted with the same inputs.
+    remote_key = segment_key(scene, vid_idx)
+    remote_inputs = {"image_url": image_url, "duration": duration}
+    remote_job = ctx.manifest.get("remote_job", remote_key) if reattach else None
+    pending_job = {}
+    if remote_job and remote_job["data"].get("engine") == video_engine and remote_job["inputs"] == remote_inputs:
+        pending_job = remote_job["data"]
+    
+    def record_remote_job(**job):
+        ctx.manifest.record("remote_job", remote_key, status="submitted", inputs=remote_inputs,
+                            data=dict(job, engine=video_engine))
+
+    if video_engine == "ltx":
+        ltx_args = {
+            "prompt": video_prompt.strip(),
+            "output_path": video_path
+        }
+        if image_url:
+            ltx_args["image_url"] = image_url
+        if pending_job.get("endpoint") == build_ltx_request(video_prompt.strip(), image_url)[0]:
+            ltx_args["request_id"] = pending_job["request_id"]
+        ltx_args["on_submitted"] = lambda endpoint, request_id: record_remote_job(endpoint=endpoint, request_id=request_id)
+        
+        try:
+            result = generate_ltx_video(**ltx_args)
+            if not os.path.exists(video_path):
+                raise RuntimeError("LTX video generation failed to save the video file")
+            
+            # Save the LTX response JSON to the video directory
+            ltx_json_path = f"{os.path.splitext(video_path)[0]}_ltx_response_{ctx.timestamp}.json"
+            # Add the local path to the result
+            result['local_video_path'] = os.path.abspath(video_path)
+            with open(ltx_json_path, 'w') as json_file:
+                json.dump(result, json_file, indent=2)
+            print(f"LTX response JSON saved to: {ltx_json_path}")
+            
+        except Exception as e:
+            raise RuntimeError(f"LTX video generation failed: {str(e)}")
+    else:
+        # Use Luma for video generation
+        generation_params = {
+            "prompt": video_prompt.strip(),
+            "model": "ray-2",
+            "resolution": "720p",
+            "duration": f"{duration}s"
+        }
+        if image_url:
+            generation_params["keyframes"] = {
+                "frame0": {
+                    "type": "image",
+                    "url": image_url
+                }
+            }
+        
+        # Hold a Luma concurrency slot from creation until the generation completes
+        luma_limiter = get_limiter("luma", generation_params["model"])
+        with luma_limiter.slot():
+            generation = None
+            if pending_job.get("generation_id"):
+                try:
+                    print(f"Re-attaching to Luma generation {pending_job['generation_id']}")
+                    generation = luma_video_watcher.watch(
+                        pending_job["generation_id"], deadline=LUMA_VIDEO_DEADLINE, cancel_event=ctx.cancel_event
+                    ).result()
+                except PollCancelled:
+                    raise
+                except Exception as e:
+                    print(f"Warning: Could not resume Luma generation {pending_job['generation_id']}, generating again: {str(e)}")
+            
+            if generation is None:
+                generation = luma_limiter.retry(ctx.client("luma", luma_client).generations.create, **generation_params)
+                record_remote_job(generation_id=generation.id)
+                
+                # Wait for completion
+                print(f"Dreaming... (Luma generation {generation.id})")
+                generation = luma_video_watcher.watch(generation.id, deadline=LUMA_VIDEO_DEADLINE, cancel_event=ctx.cancel_event).result()
+        
+        # Download video
+        download(generation.assets.video, video_path, resume_key=generation.id)
+        
+        # Save the Luma response JSON to the video directory
+        luma_response_dict = generation.model_dump()
+        luma_json_path = f"{os.path.splitext(video_path)[0]}_luma_response_{ctx.timestamp}.json"
+        # Add the local path to the response
+        luma_response_dict['local_video_path'] = os.path.abspath(video_path)
+        with open(luma_json_path, 'w') as json_file:
+            json.dump(luma_response_dict, json_file, indent=2, default=str)
+        print(f"Luma response JSON saved to: {luma_json_path}")
+    
+    # Extract last frame from the video segment straight into memory
+    frame_bytes = extract_last_frame(video_path)
+    
+    # Name of the last frame for each video segment
+    if num_segments == 1:
+        frame_path = f"{scene_dir}/scene_{scene['scene_number']}_last_frame.jpg"
+    else:
+        frame_path = f"{scene_dir}/scene_{scene['scene_number']}_vid_{vid_idx}_last_frame.jpg"
+    print(f"Successfully extracted last frame of: {video_path}")
+    
+    # Hand the frame off to the engine; identical frames map to the same URL
+    frame_url = frame_handoff.upload_bytes(frame_bytes, os.path.basename(frame_path))
+    print(f"Handed off last frame via {frame_handoff.name}: {frame_url}")
+    
+    # Keep a local copy of the frame once the next segment is unblocked
+    with open(frame_path, 'wb') as f:
+        f.write(frame_bytes)
+    
+    ctx.manifest.record("segment", segment_key(scene, vid_idx), inputs={
+        "scene_number": scene['scene_number'],
+        "segment": vid_idx,
+        "duration": duration,
+        "video_engine": video_engine,
+        "image_url": image_url
+    }, outputs={"video": video_path, "frame": frame_path}, data={
+        "frame_url": frame_url,
+        "frame_url_created_at": time.time()
+    })
+    return video_path, frame_url
+
+def segment_key(scene, vid_idx):
+    return f"{scene['scene_number']}_{vid_idx}"
+
+def has_segment_checkpoint(ctx, scene, vid_idx):
+    key = segment_key(scene, vid_idx)
+    return bool(ctx.manifest.output("segment", key, "video") and ctx.manifest.output("segment", key, "frame"))
+
+def load_segment_checkpoint(ctx, scene, vid_idx, frame_handoff):
+    """
+    Reuse a segment finished by an earlier attempt of this run.
+    
+    Returns:
+        tuple: (video_path, frame_url) like generate_video_segment, or None if the segment
+               has no complete checkpoint (video and last frame on disk with the recorded sizes)
+    """
+    if not has_segment_checkpoint(ctx, scene, vid_idx):
+        return None
+    key = segment_key(scene, vid_idx)
+    video_path = ctx.manifest.output("segment", key, "video")
+    frame_path = ctx.manifest.output("segment", key, "frame")
+    
+    data = ctx.manifest.get("segment", key)["data"]
+    frame_url = data.get("frame_url")
+    if not frame_url or time.time() - data.get("frame_url_created_at", 0) > FRAME_URL_MAX_AGE:
+        # The URL may have expired, hand the saved frame off again
+        frame_url = frame_handoff.upload_file(frame_path)
+        ctx.manifest.record("segment", key, inputs=ctx.manifest.get("segment", key)["inputs"],
+                            outputs={"video": video_path, "frame": frame_path},
+                            data={"frame_url": frame_url, "frame_url_created_at": time.time()})
+    print(f"Reusing segment {vid_idx} of Scene {scene['scene_number']} from checkpoint: {video_path}")
+    return video_path, frame_url
+
+def record_sound_effect(ctx, scene, sound_effect_path, duration_seconds=None):
+    """Record a generated sound effect in the run manifest and pass its path through"""
+    if sound_effect_path:
+        ctx.manifest.record("sound_effect", scene['scene_number'], inputs={
+            "prompt": scene['sound_effects_prompt'],
+            "duration_seconds": duration_seconds or scene['scene_duration']
+        }, outputs={"audio": sound_effect_path})
+    return sound_effect_path
+
+def scene_sound_effect(ctx, scene, scene_dir, scene_video):
+    """Sound effect of a scene: the one recorded in the run manifest, or a new one fitted to scene_video"""
+    recorded = ctx.manifest.output("sound_effect", scene['scene_number'], "audio")
+    if recorded:
+        return recorded
+    duration_seconds = sound_effect_duration(scene, scene_video)
+    return record_sound_effect(
+        ctx, scene, generate_scene_sound_effect(scene, scene_dir, duration_seconds), duration_seconds
+    )
+
+def generate_missing_sound_effects(ctx, scenes, scene_videos, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Generate the sound effects that completed scenes are missing.
+    
+    A scene is complete once its video is assembled, and its sound effect is only
+    requested after that, so a run that stopped in between or whose sound effect
+    request failed leaves complete scenes without one (or with a recorded file that
+    is gone). Those sound effects are generated again, fitted to the scene videos.
+    
+    Args:
+        scenes (list): Scenes of the run
+        scene_videos (dict): Scene number -> assembled video of every completed scene
+        max_workers (int): Maximum number of sound effects generated at the same time
+    
+    Returns:
+        dict: Scene number -> sound effect path (None if generation failed) of the scenes that had none
+    """
+    graph = TaskGraph()
+    for scene in scenes:
+        scene_number = scene['scene_number']
+        scene_video = scene_videos.get(scene_number)
+        if not scene_video or ctx.manifest.output("sound_effect", scene_number, "audio"):
+            continue
+        scene_dir = f"{ctx.video_dir}/scene_{scene_number}_all_vid_{ctx.timestamp}"
+        os.makedirs(scene_dir, exist_ok=True)
+        graph.add_task(
+            f"scene_{scene_number}_sound",
+            lambda deps, scene=scene, scene_dir=scene_dir, scene_video=scene_video: scene_sound_effect(
+                ctx, scene, scene_dir, scene_video
+            )
+        )
+    if not len(graph):
+        return {}
+    
+    print(f"Generating the missing sound effects of {len(graph)} completed scenes...")
+    results = graph.run(max_workers=max_workers, slots=ctx.task_slots)
+    return {scene['scene_number']: results[f"scene_{scene['scene_number']}_sound"]
+            for scene in scenes if f"scene_{scene['scene_number']}_sound" in results}
+
+def assemble_scene_video(ctx, scene, scene_videos):
+    """Stitch the segments of a scene into scene_{n}_{timestamp}.mp4 in the video directory"""
+    final_video_path = f"{ctx.video_dir}/scene_{scene['scene_number']}_{ctx.timestamp}.mp4"
+    if len(scene_videos) > 1 and can_stream_copy(scene_videos):
+        # Segments from the same engine share codec parameters, so join them without re-encoding
+        concat_stream_copy(scene_videos, final_video_path)
+    elif len(scene_videos) > 1:
+        scene_clips = [VideoFileClip(video) for video in scene_videos]
+        scene_final = concatenate_videoclips(scene_clips)
+        scene_final.write_videofile(final_video_path)
+        
+        # Close clips
+        for clip in scene_clips:
+            clip.close()
+    else:
+        # Copy the single video to the main directory as well
+        shutil.copy2(scene_videos[0], final_video_path)
+    ctx.manifest.record("scene", scene['scene_number'], inputs={"segments": scene_videos}, outputs={"video": final_video_path})
+    ctx.report_progress("scenes", "scene_completed", scene_number=scene['scene_number'], video_path=final_video_path)
+    return final_video_path
+
+def chained_start_frames(ctx, scenes, remaining_scenes, video_engine):
+    """
+    Find the starting frame of each remaining scene whose previous scene is already complete.
+    
+    The frame is the last frame of the previous scene: the handed-off URL of its last
+    segment checkpoint, or the last frame of its scene video handed off again when the
+    run has no checkpoint for it.
+    
+    Args:
+        scenes (list): All scenes of the run, in order
+        remaining_scenes (list): Scenes that still need to be generated
+        video_engine (str): Video generation engine the frames are handed off to
+    
+    Returns:
+        dict: Scene number -> URL of the frame the scene's first segment starts from
+    """
+    frame_handoff = get_frame_handoff(video_engine)
+    remaining_numbers = {scene['scene_number'] for scene in remaining_scenes}
+    start_frame_urls = {}
+    for previous_scene, scene in zip(scenes, scenes[1:]):
+        if scene['scene_number'] not in remaining_numbers or previous_scene['scene_number'] in remaining_numbers:
+            continue
+        last_vid_idx = len(get_scene_video_durations(previous_scene, video_engine))
+        checkpoint = load_segment_checkpoint(ctx, previous_scene, last_vid_idx, frame_handoff)
+        if checkpoint:
+            start_frame_urls[scene['scene_number']] = checkpoint[1]
+            continue
+        scene_video = ctx.manifest.output("scene", previous_scene['scene_number'], "video")
+        if scene_video:
+            frame_name = f"scene_{previous_scene['scene_number']}_last_frame.jpg"
+            start_frame_urls[scene['scene_number']] = frame_handoff.upload_bytes(extract_last_frame(scene_video), frame_name)
+    return start_frame_urls
+
+def generate_scenes(ctx, scenes, video_engine="luma", skip_sound_effects=False, initial_image_path=None, initial_image_prompt=None, first_frame_image_gen=False, image_gen_model="fal", max_workers=DEFAULT_MAX_WORKERS, start_frame_urls=None):
     """
     Generate video scenes with optional initial image input.
     
+    Scenes are generated as a dependency graph instead of one after another: the
+    first segment of a scene waits for the scene's first frame image when
+    first_frame_image_gen is enabled and for the last frame of the previous scene
+    (scene_number - 1, when it is in scenes) otherwise, and each following segment
+    waits for the segment before it. A sound
+    effect waits for its scene video, so that it is requested at the length of the
+    video actually generated. Once a scene and its sound effect are done, its stitching
+    intermediate is built (see IncrementalAssembler.prepare_scene) while the other
+    scenes are still generating. Every task whose inputs are ready runs concurrently.
+    
+    Segments and sound effects already recorded in the run manifest by an earlier
+    attempt are reused, so a resumed run continues at the first missing segment.
+    
     Args:
         scenes (list): List of scene metadata
         video_engine (str): Video generation engine to use ('luma' or 'ltx')
@@ -503,27 +1142,27 @@ def generate_scenes(scenes, video_engine="luma", skip_sound_effects=False, initi
         initial_image_prompt (str): Prompt to generate initial image using image generation model
         first_frame_image_gen (bool): Whether to generate first frame images for each scene
         image_gen_model (str): Image generation model to use ('luma' or 'fal')
+        max_workers (int): Maximum number of generation tasks running at the same time
+        start_frame_urls (dict): Starting frame URL of scenes whose previous scene is not in scenes,
+                                 e.g. completed by an earlier attempt (see chained_start_frames)
     """
-    scene_video_files = []  # List of lists, each inner list contains videos for one scene
-    sound_effect_files = []
-    last_frame_path = None
-    last_frame_url = None
+    start_frame_urls = start_frame_urls or {}
     first_frame_of_first_scene_url = None  # Initialize this variable
     
-    uploader = GCPImageUploader()
+    frame_handoff = get_frame_handoff(video_engine)
     
     # Create video directory if it doesn't exist
-    os.makedirs(video_dir, exist_ok=True)
+    os.makedirs(ctx.video_dir, exist_ok=True)
     
     # Handle initial image if provided
     if initial_image_path or initial_image_prompt:
-        saved_image_path = f"{video_dir}"
+        saved_image_path = f"{ctx.video_dir}"
         
         if initial_image_path and os.path.exists(initial_image_path):
             # Copy the provided image to video directory
             shutil.copy2(initial_image_path, saved_image_path)
-            # Upload local image to GCP and get URL
-            first_frame_of_first_scene_url = uploader.upload_image(initial_image_path)
+            # Hand the local image off to the video engine and get URL
+            first_frame_of_first_scene_url = frame_handoff.upload_file(initial_image_path)
             print(f"Using provided local image as initial frame: {initial_image_path}")
             print(f"Saved initial image to: {saved_image_path}")
             
@@ -548,294 +1187,131 @@ def generate_scenes(scenes, video_engine="luma", skip_sound_effects=False, initi
                 print(f"Warning: Failed to generate initial image: {str(e)}")
                 first_frame_of_first_scene_url = None
     
+    graph = TaskGraph()
+    scenes_by_number = {scene['scene_number']: scene for scene in scenes}
+    # stitch_videos finds these intermediates by content hash in the same directory
+    assembler = IncrementalAssembler(ctx.path(INTERMEDIATE_DIR)) if get_ffmpeg_exe() else None
     for i, scene in enumerate(scenes):
-        print(f"Generating videos for Scene {scene['scene_number']}")
-        scene_dir = f"{video_dir}/scene_{scene['scene_number']}_all_vid_{timestamp}"
+        scene_number = scene['scene_number']
+        scene_dir = f"{ctx.video_dir}/scene_{scene_number}_all_vid_{ctx.timestamp}"
         os.makedirs(scene_dir, exist_ok=True)
+        video_durations = get_scene_video_durations(scene, video_engine)
+        video_prompt = build_video_prompt(scene)
         
-        # For LTX, we support 5, 10 second videos
-        if video_engine == "ltx":
-            if scene['scene_duration'] == 5:
-                video_durations = [5]
-            elif scene['scene_duration'] == 10:
-                video_durations = [5, 5]
-            else:
-                raise ValueError(f"Invalid scene duration: {scene['scene_duration']}")
-
-        else:
-            scene_duration = scene['scene_duration']
-            # Determine video durations based on scene duration
-            if scene_duration == 5:
-                video_durations = [scene_duration]
-            elif scene_duration == 10:
-                video_durations = [5, 5]
-            elif scene_duration == 15:
-                video_durations = [5, 5, 5]
-            else:
-                raise ValueError(f"Invalid scene duration: {scene_duration}")
-        
-        scene_videos = []  # Store videos for this scene
-        
-        # Handle sound effects
-        if skip_sound_effects:
-            sound_effect_files.append(None)
-        else:
-            sound_effect_path = f"{scene_dir}/scene_{scene['scene_number']}_sound.mp3"
-            print(f"Generating sound effect for Scene {scene['scene_number']}")
-            try:
-                sound_effect_generator = ElevenLabs(api_key=os.getenv("ELEVEN_LABS_API_KEY")).text_to_sound_effects.convert(
-                    text=scene['sound_effects_prompt'],
-                    duration_seconds=scene_duration,
-                    prompt_influence=0.5
-                )
-                
-                with open(sound_effect_path, 'wb') as f:
-                    for chunk in sound_effect_generator:
-                        if chunk is not None:
-                            f.write(chunk)
-                
-                sound_effect_files.append(sound_effect_path)
-                print(f"Sound effect saved to: {sound_effect_path}")
-            except Exception as e:
-                print(f"Failed to generate sound effect: {e}")
-                sound_effect_files.append(None)
-        
-        # Construct comprehensive video generation prompt
-        video_prompt = f"""
-        {scene['scene_physical_environment']}
-        
-        Movement and Action:
-        {scene['scene_movement_description']}
-        
-        Emotional Atmosphere:
-        {scene['scene_emotions']}
-        
-        Camera Instructions:
-        {scene['scene_camera_movement']}
-
-        Artistic Style:
-        {scene['artistic_style']}
-        """
-        
-        # Generate first frame image for this scene if first_frame_image_gen is enabled
-        scene_first_frame_url = None
+        # Work out where the first segment of this scene gets its starting frame
+        start_frame_url = start_frame_urls.get(scene_number)
+        keyframe_task = None
         if first_frame_image_gen:
-            print(f"Generating first frame image for Scene {scene['scene_number']}")
-            
-            # Import the appropriate image generation module
-            if image_gen_model == "luma":
-                from luma_image_gen import generate_image
-            else:  # fal
-                from fal_image_gen import generate_image
-                
-            try:
-                # Create a directory for the scene's first frame
-                first_frame_dir = f"{scene_dir}/first_frame"
-                os.makedirs(first_frame_dir, exist_ok=True)
-                
-                # Generate image using the same prompt as the video
-                image_url, image_path = generate_image(video_prompt.strip(), first_frame_dir)
-                
-                if image_url and image_path:
-                    # Assign the image URL to the scene_first_frame_url variable
-                    scene_first_frame_url = image_url
-                    print(f"Generated first frame image for Scene {scene['scene_number']}")
-                    print(f"Image URL: {scene_first_frame_url}")
-                    print(f"Image saved to: {image_path}")
-                else:
-                    print(f"Warning: Failed to generate first frame image for Scene {scene['scene_number']}")
-            except Exception as e:
-                print(f"Warning: Failed to generate first frame image: {str(e)}")
-        
-        # Generate each video segment for the scene
-        segment_last_frame_url = None  # Track last frame URL within the scene
+            # Once the first segment is checkpointed, its keyframe is not needed again
+            if not has_segment_checkpoint(ctx, scene, 1):
+                keyframe_task = f"scene_{scene_number}_keyframe"
+                graph.add_task(
+                    keyframe_task,
+                    lambda deps, scene=scene, scene_dir=scene_dir, video_prompt=video_prompt: generate_scene_first_frame(
+                        scene, scene_dir, video_prompt, image_gen_model
+                    )
+                )
+        elif not start_frame_url and scene_number - 1 in scenes_by_number:
+            # Chain from the last frame of the previous scene when it is generated in this graph too
+            previous_scene = scenes_by_number[scene_number - 1]
+            keyframe_task = f"scene_{previous_scene['scene_number']}_segment_{len(get_scene_video_durations(previous_scene, video_engine))}"
         
+        segment_tasks = []
         for vid_idx, duration in enumerate(video_durations, 1):
-            # Use different naming convention based on number of videos in scene
-            if len(video_durations) == 1:
-                video_path = f"{scene_dir}/scene_{scene['scene_number']}_{timestamp}.mp4"
+            if vid_idx == 1:
+                start_task = keyframe_task
+                # Fall back to the previous scene's frame from an earlier attempt, and the
+                # first scene to the initial image, when the scene has no keyframe of its own
+                fallback_url = start_frame_url or (first_frame_of_first_scene_url if i == 0 else None)
             else:
-                video_path = f"{scene_dir}/scene_{scene['scene_number']}_vid_{vid_idx}_{timestamp}.mp4"
+                start_task = segment_tasks[-1]
+                fallback_url = None
             
-            print("Generate video name: ", video_path)
-            print("Generating video with prompt: ", video_prompt.strip())
-            print("Video duration: ", duration)
-            print()
-
-            if video_engine == "ltx":
-                # For LTX, use last frame URL as image input if available
-                ltx_args = {
-                    "prompt": video_prompt.strip(),
-                    "output_path": video_path
-                }
-                # Use scene's first frame image if it's the first video segment and first_frame_image_gen is enabled
-                if vid_idx == 1 and scene_first_frame_url:
-                    ltx_args["image_url"] = scene_first_frame_url
-                # Otherwise use first frame of first scene for first scene only
-                elif vid_idx == 1 and i == 0 and first_frame_of_first_scene_url:
-                    ltx_args["image_url"] = first_frame_of_first_scene_url
-                # Use last frame from previous scene for first video of subsequent scenes
-                elif vid_idx == 1 and i > 0 and last_frame_url and not scene_first_frame_url:
-                    ltx_args["image_url"] = last_frame_url
-                # Use last frame from previous video in the same scene
-                elif vid_idx > 1 and segment_last_frame_url:
-                    ltx_args["image_url"] = segment_last_frame_url
-                
-                try:
-                    result = generate_ltx_video(**ltx_args)
-                    if not os.path.exists(video_path):
-                        raise RuntimeError("LTX video generation failed to save the video file")
-                    
-                    # Save the LTX response JSON to the video directory
-                    ltx_json_path = f"{os.path.splitext(video_path)[0]}_ltx_response_{timestamp}.json"
-                    # Add the local path to the result
-                    result['local_video_path'] = os.path.abspath(video_path)
-                    with open(ltx_json_path, 'w') as json_file:
-                        json.dump(result, json_file, indent=2)
-                    print(f"LTX response JSON saved to: {ltx_json_path}")
-                    
-                except Exception as e:
-                    raise RuntimeError(f"LTX video generation failed: {str(e)}")
-            else:
-                # Use Luma for video generation
-                generation_params = {
-                    "prompt": video_prompt.strip(),
-                    "model": "ray-2",
-                    "resolution": "720p",
-                    "duration": f"{duration}s"
-                }
-                
-                # Use scene's first frame image if it's the first video segment and first_frame_image_gen is enabled
-                if vid_idx == 1 and scene_first_frame_url:
-                    generation_params["keyframes"] = {
-                        "frame0": {
-                            "type": "image",
-                            "url": scene_first_frame_url
-                        }
-                    }
-                # Otherwise use first frame of first scene for first scene only
-                elif vid_idx == 1 and i == 0 and first_frame_of_first_scene_url:
-                    generation_params["keyframes"] = {
-                        "frame0": {
-                            "type": "image",
-                            "url": first_frame_of_first_scene_url
-                        }
-                    }
-                # Use last frame from previous scene for first video of subsequent scenes
-                elif vid_idx == 1 and i > 0 and last_frame_url and not scene_first_frame_url:
-                    generation_params["keyframes"] = {
-                        "frame0": {
-                            "type": "image",
-                            "url": last_frame_url
-                        }
-                    }
-                # Use last frame from previous video in the same scene
-                elif vid_idx > 1 and segment_last_frame_url:
-                    generation_params["keyframes"] = {
-                        "frame0": {
-                            "type": "image",
-                            "url": segment_last_frame_url
-                        }
-                    }
-                
-                generation = luma_client.generations.create(**generation_params)
-                
-                # Wait for completion
-                while True:
-                    generation = luma_client.generations.get(id=generation.id)
-                    if generation.state == "completed":
-                        break
-                    elif generation.state == "failed":
-                        raise RuntimeError(f"Generation failed: {generation.failure_reason}")
-                    print("Dreaming...")
-                    time.sleep(3)
-                
-                # Download video
-                response = requests.get(generation.assets.video, stream=True)
-                with open(video_path, 'wb') as file:
-                    file.write(response.content)
-                
-                # Save the Luma response JSON to the video directory
-                luma_response_dict = generation.model_dump()
-                luma_json_path = f"{os.path.splitext(video_path)[0]}_luma_response_{timestamp}.json"
-                # Add the local path to the response
-                luma_response_dict['local_video_path'] = os.path.abspath(video_path)
-                with open(luma_json_path, 'w') as json_file:
-                    json.dump(luma_response_dict, json_file, indent=2, default=str)
-                print(f"Luma response JSON saved to: {luma_json_path}")
-            
-            scene_videos.append(video_path)
-            
-            # Extract last frame from each video segment
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise RuntimeError(f"Could not open video file: {video_path}")
-            
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count-1)
-            ret, frame = cap.read()
-            
-            # Save last frame for each video segment
-            if len(video_durations) == 1:
-                frame_path = f"{scene_dir}/scene_{scene['scene_number']}_last_frame.jpg"
-            else:
-                frame_path = f"{scene_dir}/scene_{scene['scene_number']}_vid_{vid_idx}_last_frame.jpg"
-                
-            if ret:
-                cv2.imwrite(frame_path, frame)
-                print(f"Successfully extracted last frame to: {frame_path}")
-            else:
-                raise RuntimeError(f"Failed to extract last frame from video: {video_path}")
-            
-            cap.release()
-            
-            # Upload frame to GCP and get signed URL
-            max_retries = 3
-            retry_count = 0
-            while retry_count < max_retries:
-                new_frame_url = uploader.upload_image(frame_path)
-                if new_frame_url != segment_last_frame_url:
-                    if vid_idx == len(video_durations):  # If this is the last video in the scene
-                        last_frame_url = new_frame_url  # Save for next scene
+            def run_segment(deps, scene=scene, scene_dir=scene_dir, vid_idx=vid_idx, duration=duration,
+                            num_segments=len(video_durations), video_prompt=video_prompt,
+                            start_task=start_task, fallback_url=fallback_url):
+                image_url = None
+                chain_reused = True
+                if start_task:
+                    start_result = deps[start_task]
+                    # Keyframe tasks return a URL, segment tasks return (video_path, frame_url, reused)
+                    if isinstance(start_result, tuple):
+                        image_url, chain_reused = start_result[1], start_result[2]
                     else:
-                        segment_last_frame_url = new_frame_url  # Save for next video in this scene
-                    print(f"Successfully uploaded frame with unique URL: {new_frame_url}")
-                    break
-                print(f"Got duplicate URL, retrying... (attempt {retry_count + 1}/{max_retries})")
-                time.sleep(2)
-                retry_count += 1
+                        image_url = start_result
+                
+                # A checkpoint is only reused while the segment it chains from was reused too,
+                # otherwise it would continue from a frame that no longer exists in this run
+                if chain_reused:
+                    checkpoint = load_segment_checkpoint(ctx, scene, vid_idx, frame_handoff)
+                    if checkpoint:
+                        return checkpoint + (True,)
+                return generate_video_segment(
+                    ctx, scene, scene_dir, vid_idx, num_segments, duration, video_prompt,
+                    video_engine, image_url or fallback_url, frame_handoff, reattach=chain_reused
+                ) + (False,)
             
-            if retry_count == max_retries:
-                raise RuntimeError(f"Failed to get unique frame URL for video {vid_idx} in scene {scene['scene_number']}")
+            segment_task = f"scene_{scene_number}_segment_{vid_idx}"
+            graph.add_task(segment_task, run_segment, deps=[start_task] if start_task else [])
+            segment_tasks.append(segment_task)
         
-        # Stitch videos for this scene if there are multiple
-        if len(scene_videos) > 1:
-            scene_clips = [VideoFileClip(video) for video in scene_videos]
-            scene_final = concatenate_videoclips(scene_clips)
-            scene_final_path = f"{video_dir}/scene_{scene['scene_number']}_{timestamp}.mp4"
-            scene_final.write_videofile(scene_final_path)
-            
-            # Close clips
-            for clip in scene_clips:
-                clip.close()
-            
-            scene_video_files.append(scene_final_path)
-        else:
-            # Copy the single video to the main directory as well
-            single_video_path = scene_videos[0]
-            final_video_path = f"{video_dir}/scene_{scene['scene_number']}_{timestamp}.mp4"
-            shutil.copy2(single_video_path, final_video_path)
-            scene_video_files.append(final_video_path)
+        assemble_task = f"scene_{scene_number}_assemble"
+        graph.add_task(
+            assemble_task,
+            lambda deps, scene=scene, segment_tasks=segment_tasks: assemble_scene_video(
+                ctx, scene, [deps[task][0] for task in segment_tasks]
+            ),
+            deps=segment_tasks
+        )
+        
+        scene_done_task = assemble_task
+        if not skip_sound_effects:
+            scene_done_task = f"scene_{scene_number}_sound"
+            graph.add_task(
+                scene_done_task,
+                lambda deps, scene=scene, scene_dir=scene_dir, assemble_task=assemble_task: scene_sound_effect(
+                    ctx, scene, scene_dir, deps[assemble_task]
+                ),
+                deps=[assemble_task]
+            )
         
-        time.sleep(2)
+        if assembler:
+            graph.add_task(
+                f"scene_{scene_number}_intermediate",
+                lambda deps, scene_number=scene_number, assemble_task=assemble_task: prepare_scene_intermediate(
+                    assembler, scene_number, deps[assemble_task]
+                ),
+                deps=[assemble_task] if skip_sound_effects else [assemble_task, scene_done_task]
+            )
+    
+    print(f"Generating {len(scenes)} scenes with up to {max_workers} concurrent tasks...")
+    results = graph.run(max_workers=max_workers, slots=ctx.task_slots)
     
+    scene_video_files = [results[f"scene_{scene['scene_number']}_assemble"] for scene in scenes]
+    sound_effect_files = [
+        None if skip_sound_effects else results[f"scene_{scene['scene_number']}_sound"]
+        for scene in scenes
+    ]
     return scene_video_files, sound_effect_files
 
+def prepare_scene_intermediate(assembler, scene_number, scene_video):
+    """
+    Build the stitching intermediate of a finished scene ahead of stitch_videos.
+    
+    Failures only cost time: stitch_videos builds whatever intermediate is missing.
+    """
+    try:
+        assembler.set_scene(scene_number, scene_video)
+        return assembler.prepare_scene(scene_number)
+    except Exception as e:
+        print(f"Warning: Failed to prepare the intermediate of scene {scene_number}: {str(e)}")
+        return None
+
 def calculate_total_duration(scenes):
     """Calculate total duration of all scenes in seconds"""
     return sum(scene['scene_duration'] for scene in scenes)
 
-def generate_narration_text(scenes, total_duration, model="gemini"):
+def generate_narration_text(ctx, scenes, total_duration, model="gemini"):
     """
     Generate narration text based on the scene metadata and desired duration.
     The narration should be timed to roughly match the video duration.
@@ -871,7 +1347,8 @@ def generate_narration_text(scenes, total_duration, model="gemini"):
     
     try:
         if model == "gemini":
-            response = gemini_client.models.generate_content(
+            response = cached_gemini_generate_content(
+                ctx.client("gemini", gemini_client),
                 model="gemini-2.0-flash-001",
                 contents=[combined_description, prompt],
                 config={
@@ -886,7 +1363,8 @@ def generate_narration_text(scenes, total_duration, model="gemini"):
             import anthropic
             client = anthropic.Anthropic(api_key=anthropic_api_key)
             
-            response = client.messages.create(
+            response = cached_anthropic_messages_create(
+                client,
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=8192,
                 temperature=0.7,
@@ -899,7 +1377,7 @@ def generate_narration_text(scenes, total_duration, model="gemini"):
             raise ValueError(f"Unsupported model: {model}")
         
         # Save narration text
-        narration_path = os.path.join(video_dir, f'narration_text_{timestamp}.txt')
+        narration_path = os.path.join(ctx.video_dir, f'narration_text_{ctx.timestamp}.txt')
         with open(narration_path, 'w') as f:
             f.write(narration)
         
@@ -908,40 +1386,23 @@ def generate_narration_text(scenes, total_duration, model="gemini"):
     except Exception as e:
         raise e
 
-def generate_narration_audio(narration_text, target_duration):
+def generate_narration_audio(ctx, narration_text, target_duration):
     """
-    Generate audio narration from text and adjust its speed to match target duration.
-    Returns the path to the processed audio file.
+    Generate audio narration from text and time-stretch it to the target duration,
+    keeping the pitch of the voice. Returns the path to the processed audio file.
     """
     try:
         # Generate initial audio using ElevenLabs
-        audio_path = os.path.join(video_dir, f'narration_audio_{timestamp}.mp3')
+        audio_path = os.path.join(ctx.video_dir, f'narration_audio_{ctx.timestamp}.mp3')
         success = generate_speech(narration_text, audio_path)
         
         if not success:
             raise RuntimeError("Failed to generate speech audio")
         
-        # Load the generated audio to get its duration
-        audio = AudioFileClip(audio_path)
-        original_duration = audio.duration
-        
-        # Calculate the speed factor needed to match target duration
-        speed_factor = original_duration / target_duration
-        
-        # Create speed-adjusted audio using time transformation
-        def speed_change(t):
-            return speed_factor * t
-            
-        adjusted_audio = audio.set_make_frame(lambda t: audio.get_frame(speed_change(t)))
-        adjusted_audio.duration = target_duration
-        
-        # Save the adjusted audio with a valid sample rate
-        adjusted_audio_path = os.path.join(video_dir, f'narration_audio_adjusted_{timestamp}.mp3')
-        adjusted_audio.write_audiofile(adjusted_audio_path, fps=44100)  # Use standard sample rate
-        
-        # Clean up
-        audio.close()
-        adjusted_audio.close()
+        # Stretch the narration to the target duration, keeping its pitch
+        adjusted_audio_path = os.path.join(ctx.video_dir, f'narration_audio_adjusted_{ctx.timestamp}.mp3')
+        speed_factor = stretch_to_duration(audio_path, adjusted_audio_path, target_duration)
+        print(f"Narration adjusted to {target_duration:.2f}s (speed factor {speed_factor:.2f})")
         
         return adjusted_audio_path
         
@@ -949,33 +1410,54 @@ def generate_narration_audio(narration_text, target_duration):
         print(f"Error generating narration audio: {str(e)}")
         return None
 
-def stitch_videos(video_files, sound_effect_files=None, narration_audio_path=None):
+def stitch_videos(ctx, video_files, sound_effect_files=None, narration_audio_path=None, preview=False,
+                  preview_overlay=False):
+    """
+    Stitch scene videos with their sound effects and narration into final_video_{timestamp}.mp4.
+    
+    With preview=True only a low-resolution proxy is rendered instead (see stitch_preview).
+    
+    The video track is assembled by incremental_assembler: scenes in the format most scenes
+    share are stream-copied, the others are normalized once into intermediates that are
+    cached by content hash, so stitching again after a scene was regenerated only encodes
+    that scene, and scenes already normalized by generate_scenes are not encoded again. MoviePy re-encodes every clip when ffmpeg is not usable. Either way the
+    soundtrack is mixed by audio_mixer, which fits every sound effect to the length of its
+    scene video, so no video is cut to its audio; the per-scene drift is printed and
+    recorded with the final video.
+    """
+    if preview:
+        return stitch_preview(ctx, video_files, sound_effect_files, narration_audio_path, overlay=preview_overlay)
+    
+    output_path = f"{ctx.video_dir}/final_video_{ctx.timestamp}.mp4"
+    sound_effect_files = sound_effect_files or [None] * len(video_files)
+    if not (narration_audio_path and os.path.exists(narration_audio_path)):
+        narration_audio_path = None
+    existing_video_files = [video_file for video_file in video_files if os.path.exists(video_file)]
+    if video_files and len(existing_video_files) == len(video_files) and get_ffmpeg_exe():
+        try:
+            assembler = IncrementalAssembler(ctx.path(INTERMEDIATE_DIR))
+            # Key by scene number like generate_scenes does, so its intermediates are found by name
+            scene_numbers = [scene_number_of(video_file, position) for position, video_file in enumerate(video_files, 1)]
+            if len(set(scene_numbers)) != len(scene_numbers) or scene_numbers != sorted(scene_numbers):
+                scene_numbers = list(range(1, len(video_files) + 1))
+            for scene_number, video_file, sound_file in zip(scene_numbers, video_files, sound_effect_files):
+                assembler.set_scene(scene_number, video_file, sound_file)
+            drift = assembler.assemble(output_path, narration_audio_path)
+            print(f"Stitched {len(video_files)} scenes with ffmpeg ({assembler.encoded} normalized, "
+                  f"{assembler.reused} intermediates reused)")
+            print_drift_report(drift)
+            record_final_video(ctx, output_path, video_files, sound_effect_files, narration_audio_path, drift)
+            return output_path
+        except Exception as e:
+            print(f"Warning: ffmpeg stitching failed, falling back to MoviePy: {str(e)}")
+    
     final_clips = []
+    clip_sound_files = []
     
-    for video_file, sound_file in zip(video_files, sound_effect_files or [None] * len(video_files)):
+    for video_file, sound_file in zip(video_files, sound_effect_files):
         try:
-            video_clip = VideoFileClip(video_file)
-            
-            if sound_file and os.path.exists(sound_file):
-                try:
-                    # Load sound effect
-                    audio_clip = AudioFileClip(sound_file)
-                    
-                    # If audio is longer than video, trim it
-                    if audio_clip.duration > video_clip.duration:
-                        audio_clip = audio_clip.subclip(0, video_clip.duration)
-                    # If audio is shorter than video, loop it or pad with silence
-                    elif audio_clip.duration < video_clip.duration:
-                        # For simplicity, we'll just use the shorter duration
-                        video_clip = video_clip.subclip(0, audio_clip.duration)
-                    
-                    # Combine video with sound effect
-                    video_clip = video_clip.set_audio(audio_clip)
-                except Exception as e:
-                    print(f"Warning: Failed to process audio for {sound_file}: {str(e)}")
-                    # Continue with video without audio if audio processing fails
-            
-            final_clips.append(video_clip)
+            final_clips.append(VideoFileClip(video_file))
+            clip_sound_files.append(sound_file)
         except Exception as e:
             print(f"Warning: Failed to process video {video_file}: {str(e)}")
             continue
@@ -986,33 +1468,115 @@ def stitch_videos(video_files, sound_effect_files=None, narration_audio_path=Non
     # Concatenate all clips
     final_clip = concatenate_videoclips(final_clips)
     
-    # Add narration audio if provided and exists
-    if narration_audio_path and os.path.exists(narration_audio_path):
-        try:
-            narration_audio = AudioFileClip(narration_audio_path)
-            # Combine original audio with narration
-            final_audio = CompositeVideoClip([final_clip]).audio
-            if final_audio is not None:
-                combined_audio = CompositeVideoClip([
-                    final_clip.set_audio(final_audio.volumex(0.7)),  # Reduce original volume
-                    final_clip.set_audio(narration_audio.volumex(1.0))  # Keep narration at full volume
-                ]).audio
-                final_clip = final_clip.set_audio(combined_audio)
-            else:
-                final_clip = final_clip.set_audio(narration_audio)
-        except Exception as e:
-            print(f"Warning: Failed to add narration audio: {str(e)}")
+    # Mix the sound effects (fitted to their scenes) and the narration into one track
+    mix_path = os.path.join(ctx.video_dir, f"final_audio_mix_{ctx.timestamp}.wav")
+    drift = []
+    try:
+        samples, drift = mix_scene_audio([clip.duration for clip in final_clips], clip_sound_files, narration_audio_path)
+        print_drift_report(drift)
+        encode_audio(samples, mix_path)
+        final_clip = final_clip.set_audio(AudioFileClip(mix_path))
+    except Exception as e:
+        print(f"Warning: Failed to mix sound effects and narration: {str(e)}")
     
     # Write final video
-    output_path = f"{video_dir}/final_video_{timestamp}.mp4"
     final_clip.write_videofile(output_path)
     
     # Close all clips
     for clip in final_clips:
         clip.close()
+    if os.path.exists(mix_path):
+        os.remove(mix_path)
     
+    record_final_video(ctx, output_path, video_files, sound_effect_files, narration_audio_path, drift)
     return output_path
 
+def stitch_preview(ctx, video_files, sound_effect_files=None, narration_audio_path=None, overlay=False):
+    """
+    Render a low-resolution proxy of the final video into preview_video_{timestamp}.mp4.
+    
+    The scenes are scaled down and encoded with a fast x264 preset at a high CRF
+    (ffmpeg_stitcher.render_preview) over the same soundtrack mix as the final video,
+    for reviewing pacing at a fraction of the cost of the full render. The final video
+    is not written; once the preview is approved, run the stitching again without
+    preview (e.g. --continue_from_dir without --preview) to render it.
+    
+    Args:
+        overlay (bool): Burn the scene number into the top left corner of every scene
+    """
+    output_path = ctx.path(f"preview_video_{ctx.timestamp}.mp4")
+    sound_effect_files = sound_effect_files or [None] * len(video_files)
+    if not (narration_audio_path and os.path.exists(narration_audio_path)):
+        narration_audio_path = None
+    scenes = [(i, video_file, sound_file) for i, (video_file, sound_file) in enumerate(zip(video_files, sound_effect_files))
+              if os.path.exists(video_file)]
+    if not scenes:
+        raise RuntimeError("No video clips were successfully processed")
+    
+    print(f"Rendering preview of {len(scenes)} scenes...")
+    durations = [probe_video(video_file)["duration"] for _, video_file, _ in scenes]
+    samples, drift = mix_scene_audio(durations, [sound_file for _, _, sound_file in scenes], narration_audio_path)
+    print_drift_report(drift)
+    labels = [f"Scene {scene_number_of(video_file, i + 1)}" for i, video_file, _ in scenes] if overlay else None
+    render_preview([video_file for _, video_file, _ in scenes], samples, output_path, labels=labels)
+    
+    ctx.manifest.record("preview_video", inputs={
+        "scene_videos": video_files,
+        "sound_effects": sound_effect_files,
+        "narration_audio": narration_audio_path,
+        "overlay": overlay
+    }, outputs={"video": output_path}, data={"audio_drift": drift})
+    return output_path
+
+def scene_number_of(video_file, default):
+    """Scene number in a scene video file name (scene_{n}_{timestamp}.mp4), or default"""
+    match = re.match(r"scene_(\d+)_", os.path.basename(video_file))
+    return int(match.group(1)) if match else default
+
+def record_final_video(ctx, output_path, video_files, sound_effect_files, narration_audio_path, drift=None):
+    ctx.manifest.record("final_video", inputs={
+        "scene_videos": video_files,
+        "sound_effects": sound_effect_files,
+        "narration_audio": narration_audio_path
+    }, outputs={"video": output_path}, data={"audio_drift": drift or []})
+
+def new_run_context(video_dir=None, timestamp=None, **kwargs):
+    """
+    Create the RunContext of a run, using the module's API clients.
+    
+    Args:
+        video_dir (str): Existing run directory to resume; a new directory is created when omitted
+        timestamp (str): Timestamp of the existing run
+        **kwargs: Passed to RunContext (config, progress_callback, run_id, output_dir for new runs)
+    """
+    kwargs.setdefault("clients", {"gemini": gemini_client, "luma": luma_client})
+    if video_dir:
+        return RunContext.from_existing_dir(video_dir, timestamp, **kwargs)
+    return RunContext.create(**kwargs)
+
+def generate_narration(ctx, scenes, model_choice="gemini"):
+    """
+    Generate narration text and audio for the scenes.
+    
+    This is the narration branch of the pipeline. It runs alongside scene generation
+    and only meets the video branch again at stitching, so a failure here is reported
+    and turned into None instead of cancelling the video branch.
+    
+    Returns:
+        str: Path to the adjusted narration audio, or None if narration failed
+    """
+    try:
+        total_duration = calculate_total_duration(scenes)
+        narration_text, narration_text_path = generate_narration_text(ctx, scenes, total_duration, model_choice)
+        narration_audio_path = generate_narration_audio(ctx, narration_text, total_duration)
+        if narration_audio_path:
+            ctx.manifest.record("narration", inputs={"model": model_choice, "duration_seconds": total_duration},
+                                outputs={"text": narration_text_path, "audio": narration_audio_path})
+        return narration_audio_path
+    except Exception as e:
+        print(f"Warning: Narration generation failed: {str(e)}")
+        return None
+
 def generate_video(
     script_text, 
     model_choice="gemini",
@@ -1028,10 +1592,28 @@ def generate_video(
     initial_image_prompt=None,
     first_frame_image_gen=False,
     image_gen_model="fal",
-    continue_from_dir=None
+    continue_from_dir=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    skip_scene_count=False,
+    planning_mode="chain",
+    preview=False,
+    preview_overlay=False,
+    ctx=None
 ):
-    global video_dir, timestamp
+    """
+    Run the whole pipeline for a script: scene metadata, scene videos, narration and stitching.
+    
+    Args:
+        preview (bool): Stitch a low-resolution proxy (preview_video_{timestamp}.mp4) instead of the
+                        final video; continue from the run directory without preview to render it
+        preview_overlay (bool): Burn scene numbers into the preview
+        ctx (RunContext): Context of this run. A new run directory is created when omitted,
+                          or the existing one is reused when continue_from_dir is given.
     
+    Returns:
+        tuple: (scenes_json, final_video_path), or (error_message, None) on failure; with preview,
+               final_video_path is the path of the preview
+    """
     try:
         if initial_image_path and initial_image_prompt:
             raise ValueError("Cannot provide both initial_image_path and initial_image_prompt. Please choose one.")
@@ -1045,12 +1627,15 @@ def generate_video(
         # If continuing from a previous directory
         if continue_from_dir:
             print(f"Continuing video generation from directory: {continue_from_dir}")
-            scan_result = scan_directory(continue_from_dir)
+            scan_result = load_run_state(continue_from_dir)
             
             # Use the existing directory and timestamp
-            video_dir = continue_from_dir
-            if scan_result["timestamp"]:
-                timestamp = scan_result["timestamp"]
+            if ctx is None:
+                ctx = new_run_context(video_dir=continue_from_dir, timestamp=scan_result["timestamp"])
+            else:
+                ctx.video_dir = continue_from_dir
+                if scan_result["timestamp"]:
+                    ctx.timestamp = scan_result["timestamp"]
             
             # Check if we have scene data
             if not scan_result["scenes_data"]:
@@ -1066,124 +1651,188 @@ def generate_video(
                 print("All scenes are already generated. Proceeding to stitch videos.")
                 video_files = get_completed_scene_videos(scan_result)
                 sound_effect_files = get_sound_effect_files(scan_result)
+                if not skip_sound_effects:
+                    # Scenes may have been completed without their sound effect
+                    with ctx.stage("scenes"):
+                        missing_sound_effects = generate_missing_sound_effects(
+                            ctx, scenes, scan_result["scene_videos"], max_workers
+                        )
+                    sound_effect_files = [
+                        missing_sound_effects.get(scene_number, sound_file)
+                        for scene_number, sound_file in zip(scan_result["completed_scenes"], sound_effect_files)
+                    ]
                 
                 # Check if narration exists or needs to be generated
                 narration_audio_path = scan_result["narration_audio_path"]
                 if not narration_audio_path and not skip_narration:
                     # Generate narration if it doesn't exist
-                    total_duration = calculate_total_duration(scenes)
-                    narration_text, narration_text_path = generate_narration_text(scenes, total_duration, model_choice)
-                    narration_audio_path = generate_narration_audio(narration_text, total_duration)
+                    with ctx.stage("narration"):
+                        narration_audio_path = generate_narration(ctx, scenes, model_choice)
                 
                 # Stitch videos with sound effects and narration
-                final_video = stitch_videos(video_files, sound_effect_files, narration_audio_path)
+                with ctx.stage("stitching"):
+                    final_video = stitch_videos(ctx, video_files, sound_effect_files, narration_audio_path,
+                                                preview=preview, preview_overlay=preview_overlay)
                 return json.dumps(scenes, indent=2), final_video
             
-            # Get remaining scenes to generate
+            # Get remaining scenes to generate, each chained from the previous scene's last frame
             remaining_scenes = get_remaining_scenes(scan_result)
+            start_frame_urls = chained_start_frames(ctx, scenes, remaining_scenes, video_engine)
             
-            # Generate remaining scenes
-            print(f"Generating {len(remaining_scenes)} remaining scenes...")
-            remaining_video_files, remaining_sound_effect_files = generate_scenes(
-                remaining_scenes, 
-                video_engine, 
-                skip_sound_effects,
-                initial_image_path=initial_image_path,
-                initial_image_prompt=initial_image_prompt,
-                first_frame_image_gen=first_frame_image_gen,
-                image_gen_model=image_gen_model
-            )
+            completed_scenes = [scene for scene in scenes if scene["scene_number"] in scan_result["completed_scenes"]]
             
-            # Get completed scene videos and sound effects
-            completed_video_files = get_completed_scene_videos(scan_result)
-            completed_sound_effect_files = get_sound_effect_files(scan_result)
+            # Generate remaining scenes while narration (if it doesn't exist yet) and the sound effects
+            # completed scenes are missing are generated alongside them. Leaving the executor block
+            # waits for both, so their files are on disk even if a scene fails.
+            narration_audio_path = scan_result["narration_audio_path"]
+            with ThreadPoolExecutor(max_workers=2) as side_executor:
+                narration_future = None
+                if not narration_audio_path and not skip_narration:
+                    narration_future = side_executor.submit(generate_narration, ctx, scenes, model_choice)
+                sound_effects_future = None
+                if not skip_sound_effects:
+                    sound_effects_future = side_executor.submit(
+                        generate_missing_sound_effects, ctx, completed_scenes, scan_result["scene_videos"], max_workers
+                    )
+                
+                print(f"Generating {len(remaining_scenes)} remaining scenes...")
+                with ctx.stage("scenes"):
+                    remaining_video_files, remaining_sound_effect_files = generate_scenes(
+                        ctx,
+                        remaining_scenes, 
+                        video_engine, 
+                        skip_sound_effects,
+                        initial_image_path=initial_image_path,
+                        initial_image_prompt=initial_image_prompt,
+                        first_frame_image_gen=first_frame_image_gen,
+                        image_gen_model=image_gen_model,
+                        max_workers=max_workers,
+                        start_frame_urls=start_frame_urls
+                    )
+                
+                if narration_future:
+                    narration_audio_path = narration_future.result()
+                missing_sound_effects = sound_effects_future.result() if sound_effects_future else {}
+            
+            # Combine completed and newly generated videos, ordered by scene number
+            scene_to_video = dict(scan_result["scene_videos"])
+            scene_to_sound = dict(scan_result["sound_effects"])
+            scene_to_sound.update(missing_sound_effects)
+            for scene, video_file, sound_file in zip(remaining_scenes, remaining_video_files, remaining_sound_effect_files):
+                scene_to_video[scene["scene_number"]] = video_file
+                scene_to_sound[scene["scene_number"]] = sound_file
             
-            # Combine completed and newly generated videos
             all_video_files = []
             all_sound_effect_files = []
-            
-            # Create a mapping of scene number to video file
-            scene_to_video = {}
-            for video_file in completed_video_files + remaining_video_files:
-                scene_match = re.search(r'scene_(\d+)_', os.path.basename(video_file))
-                if scene_match:
-                    scene_number = int(scene_match.group(1))
-                    scene_to_video[scene_number] = video_file
-            
-            # Create a mapping of scene number to sound effect file
-            scene_to_sound = {}
-            for i, scene_number in enumerate(scan_result["completed_scenes"]):
-                if i < len(completed_sound_effect_files):
-                    scene_to_sound[scene_number] = completed_sound_effect_files[i]
-            
-            # Add newly generated sound effects
-            for i, scene in enumerate(remaining_scenes):
-                scene_number = scene["scene_number"]
-                if i < len(remaining_sound_effect_files):
-                    scene_to_sound[scene_number] = remaining_sound_effect_files[i]
-            
-            # Order videos and sound effects by scene number
             for scene in scenes:
                 scene_number = scene["scene_number"]
                 if scene_number in scene_to_video:
                     all_video_files.append(scene_to_video[scene_number])
                     all_sound_effect_files.append(scene_to_sound.get(scene_number))
             
-            # Check if narration exists or needs to be generated
-            narration_audio_path = scan_result["narration_audio_path"]
-            if not narration_audio_path and not skip_narration:
-                # Generate narration if it doesn't exist
-                total_duration = calculate_total_duration(scenes)
-                narration_text, narration_text_path = generate_narration_text(scenes, total_duration, model_choice)
-                narration_audio_path = generate_narration_audio(narration_text, total_duration)
-            
             # Stitch videos with sound effects and narration
-            final_video = stitch_videos(all_video_files, all_sound_effect_files, narration_audio_path)
+            with ctx.stage("stitching"):
+                final_video = stitch_videos(ctx, all_video_files, all_sound_effect_files, narration_audio_path,
+                                            preview=preview, preview_overlay=preview_overlay)
             
             return json.dumps(scenes, indent=2), final_video
         
         # Normal flow (not continuing from a previous directory)
+        if ctx is None:
+            ctx = new_run_context()
+        ctx.manifest.record("run", inputs={
+            "timestamp": ctx.timestamp,
+            "run_id": ctx.run_id,
+            "model_choice": model_choice,
+            "video_engine": video_engine
+        })
+        
         # Generate scene metadata with custom parameters
-        scenes = generate_scene_metadata(
-            script_text, 
-            model=model_choice,
-            max_scenes=max_scenes,
-            max_environments=max_environments,
-            custom_env_prompt=custom_env_prompt,
-            custom_environments=custom_environments,
-            video_engine=video_engine
-        )
+        with ctx.stage("scene_metadata"):
+            scenes = generate_scene_metadata(
+                ctx,
+                script_text, 
+                model=model_choice,
+                max_scenes=max_scenes,
+                max_environments=max_environments,
+                custom_env_prompt=custom_env_prompt,
+                custom_environments=custom_environments,
+                video_engine=video_engine,
+                skip_scene_count=skip_scene_count,
+                planning_mode=planning_mode
+            )
+        
+        ctx.manifest.record("scene_metadata", inputs={
+            "script_sha256": hashlib.sha256(script_text.encode("utf-8")).hexdigest(),
+            "model": model_choice,
+            "max_scenes": max_scenes,
+            "max_environments": max_environments,
+            "planning_mode": planning_mode
+        }, outputs={"scenes_json": ctx.path(f"scenes_{ctx.timestamp}.json")})
         
         if metadata_only:
             return json.dumps(scenes, indent=2), None
         
-        # Generate narration if not skipped
+        # Run the narration branch and the video branch concurrently; they join at stitching.
+        # Leaving the executor block waits for narration, so its files are on disk even if a scene fails.
         narration_audio_path = None
-        if not skip_narration:
-            # Calculate total duration only if needed for narration
-            total_duration = calculate_total_duration(scenes)
-            narration_text, narration_text_path = generate_narration_text(scenes, total_duration, model_choice)
-            narration_audio_path = generate_narration_audio(narration_text, total_duration)
-        
-        # Generate videos and sound effects
-        print("Generating videos and sound effects...")
-        video_files, sound_effect_files = generate_scenes(
-            scenes, 
-            video_engine, 
-            skip_sound_effects,
-            initial_image_path=initial_image_path,
-            initial_image_prompt=initial_image_prompt,
-            first_frame_image_gen=first_frame_image_gen,
-            image_gen_model=image_gen_model
-        )
+        with ThreadPoolExecutor(max_workers=1) as narration_executor:
+            narration_future = None
+            if not skip_narration:
+                narration_future = narration_executor.submit(generate_narration, ctx, scenes, model_choice)
+            
+            # Generate videos and sound effects
+            print("Generating videos and sound effects...")
+            with ctx.stage("scenes"):
+                video_files, sound_effect_files = generate_scenes(
+                    ctx,
+                    scenes, 
+                    video_engine, 
+                    skip_sound_effects,
+                    initial_image_path=initial_image_path,
+                    initial_image_prompt=initial_image_prompt,
+                    first_frame_image_gen=first_frame_image_gen,
+                    image_gen_model=image_gen_model,
+                    max_workers=max_workers
+                )
+            
+            if narration_future:
+                narration_audio_path = narration_future.result()
         
         # Stitch videos with sound effects and narration
-        final_video = stitch_videos(video_files, sound_effect_files, narration_audio_path)
+        with ctx.stage("stitching"):
+            final_video = stitch_videos(ctx, video_files, sound_effect_files, narration_audio_path,
+                                        preview=preview, preview_overlay=preview_overlay)
         
         return json.dumps(scenes, indent=2), final_video
     except Exception as e:
         return str(e), None
 
+def generate_random_script_for_run(ctx, model_choice="gemini"):
+    """
+    Generate a random script and save it and its elements in the run directory.
+    
+    Returns:
+        str: The generated script
+    """
+    import random_script_generator
+    script_data = random_script_generator.generate_random_script(model_choice)
+    script = script_data["script"]
+    
+    script_file_path = ctx.path(f"random_script_{ctx.timestamp}.txt")
+    elements_file_path = ctx.path(f"random_script_elements_{ctx.timestamp}.json")
+    os.makedirs(ctx.video_dir, exist_ok=True)
+    
+    with open(script_file_path, "w") as f:
+        f.write(script)
+    
+    with open(elements_file_path, "w") as f:
+        json.dump(script_data["elements"], f, indent=2)
+    
+    print(f"Random script generated and saved to: {script_file_path}")
+    print(f"Script elements saved to: {elements_file_path}")
+    return script
+
 def main():
     parser = argparse.ArgumentParser(description='Generate a video based on script analysis')
     parser.add_argument('--model', type=str, choices=['gemini', 'claude'], default='gemini',
@@ -1206,6 +1855,10 @@ def main():
                        help='Maximum number of scenes to generate (default: 5)')
     parser.add_argument('--max_environments', type=int, default=3,
                        help='Maximum number of unique environments to use (default: 3)')
+    parser.add_argument('--skip_scene_count', action='store_true',
+                       help='Skip the LLM scene count analysis and use --max_scenes scenes directly')
+    parser.add_argument('--planning_mode', type=str, choices=['chain', 'one_shot'], default='chain',
+                       help='Scene planning mode: step-by-step LLM chain or a single structured call (default: chain)')
     parser.add_argument('--initial_image_path', type=str,
                        help='Path to local image to use as starting frame for the first video')
     parser.add_argument('--initial_image_prompt', type=str,
@@ -1214,8 +1867,35 @@ def main():
                        help='Generate first frame images for each scene using Luma AI')
     parser.add_argument('--continue_from_dir', type=str,
                        help='Continue video generation from a previously interrupted process in the specified directory')
+    parser.add_argument('--preview', action='store_true',
+                       help='Render a low-resolution preview instead of the final video; approve it by running '
+                            'again with --continue_from_dir and without --preview')
+    parser.add_argument('--preview_overlay', action='store_true',
+                       help='Burn scene numbers into the preview')
+    parser.add_argument('--no_llm_cache', action='store_true',
+                       help='Always call the LLM APIs instead of reusing cached responses')
+    parser.add_argument('--no_asset_cache', action='store_true',
+                       help='Always call ElevenLabs instead of reusing cached sound effects and speech')
+    parser.add_argument('--max_workers', type=int, default=DEFAULT_MAX_WORKERS,
+                       help=f'Maximum number of scene generation tasks to run concurrently (default: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--batch_dir', type=str,
+                       help='Batch mode: generate a video for every .txt script in this directory')
+    parser.add_argument('--batch_manifest', type=str,
+                       help='Batch mode: JSON/JSONL manifest of scripts and per-script options (see batch_generation.py)')
+    parser.add_argument('--random_scripts', type=int, default=0,
+                       help='Batch mode: number of random scripts to generate videos for')
+    parser.add_argument('--batch_jobs', type=int, default=batch_generation.DEFAULT_BATCH_JOBS,
+                       help=f'Batch mode: scripts processed at the same time (default: {batch_generation.DEFAULT_BATCH_JOBS})')
+    parser.add_argument('--task_budget', type=int, default=batch_generation.DEFAULT_TASK_BUDGET,
+                       help=f'Batch mode: generation tasks running at the same time across all scripts (default: {batch_generation.DEFAULT_TASK_BUDGET})')
     args = parser.parse_args()
 
+    if args.no_llm_cache:
+        llm_cache.default_cache.enabled = False
+    if args.no_asset_cache:
+        sound_effect_cache.enabled = False
+        eleven_labs_tts.speech_cache.enabled = False
+
     if args.initial_image_path and args.initial_image_prompt:
         print("Error: Cannot provide both initial_image_path and initial_image_prompt. Please choose one.")
         return
@@ -1227,6 +1907,42 @@ def main():
         print(f"Error: {args.image_gen_model.upper()} API key is required for image generation.")
         return
 
+    # Batch mode: many scripts in this process, sharing clients, caches and rate limits
+    if args.batch_dir or args.batch_manifest or args.random_scripts:
+        try:
+            jobs = batch_generation.collect_jobs(args.batch_dir, args.batch_manifest, args.random_scripts)
+        except (OSError, ValueError) as e:
+            print(f"Error reading batch: {str(e)}")
+            return
+        if not jobs:
+            print("Error: No scripts found for the batch")
+            return
+        summary = batch_generation.run_batch(
+            jobs,
+            defaults={
+                "model_choice": args.model,
+                "video_engine": args.video_engine,
+                "metadata_only": args.metadata_only,
+                "max_scenes": args.max_scenes,
+                "max_environments": args.max_environments,
+                "skip_narration": args.skip_narration,
+                "skip_sound_effects": args.skip_sound_effects,
+                "initial_image_path": args.initial_image_path,
+                "initial_image_prompt": args.initial_image_prompt,
+                "first_frame_image_gen": args.first_frame_image_gen,
+                "image_gen_model": args.image_gen_model,
+                "max_workers": args.max_workers,
+                "skip_scene_count": args.skip_scene_count,
+                "planning_mode": args.planning_mode,
+                "preview": args.preview,
+                "preview_overlay": args.preview_overlay
+            },
+            batch_jobs=args.batch_jobs,
+            task_budget=args.task_budget
+        )
+        batch_generation.print_summary(summary)
+        return
+
     # If continuing from a previous directory
     if args.continue_from_dir:
         if not os.path.exists(args.continue_from_dir):
@@ -1247,44 +1963,24 @@ def main():
             initial_image_prompt=args.initial_image_prompt,
             first_frame_image_gen=args.first_frame_image_gen,
             image_gen_model=args.image_gen_model,
-            continue_from_dir=args.continue_from_dir
+            continue_from_dir=args.continue_from_dir,
+            max_workers=args.max_workers,
+            preview=args.preview,
+            preview_overlay=args.preview_overlay
         )
         
         if final_video:
-            print(f"Final video saved to: {final_video}")
+            print(f"{'Preview' if args.preview else 'Final video'} saved to: {final_video}")
         return
 
     # Normal flow (not continuing from a previous directory)
+    ctx = new_run_context()
+    
     # Generate a random script if requested
     if args.random_script:
         try:
-            import random_script_generator
             print(f"Generating random script using {args.model}...")
-            script_data = random_script_generator.generate_random_script(args.model)
-            script = script_data["script"]
-            
-            # Create video directory if it doesn't exist yet
-            global video_dir, timestamp
-            if not video_dir:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                video_dir = f"videos/video_{timestamp}"
-                os.makedirs(video_dir, exist_ok=True)
-            
-            # Save the script to the video directory
-            script_file_path = os.path.join(video_dir, f"random_script_{timestamp}.txt")
-            elements_file_path = os.path.join(video_dir, f"random_script_elements_{timestamp}.json")
-            
-            # Ensure the directory exists before writing files
-            os.makedirs(os.path.dirname(script_file_path), exist_ok=True)
-            
-            with open(script_file_path, "w") as f:
-                f.write(script)
-            
-            with open(elements_file_path, "w") as f:
-                json.dump(script_data["elements"], f, indent=2)
-                
-            print(f"Random script generated and saved to: {script_file_path}")
-            print(f"Script elements saved to: {elements_file_path}")
+            script = generate_random_script_for_run(ctx, args.model)
             print("\nGenerated Script:")
             print("-" * 80)
             print(script)
@@ -1317,15 +2013,30 @@ def main():
         initial_image_path=args.initial_image_path,
         initial_image_prompt=args.initial_image_prompt,
         first_frame_image_gen=args.first_frame_image_gen,
-        image_gen_model=args.image_gen_model
+        image_gen_model=args.image_gen_model,
+        max_workers=args.max_workers,
+        skip_scene_count=args.skip_scene_count,
+        planning_mode=args.planning_mode,
+        preview=args.preview,
+        preview_overlay=args.preview_overlay,
+        ctx=ctx
     )
     
     if isinstance(scenes_json, str) and not final_video:
         print(f"Error: {scenes_json}")
     elif args.metadata_only:
-        print(f"Scene metadata JSON generated in: {video_dir}")
+        print(f"Scene metadata JSON generated in: {ctx.video_dir}")
+    elif final_video and args.preview:
+        print(f"Preview saved to: {final_video}")
+        print(f"Render the final video with: python video_generation.py --continue_from_dir {ctx.video_dir}")
     elif final_video:
         print(f"Final video saved to: {final_video}")
+    print(f"LLM cache stats: {llm_cache.default_cache.stats()}")
+    print(f"Sound effect cache stats: {sound_effect_cache.stats()}")
+    print(f"Speech cache stats: {eleven_labs_tts.speech_cache.stats()}")
+    print(f"Polling stats: {polling.default_metrics.stats()}")
+    print(f"Rate limiter stats: {rate_limiter.default_registry.stats()}")
+    print(f"Stage timings: {ctx.metrics}")
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,16 @@
 import gradio as gr
 import os
 import json
-from video_generation import generate_scene_metadata, generate_scenes, stitch_videos, calculate_total_duration, generate_narration_text, generate_narration_audio
+import time
+from job_queue import JobQueue, WorkerPool, JOB_QUEUE_DB, DEFAULT_NUM_WORKERS, FINAL_STATES
 from dotenv import load_dotenv
 import tempfile
 import shutil
 from datetime import datetime
 
+# Generation runs in worker processes; the request handlers only submit and look up jobs
+job_queue = JobQueue(JOB_QUEUE_DB)
+
 def save_api_keys(gemini_key, eleven_labs_key, lumaai_key, anthropic_key, fal_key, bucket_name, credentials_file_obj):
     try:
         # Save the credentials file with original filename
@@ -43,7 +47,8 @@ def load_custom_environments(file_obj):
     try:
         if file_obj is None:
             return None
-        content = file_obj.read()
+        # type="binary" file inputs arrive as bytes, older Gradio versions pass a file object
+        content = file_obj if isinstance(file_obj, (bytes, str)) else file_obj.read()
         if isinstance(content, bytes):
             content = content.decode('utf-8')
         return json.loads(content)
@@ -51,7 +56,7 @@ def load_custom_environments(file_obj):
         print(f"Error loading custom environments: {str(e)}")
         return None
 
-def generate_video(
+def submit_video_job(
     script_text, 
     model_choice="gemini",
     video_engine="luma",
@@ -65,68 +70,125 @@ def generate_video(
     initial_image_path=None,
     initial_image_prompt=None,
     first_frame_image_gen=False,
-    image_gen_model="fal"
+    image_gen_model="fal",
+    preview=False,
+    preview_overlay=False
 ):
-    try:
-        if not os.getenv("CREDENTIALS_FILE") or not os.path.exists(os.getenv("CREDENTIALS_FILE")):
-            return "Error: GCP credentials file not found. Please set up your API keys first.", None
-        
-        if initial_image_path and initial_image_prompt:
-            return "Error: Cannot provide both initial image path and prompt. Please choose one.", None
-            
-        if (initial_image_prompt or first_frame_image_gen) and not (
-            (image_gen_model == 'luma' and os.getenv("LUMAAI_API_KEY")) or 
-            (image_gen_model == 'fal' and os.getenv("FAL_KEY"))
-        ):
-            return f"Error: {image_gen_model.upper()} API key is required for image generation.", None
-        
-        # Load custom environments if provided
-        custom_environments = None
-        if custom_environments_file:
-            custom_environments = load_custom_environments(custom_environments_file)
-            if custom_environments is None:
-                return "Error: Invalid custom environments JSON file format", None
-        
-        # Generate scene metadata with custom parameters
-        scenes = generate_scene_metadata(
-            script_text, 
-            model=model_choice,
-            max_scenes=max_scenes,
-            max_environments=max_environments,
-            custom_env_prompt=custom_env_prompt,
-            custom_environments=custom_environments,
-            video_engine=video_engine
-        )
-        
-        if metadata_only:
-            return json.dumps(scenes, indent=2), None
-        
-        # Generate narration if not skipped
-        narration_audio_path = None
-        if not skip_narration:
-            # Calculate total duration only if needed for narration
-            total_duration = calculate_total_duration(scenes)
-            narration_text, narration_text_path = generate_narration_text(scenes, total_duration, model_choice)
-            narration_audio_path = generate_narration_audio(narration_text, total_duration)
-        
-        # Generate videos and sound effects
-        print("Generating videos and sound effects...")
-        video_files, sound_effect_files = generate_scenes(
-            scenes, 
-            video_engine, 
-            skip_sound_effects,
-            initial_image_path=initial_image_path.name if initial_image_path else None,
-            initial_image_prompt=initial_image_prompt,
-            first_frame_image_gen=first_frame_image_gen,
-            image_gen_model=image_gen_model
-        )
-        
-        # Stitch videos with sound effects and narration
-        final_video = stitch_videos(video_files, sound_effect_files, narration_audio_path)
+    """
+    Validate the inputs and queue a generation job for the worker pool.
+    
+    Inputs are checked here, before the job takes a place in the queue; only provider
+    and file errors during generation are left to the worker.
+    
+    Returns:
+        tuple: (message, job_id), job_id is None if the job could not be queued
+    
+    Raises:
+        gr.Error: If the inputs are invalid
+    """
+    if not os.getenv("CREDENTIALS_FILE") or not os.path.exists(os.getenv("CREDENTIALS_FILE")):
+        raise gr.Error("GCP credentials file not found. Please set up your API keys first.")
+    
+    if not script_text or not script_text.strip():
+        raise gr.Error("Please enter a script or use a random script.")
+    
+    # Gradio passes a file path for type="filepath", a file object in older versions
+    initial_image_path = getattr(initial_image_path, "name", initial_image_path) or None
+    if initial_image_path and initial_image_prompt:
+        raise gr.Error("Cannot provide both initial image path and prompt. Please choose one.")
+    if initial_image_path and not os.path.exists(initial_image_path):
+        raise gr.Error(f"Initial image not found: {initial_image_path}")
         
-        return json.dumps(scenes, indent=2), final_video
+    if (initial_image_prompt or first_frame_image_gen) and not (
+        (image_gen_model == 'luma' and os.getenv("LUMAAI_API_KEY")) or 
+        (image_gen_model == 'fal' and os.getenv("FAL_KEY"))
+    ):
+        raise gr.Error(f"{image_gen_model.upper()} API key is required for image generation.")
+    
+    # Load custom environments if provided
+    custom_environments = None
+    if custom_environments_file:
+        custom_environments = load_custom_environments(custom_environments_file)
+        if custom_environments is None:
+            raise gr.Error("Invalid custom environments JSON file format")
+    
+    try:
+        job_id = job_queue.submit({
+            "script_text": script_text,
+            "model_choice": model_choice,
+            "video_engine": video_engine,
+            "metadata_only": metadata_only,
+            "max_scenes": int(max_scenes),
+            "max_environments": int(max_environments),
+            "custom_env_prompt": custom_env_prompt or None,
+            "custom_environments": custom_environments,
+            "skip_narration": skip_narration,
+            "skip_sound_effects": skip_sound_effects,
+            "initial_image_path": initial_image_path,
+            "initial_image_prompt": initial_image_prompt or None,
+            "first_frame_image_gen": first_frame_image_gen,
+            "image_gen_model": image_gen_model,
+            "preview": preview,
+            "preview_overlay": preview_overlay
+        })
+        return f"Job {job_id} queued", job_id
     except Exception as e:
-        return str(e), None
+        return f"Error: Could not queue the job: {str(e)}", None
+
+def submit_full_render(job_id):
+    """
+    Approve the preview of a finished job: queue a job that renders the final video from its run directory.
+    
+    The scenes, sound effects and narration of the run are reused, so the new job only stitches.
+    
+    Returns:
+        tuple: (message, job_id), job_id is None if the job has no approvable preview
+    """
+    job = job_queue.get(job_id.strip()) if job_id else None
+    if job is None:
+        return "No job found with this id", None
+    if job["status"] != "completed" or not job["params"].get("preview"):
+        return f"Job {job['id']} has no finished preview to approve", None
+    params = job["params"]
+    full_job_id = job_queue.submit({
+        "continue_from_dir": job["result"]["video_dir"],
+        "model_choice": params.get("model_choice", "gemini"),
+        "video_engine": params.get("video_engine", "luma"),
+        "skip_narration": params.get("skip_narration", False),
+        "skip_sound_effects": params.get("skip_sound_effects", False),
+        "image_gen_model": params.get("image_gen_model", "fal")
+    })
+    return f"Preview of job {job['id']} approved, full render job {full_job_id} queued", full_job_id
+
+def format_job_status(job):
+    """Status line and recent progress events of a job"""
+    lines = [f"Job {job['id']}: {job['status']}"]
+    if job["cancel_requested"] and job["status"] == "running":
+        lines[0] += " (cancelling)"
+    if job["started_at"]:
+        end_time = job["finished_at"] or time.time()
+        lines.append(f"Elapsed: {end_time - job['started_at']:.0f}s")
+    if job["error"]:
+        lines.append(f"Error: {job['error']}")
+    for event in job["progress"][-8:]:
+        info = ", ".join(f"{key}={value}" for key, value in event["info"].items())
+        lines.append(f"- {event['stage']} {event['status']}" + (f" ({info})" if info else ""))
+    return "\n".join(lines)
+
+def get_job_outputs(job_id):
+    """
+    Look up a job for the UI.
+    
+    Returns:
+        tuple: (status_text, scenes_json, final_video); scenes_json and final_video are None until the job has finished
+    """
+    job = job_queue.get(job_id.strip()) if job_id else None
+    if job is None:
+        return "No job found with this id", None, None
+    result = job["result"] or {}
+    if job["status"] not in FINAL_STATES:
+        return format_job_status(job), None, None
+    return format_job_status(job), result.get("scenes_json"), result.get("final_video")
 
 # Create Gradio interface
 with gr.Blocks(title="Video Generation System") as app:
@@ -237,6 +299,17 @@ Upload your Google Cloud service account credentials JSON file. You can create o
                         value=False,
                         info="Skip generating sound effects"
                     )
+                with gr.Row():
+                    preview = gr.Checkbox(
+                        label="Preview Render",
+                        value=False,
+                        info="Render a fast low-resolution preview; the full-quality video is rendered once it is approved"
+                    )
+                    preview_overlay = gr.Checkbox(
+                        label="Scene Number Overlay",
+                        value=False,
+                        info="Burn scene numbers into the preview"
+                    )
                 max_scenes = gr.Slider(
                     minimum=1,
                     maximum=20,
@@ -263,6 +336,17 @@ Upload your Google Cloud service account credentials JSON file. You can create o
                 )
                 
             with gr.Column():
+                job_id_input = gr.Textbox(
+                    label="Job ID",
+                    placeholder="Filled in when a job is submitted, or paste an earlier job id"
+                )
+                job_status = gr.Textbox(label="Job Status", interactive=False, lines=6)
+                with gr.Row():
+                    refresh_btn = gr.Button("Refresh Status")
+                    cancel_btn = gr.Button("Cancel Job")
+                    approve_btn = gr.Button("Approve Preview & Render Full Quality")
+                # Poll the job while the page is open
+                status_timer = gr.Timer(3)
                 metadata_output = gr.Textbox(
                     label="Generated Metadata", 
                     interactive=False,
@@ -302,23 +386,10 @@ Upload your Google Cloud service account credentials JSON file. You can create o
             initial_image_prompt,
             first_frame_image_gen,
             image_gen_model,
-            use_random_script
+            use_random_script,
+            preview,
+            preview_overlay
         ):
-            if initial_image_path and initial_image_prompt:
-                return {
-                    metadata_output: "Error: Cannot provide both initial image path and prompt. Please choose one.",
-                    video_output: None
-                }
-                
-            if (initial_image_prompt or first_frame_image_gen) and not (
-                (image_gen_model == 'luma' and os.getenv("LUMAAI_API_KEY")) or 
-                (image_gen_model == 'fal' and os.getenv("FAL_KEY"))
-            ):
-                return {
-                    metadata_output: f"Error: {image_gen_model.upper()} API key is required for image generation.",
-                    video_output: None
-                }
-                
             # Generate random script if requested
             if use_random_script:
                 try:
@@ -326,9 +397,6 @@ Upload your Google Cloud service account credentials JSON file. You can create o
                     script_data = random_script_generator.generate_random_script(model_choice)
                     script = script_data["script"]
                     
-                    # Display the generated script in the script input box
-                    script_input = script
-                    
                     # Create a message to show the user that a random script was generated
                     random_script_info = f"Using randomly generated script with model: {model_choice}\n\n"
                     random_script_info += f"Elements used:\n"
@@ -354,43 +422,74 @@ Upload your Google Cloud service account credentials JSON file. You can create o
                 except Exception as e:
                     return {
                         metadata_output: f"Error generating random script: {str(e)}",
-                        video_output: None
+                        video_output: None,
+                        job_id_input: gr.update(),
+                        job_status: gr.update()
                     }
             else:
                 script = script_input
                 random_script_info = ""
             
-            # Generate video
-            try:
-                scenes_json, final_video = generate_video(
-                    script, 
-                    model_choice=model_choice,
-                    video_engine=video_engine,
-                    metadata_only=metadata_only,
-                    max_scenes=max_scenes,
-                    max_environments=max_environments,
-                    custom_env_prompt=custom_env_prompt,
-                    custom_environments_file=custom_environments_file,
-                    skip_narration=skip_narration,
-                    skip_sound_effects=skip_sound_effects,
-                    initial_image_path=initial_image_path,
-                    initial_image_prompt=initial_image_prompt,
-                    first_frame_image_gen=first_frame_image_gen,
-                    image_gen_model=image_gen_model
-                )
-                
-                if random_script_info and not metadata_only:
-                    scenes_json = random_script_info + scenes_json
-                
-                return {
-                    metadata_output: scenes_json,
-                    video_output: final_video
-                }
-            except Exception as e:
+            # Queue the job; the worker pool runs it and the status timer picks up its progress
+            message, job_id = submit_video_job(
+                script, 
+                model_choice=model_choice,
+                video_engine=video_engine,
+                metadata_only=metadata_only,
+                max_scenes=max_scenes,
+                max_environments=max_environments,
+                custom_env_prompt=custom_env_prompt,
+                custom_environments_file=custom_environments_file,
+                skip_narration=skip_narration,
+                skip_sound_effects=skip_sound_effects,
+                initial_image_path=initial_image_path,
+                initial_image_prompt=initial_image_prompt,
+                first_frame_image_gen=first_frame_image_gen,
+                image_gen_model=image_gen_model,
+                preview=preview,
+                preview_overlay=preview_overlay
+            )
+            if job_id is None:
                 return {
-                    metadata_output: f"Error: {str(e)}",
-                    video_output: None
+                    metadata_output: message,
+                    video_output: None,
+                    job_id_input: gr.update(),
+                    job_status: gr.update()
                 }
+            
+            return {
+                metadata_output: random_script_info,
+                video_output: None,
+                job_id_input: job_id,
+                job_status: message
+            }
+        
+        def refresh_job(job_id, shown_job):
+            """Update the status; fill in metadata and video once per finished job"""
+            if not job_id:
+                return gr.update(), gr.update(), gr.update(), shown_job
+            status_text, scenes_json, final_video = get_job_outputs(job_id)
+            finished = scenes_json is not None or final_video is not None
+            if not finished or shown_job == job_id:
+                return status_text, gr.update(), gr.update(), shown_job
+            return status_text, scenes_json, final_video, job_id
+        
+        def force_refresh_job(job_id):
+            status_text, scenes_json, final_video = get_job_outputs(job_id) if job_id else ("", None, None)
+            return status_text, scenes_json, final_video, job_id
+        
+        def cancel_job(job_id):
+            if not job_id:
+                return "No job selected"
+            if job_queue.cancel(job_id.strip()):
+                return f"Cancellation requested for job {job_id.strip()}"
+            return f"Job {job_id.strip()} is not queued or running"
+        
+        def approve_preview(job_id):
+            message, full_job_id = submit_full_render(job_id)
+            if full_job_id is None:
+                return message, gr.update()
+            return message, full_job_id
         
         def preview_random_script(model_choice):
             try:
@@ -438,10 +537,33 @@ Upload your Google Cloud service account credentials JSON file. You can create o
                 initial_image_prompt,
                 first_frame_image_gen,
                 image_gen_model,
-                use_random_script
+                use_random_script,
+                preview,
+                preview_overlay
             ],
-            outputs=[metadata_output, video_output]
+            outputs=[metadata_output, video_output, job_id_input, job_status]
         )
+        
+        # Job status polling and cancellation
+        shown_job = gr.State(None)
+        status_timer.tick(
+            refresh_job,
+            inputs=[job_id_input, shown_job],
+            outputs=[job_status, metadata_output, video_output, shown_job]
+        )
+        refresh_btn.click(
+            force_refresh_job,
+            inputs=[job_id_input],
+            outputs=[job_status, metadata_output, video_output, shown_job]
+        )
+        cancel_btn.click(cancel_job, inputs=[job_id_input], outputs=[job_status])
+        approve_btn.click(approve_preview, inputs=[job_id_input], outputs=[job_status, job_id_input])
 
 if __name__ == "__main__":
-    app.launch() 
\ No newline at end of file
+    worker_pool = WorkerPool(JOB_QUEUE_DB, num_workers=DEFAULT_NUM_WORKERS)
+    worker_pool.start()
+    try:
+        app.launch()
+    finally:
+        worker_pool.stop()
+ 
\ No newline at end of file